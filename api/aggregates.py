@@ -0,0 +1,85 @@
+"""
+Инкрементальные агрегаты заказов: Order.total/item_count, UserOrderStats и OrderStatusStats.
+Обновляются дельтами через F()-выражения из сигналов (signals.py), поэтому отчётам
+не нужен GROUP BY по всей истории заказов.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+
+from .models import Order, OrderItem, OrderStatusStats, UserOrderStats
+
+
+def _bump(model, lookup, **deltas):
+    if not any(deltas.values()):
+        return
+    changes = {name: F(name) + delta for name, delta in deltas.items()}
+    if model.objects.filter(**lookup).update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **deltas)
+    except IntegrityError:
+        model.objects.filter(**lookup).update(**changes)
+
+
+def apply_order_delta(user_id, status_id, orders, items, total, skip_user=False):
+    if not skip_user:
+        _bump(UserOrderStats, {"user_id": user_id}, order_count=orders, item_count=items, total=total)
+    if status_id is not None:
+        _bump(OrderStatusStats, {"status_id": status_id}, order_count=orders, item_count=items, total=total)
+
+
+def order_saved(order, created, previous=None):
+    """previous - (status_id, total, item_count) до сохранения для существующего заказа."""
+    if created:
+        apply_order_delta(order.user_id, order.status_id, 1, order.item_count, order.total)
+        return
+    if previous is None:
+        return
+    old_status_id, old_total, old_items = previous
+    if old_status_id != order.status_id:
+        apply_order_delta(order.user_id, old_status_id, -1, -old_items, -old_total, skip_user=True)
+        apply_order_delta(order.user_id, order.status_id, 1, order.item_count, order.total, skip_user=True)
+        _bump(UserOrderStats, {"user_id": order.user_id},
+              item_count=order.item_count - old_items, total=order.total - old_total)
+    else:
+        apply_order_delta(order.user_id, order.status_id, 0,
+                          order.item_count - old_items, order.total - old_total)
+
+
+def order_deleted(order, skip_user=False):
+    apply_order_delta(order.user_id, order.status_id, -1, -order.item_count, -order.total, skip_user)
+
+
+def order_items_changed(order_id, items, total):
+    """Позиции добавлены/изменены/удалены вне оформления (например, в админке)."""
+    Order.objects.filter(id=order_id).update(item_count=F("item_count") + items, total=F("total") + total)
+    order = Order.objects.filter(id=order_id).values("user_id", "status_id").first()
+    if order is not None:
+        apply_order_delta(order["user_id"], order["status_id"], 0, items, total)
+
+
+@transaction.atomic
+def rebuild_order_stats():
+    """Пересчитать все агрегаты с нуля (первичное заполнение и сверка)."""
+    per_order = OrderItem.objects.values("order_id").annotate(items=Sum("quantity"), total=Sum("cost"))
+    for row in per_order.iterator():
+        Order.objects.filter(id=row["order_id"]).update(item_count=row["items"], total=row["total"])
+
+    UserOrderStats.objects.all().delete()
+    OrderStatusStats.objects.all().delete()
+    totals = dict(order_count=Count("id"), item_count=Sum("item_count"), total=Sum("total"))
+    UserOrderStats.objects.bulk_create(
+        UserOrderStats(user_id=row.pop("user_id"), **row)
+        for row in Order.objects.values("user_id").annotate(**totals).order_by()
+    )
+    OrderStatusStats.objects.bulk_create(
+        OrderStatusStats(status_id=row.pop("status_id"), **row)
+        for row in Order.objects.filter(status__isnull=False).values("status_id").annotate(**totals).order_by()
+    )
+
+
+def is_cascade_from(origin, model):
+    """Удаление запущено удалением объекта/queryset указанной модели."""
+    return origin is not None and getattr(origin, "model", type(origin)) is model
+
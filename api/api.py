@@ -1,23 +1,31 @@
-from ninja import NinjaAPI
+from ninja.errors import Throttled
 
-from .routers.categories import category_router
-from .routers.products import product_router
-from .routers.auth import auth_router
-from .routers.users import user_router
-from .routers.wishlist import wishlist_router
-from .routers.orders import order_router
-from .routers.admin import admin_router
+from .metrics import profile_handler, profile_operation
+from .openapi import LazyNinjaAPI
+from .routers.fast_serialization import FastJSONRenderer, fast_serialization
 
 
+api = LazyNinjaAPI(renderer=FastJSONRenderer())
+# обработчики списков возвращают fast(queryset, Schema) - строки сериализуются без моделей и pydantic
+api.add_decorator(fast_serialization, mode="operation")
+# хуки профилирования: без активного профиля (см. RequestMetricsMiddleware) ничего не замеряют
+api.add_decorator(profile_operation, mode="view")
+api.add_decorator(profile_handler, mode="operation")
 
-api = NinjaAPI()
 
-api.add_router("/auth/", auth_router)
-api.add_router("/admin/", admin_router)
-api.add_router("/user/", user_router)
-api.add_router("/categories", category_router)
-api.add_router("/products", product_router)
-api.add_router("/wishlist", wishlist_router)
-api.add_router("/orders", order_router)
+@api.exception_handler(Throttled)
+def throttled(request, exc):
+    # Retry-After ninja добавит сам по RateLimit.wait()
+    return api.create_response(request, {"detail": "Слишком много запросов, повторите позже"}, status=429)
+
+
+# роутеры строками: модули импортируются при первой сборке URL (первый запрос), а не при импорте api
+api.add_router("/auth/", "api.routers.auth.auth_router")
+api.add_router("/admin/", "api.routers.admin.admin_router")
+api.add_router("/user/", "api.routers.users.user_router")
+api.add_router("/categories", "api.routers.categories.category_router")
+api.add_router("/products", "api.routers.products.product_router")
+api.add_router("/wishlist", "api.routers.wishlist.wishlist_router")
+api.add_router("/orders", "api.routers.orders.order_router")
 
 
@@ -1,6 +1,23 @@
+import django
 from django.apps import AppConfig
+from django.core import checks
+
+# aauthenticate, aget_object_or_404, acreate_user и OPTIONS['transaction_mode'] для SQLite
+MIN_DJANGO_VERSION = (5, 1)
+
+
+def check_django_version(app_configs, **kwargs):
+    if django.VERSION[:2] >= MIN_DJANGO_VERSION:
+        return []
+    required = ".".join(map(str, MIN_DJANGO_VERSION))
+    return [checks.Error(f"api требует Django >= {required}, установлен {django.get_version()}", id="api.E001")]
 
 
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from . import tasks  # noqa: F401
+        checks.register(check_django_version, checks.Tags.compatibility)
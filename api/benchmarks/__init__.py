@@ -0,0 +1,6 @@
+"""
+Инструменты для замеров производительности: наполнение тестовой БД (seed),
+описание всех эндпоинтов api (endpoints), запуск во временной БД (runner),
+нагрузочный прогон через тестовый клиент и WSGI/ASGI-сервер (load),
+холодный старт воркера (startup) и конкурентная запись (writes).
+"""
@@ -0,0 +1,68 @@
+from collections import namedtuple
+
+# path и body форматируются контекстом из seed(); role - чей токен передать (None - без авторизации).
+# Изменяющие запросы выполняются внутри транзакции, которая откатывается после каждого вызова.
+Endpoint = namedtuple("Endpoint", "name method path role body")
+
+ENDPOINTS = [
+    # auth
+    Endpoint("login", "post", "/api/auth/login", None, {"username": "user0", "password": "benchmark"}),
+    Endpoint("register", "post", "/api/auth/register", None, {"username": "bench-new", "password": "Bench-pass-123"}),
+    # categories
+    Endpoint("list_categories", "get", "/api/categories/", None, None),
+    Endpoint("get_category", "get", "/api/categories/{slug}", None, None),
+    Endpoint("get_products_in_category", "get", "/api/categories/{slug}/products", None, None),
+    Endpoint("create_category", "post", "/api/categories/", "manager", {"title": "Новая", "slug": "bench-new"}),
+    Endpoint("partial_update_category", "patch", "/api/categories/{slug}", "manager", {"title": "Переименована", "slug": "{slug}"}),
+    Endpoint("delete_category", "delete", "/api/categories/{slug}", "manager", None),
+    # products
+    Endpoint("list_products", "get", "/api/products/", None, None),
+    Endpoint("list_products_price_range", "get", "/api/products/?min_price={min_price}&max_price={max_price}", None, None),
+    Endpoint("list_products_by_price", "get", "/api/products/?order_by=-price", None, None),
+    Endpoint("list_products_search", "get", "/api/products/?q={search}", None, None),
+    Endpoint("product_facets", "get", "/api/products/facets?min_price={min_price}&max_price={max_price}", None, None),
+    Endpoint("get_product", "get", "/api/products/{product_id}", None, None),
+    Endpoint("create_product", "post", "/api/products/", "manager",
+             {"title": "Bench TV", "category": "{slug}", "description": "-", "price": 1000}),
+    Endpoint("update_product", "patch", "/api/products/{product_id}", "manager", {"price": 1234}),
+    Endpoint("delete_product", "delete", "/api/products/{product_id}", "manager", None),
+    # wishlist
+    Endpoint("get_wishlist", "get", "/api/wishlist/", "customer", None),
+    Endpoint("get_user_wishlist_for_manager", "get", "/api/wishlist/user/{user_id}", "manager", None),
+    Endpoint("add_to_wishlist", "post", "/api/wishlist/", "customer", {"product_id": "{product_id}", "quantity": 1}),
+    Endpoint("decrement_from_wishlist", "delete", "/api/wishlist/{wishlist_product_id}/decrement", "customer", None),
+    Endpoint("remove_from_wishlist", "delete", "/api/wishlist/{wishlist_product_id}", "customer", None),
+    # orders
+    Endpoint("get_all_orders", "get", "/api/orders/", "manager", None),
+    Endpoint("get_my_orders", "get", "/api/orders/my", "customer", None),
+    Endpoint("get_user_orders", "get", "/api/orders/user/{user_id}", "manager", None),
+    Endpoint("create_order_from_wishlist", "post", "/api/orders/", "customer", None),
+    Endpoint("update_order_status", "put", "/api/orders/{order_id}/status?status_id={status_id}", "manager", None),
+    Endpoint("get_status_stats", "get", "/api/orders/stats/statuses", "manager", None),
+    Endpoint("get_user_stats", "get", "/api/orders/stats/users/{user_id}", "manager", None),
+    # users
+    Endpoint("list_users", "get", "/api/user/users/", "manager", None),
+    Endpoint("request_manager", "post", "/api/user/request-manager", "customer", None),
+    # admin
+    Endpoint("list_manager_requests", "get", "/api/admin/manager-requests", "staff", None),
+    Endpoint("approve_manager_request", "post", "/api/admin/approve-manager/{request_id}", "staff", None),
+    Endpoint("auth_cache_stats", "get", "/api/admin/auth-cache", "staff", None),
+    Endpoint("request_metrics", "get", "/api/admin/metrics", "staff", None),
+]
+
+
+def _format(value, context):
+    if isinstance(value, str):
+        formatted = value.format(**context)
+        return int(formatted) if value.startswith("{") and formatted.isdigit() else formatted
+    if isinstance(value, dict):
+        return {k: _format(v, context) for k, v in value.items()}
+    return value
+
+
+def build_request(endpoint, context):
+    """(method, path, body, headers) для django.test.Client."""
+    headers = {}
+    if endpoint.role:
+        headers["HTTP_AUTHORIZATION"] = f"Bearer {context['tokens'][endpoint.role]}"
+    return endpoint.method, _format(endpoint.path, context), _format(endpoint.body, context), headers
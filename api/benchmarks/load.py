@@ -0,0 +1,175 @@
+"""
+Нагрузочный прогон эндпоинтов: серия запросов через django.test.Client (в процессе)
+и через настоящий WSGI/ASGI-сервер на локальном порту, с латентностью p50/p95/p99,
+RPS и числом SQL-запросов на запрос. Отчёт сохраняется в JSON и служит baseline
+для следующего прогона: compare() возвращает список регрессий.
+"""
+import asyncio
+import http.client
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from socketserver import ThreadingMixIn
+from urllib.parse import quote
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.test import Client
+from django.test.utils import override_settings
+
+from .endpoints import build_request
+from .runner import call, percentile, profile_endpoint
+
+SAFE_METHODS = ("get", "head")
+SERVERS = ("wsgi", "asgi")
+
+
+def summarize(timings, elapsed):
+    """Латентность (мс) и пропускная способность для серии запросов, выполненной за elapsed секунд."""
+    return {
+        "requests": len(timings),
+        "rps": len(timings) / elapsed if elapsed else 0.0,
+        "mean_ms": sum(timings) / len(timings) if timings else 0.0,
+        "p50_ms": percentile(timings, 50),
+        "p95_ms": percentile(timings, 95),
+        "p99_ms": percentile(timings, 99),
+    }
+
+
+def run_client(endpoint, context, requests, client=None):
+    """Последовательные запросы через тестовый клиент; изменяющие откатываются (см. runner.call)."""
+    client = client or Client()
+    profile = profile_endpoint(endpoint, context, iterations=1, with_plans=False, client=client)
+    timings = []
+    started = time.perf_counter()
+    for _ in range(requests):
+        request_started = time.perf_counter()
+        call(client, endpoint, context)
+        timings.append((time.perf_counter() - request_started) * 1000)
+    elapsed = time.perf_counter() - started
+    return {"status": profile["status"], "queries": profile["queries"], **summarize(timings, elapsed)}
+
+
+def _http_headers(headers):
+    # build_request отдаёт заголовки в формате WSGI environ (HTTP_AUTHORIZATION)
+    return {key[5:].replace("_", "-").title(): value for key, value in headers.items()}
+
+
+def run_http(endpoint, context, address, requests, concurrency=1):
+    """Запросы к запущенному серверу из concurrency потоков; у каждого потока своё соединение."""
+    method, path, body, headers = build_request(endpoint, context)
+    path = quote(path, safe="/?&=")
+    headers = _http_headers(headers)
+    payload = json.dumps(body).encode() if body is not None else None
+    if payload is not None:
+        headers["Content-Type"] = "application/json"
+    local = threading.local()
+
+    def one(_):
+        conn = getattr(local, "conn", None) or http.client.HTTPConnection(*address, timeout=30)
+        started = time.perf_counter()
+        conn.request(method.upper(), path, body=payload, headers=headers)
+        response = conn.getresponse()
+        response.read()
+        elapsed = (time.perf_counter() - started) * 1000
+        # wsgiref отвечает по HTTP/1.0 и закрывает соединение, uvicorn держит keep-alive
+        local.conn = None if response.will_close else conn
+        if response.will_close:
+            conn.close()
+        return response.status, elapsed
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        one(None)  # прогрев
+        started = time.perf_counter()
+        results = list(pool.map(one, range(requests)))
+        elapsed = time.perf_counter() - started
+    statuses = {status for status, _ in results}
+    return {"status": max(statuses), **summarize([ms for _, ms in results], elapsed)}
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class _ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+@contextmanager
+def serve(kind):
+    """Поднять WSGI- или ASGI-сервер Django на свободном порту; отдаёт (host, port)."""
+    with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "127.0.0.1"]):
+        with _serve(kind) as address:
+            yield address
+
+
+@contextmanager
+def _serve(kind):
+    if kind == "wsgi":
+        server = make_server("127.0.0.1", 0, WSGIHandler(), _ThreadingWSGIServer, _QuietHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            yield server.server_address
+        finally:
+            server.shutdown()
+            server.server_close()
+        return
+
+    try:
+        import uvicorn
+    except ImportError:
+        raise RuntimeError("Для замеров под ASGI нужен uvicorn (pip install uvicorn)")
+
+    config = uvicorn.Config(ASGIHandler(), host="127.0.0.1", port=0, lifespan="off", log_level="warning")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=lambda: asyncio.run(server.serve()), daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    try:
+        yield server.servers[0].sockets[0].getsockname()[:2]
+    finally:
+        server.should_exit = True
+        thread.join()
+
+
+def run_load(endpoints, context, requests=100, concurrency=1, servers=SERVERS):
+    """
+    {"client": {имя: метрики}, "wsgi": {...}, "asgi": {...}}. Через сервер идут только
+    безопасные запросы: изменяющие там нельзя откатить, и повторы меняли бы данные.
+    """
+    report = {"client": {e.name: run_client(e, context, requests) for e in endpoints}}
+    for kind in servers:
+        with serve(kind) as address:
+            report[kind] = {
+                e.name: {**run_http(e, context, address, requests, concurrency),
+                         "queries": report["client"][e.name]["queries"]}
+                for e in endpoints if e.method in SAFE_METHODS
+            }
+    return report
+
+
+def compare(report, baseline, tolerance=0.2, noise_ms=1.0):
+    """
+    Регрессии относительно baseline: рост p95 больше чем на tolerance (и больше noise_ms),
+    падение RPS больше чем на tolerance, любое увеличение числа запросов к БД.
+    """
+    regressions = []
+    for mode, results in report.items():
+        for name, current in results.items():
+            previous = baseline.get(mode, {}).get(name)
+            if previous is None:
+                continue
+            if current["queries"] > previous["queries"]:
+                regressions.append(f"{mode}/{name}: запросов {previous['queries']} -> {current['queries']}")
+            if current["p95_ms"] > previous["p95_ms"] * (1 + tolerance) + noise_ms:
+                regressions.append(f"{mode}/{name}: p95 {previous['p95_ms']:.2f}ms -> {current['p95_ms']:.2f}ms")
+            if current["rps"] < previous["rps"] * (1 - tolerance):
+                regressions.append(f"{mode}/{name}: RPS {previous['rps']:.1f} -> {current['rps']:.1f}")
+    return regressions
@@ -0,0 +1,78 @@
+"""
+Пропускная способность входа и регистрации на одно ядро: запросы идут последовательно через
+тестовый клиент в одном потоке, почти всё время - хэширование пароля. Каждый хэшер из HASHERS
+прогоняется основным (первым в PASSWORD_HASHERS); у каждого запроса свой REMOTE_ADDR, чтобы
+замер не упирался в лимиты api.routers.throttling.
+"""
+import json
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import get_hasher, make_password
+from django.contrib.auth.models import User
+from django.test import Client
+from django.test.utils import override_settings
+
+from .load import summarize
+
+HASHERS = {
+    "scrypt": "api.passwords.ScryptPasswordHasher",
+    "argon2": "api.passwords.Argon2PasswordHasher",
+    "pbkdf2": "api.passwords.PBKDF2PasswordHasher",
+}
+
+PASSWORD = "correct-horse-battery"
+
+
+def hasher_settings(name):
+    """PASSWORD_HASHERS проекта, где первым стоит хэшер name."""
+    primary = HASHERS[name]
+    return [primary, *(path for path in settings.PASSWORD_HASHERS if path != primary)]
+
+
+def _post(client, path, body, index):
+    started = time.perf_counter()
+    response = client.post(path, json.dumps(body), content_type="application/json",
+                           REMOTE_ADDR=f"10.{index >> 16 & 255}.{index >> 8 & 255}.{index & 255}")
+    return response.status_code, (time.perf_counter() - started) * 1000
+
+
+def run_hasher(name, requests=20):
+    """Стоимость хэша и метрики login/register при основном хэшере name."""
+    with override_settings(PASSWORD_HASHERS=hasher_settings(name)):
+        hasher = get_hasher()
+        samples = []
+        for _ in range(5):
+            started = time.perf_counter()
+            make_password(PASSWORD)
+            samples.append((time.perf_counter() - started) * 1000)
+
+        client = Client()
+        User.objects.filter(username__startswith=f"bench-{name}-").delete()
+        User.objects.create_user(username=f"bench-{name}-login", password=PASSWORD)
+        report = {"algorithm": hasher.algorithm, "hash_ms": statistics.median(samples)}
+        for action, body in (
+            ("login", lambda i: {"username": f"bench-{name}-login", "password": PASSWORD}),
+            ("register", lambda i: {"username": f"bench-{name}-{i}", "password": PASSWORD}),
+        ):
+            started = time.perf_counter()
+            results = [_post(client, f"/api/auth/{action}", body(i), i) for i in range(requests)]
+            elapsed = time.perf_counter() - started
+            report[action] = {
+                **summarize([ms for _, ms in results], elapsed),
+                "errors": sum(1 for status, _ in results if status != 200),
+            }
+        return report
+
+
+def run_password_benchmark(requests=20, hashers=("scrypt", "pbkdf2")):
+    """{хэшер: метрики}; хэшер без установленной библиотеки (argon2-cffi) - {"error": ...}."""
+    report = {}
+    for name in hashers:
+        try:
+            report[name] = run_hasher(name, requests)
+        except ValueError as e:
+            # load_library хэшера: нет argon2-cffi
+            report[name] = {"error": str(e)}
+    return report
@@ -0,0 +1,100 @@
+import json
+import math
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+
+from ..routers.http_cache import bump_catalogue_version
+from .endpoints import build_request
+
+TRANSACTION_STATEMENTS = ("BEGIN", "COMMIT", "ROLLBACK", "SAVEPOINT", "RELEASE")
+
+
+@contextmanager
+def temporary_database(on_disk=False):
+    """
+    Создать отдельную тестовую БД (с миграциями), чтобы не трогать рабочую. on_disk - SQLite
+    во временном файле, а не в памяти: нужен для параллельной записи из нескольких соединений.
+    """
+    setup_test_environment()
+    old_name = connection.settings_dict["NAME"]
+    old_test = dict(connection.settings_dict["TEST"])
+    directory = None
+    if on_disk and connection.vendor == "sqlite":
+        directory = tempfile.TemporaryDirectory()
+        connection.settings_dict["TEST"]["NAME"] = os.path.join(directory.name, "bench.sqlite3")
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        connection.settings_dict["TEST"] = old_test
+        if directory is not None:
+            directory.cleanup()
+        teardown_test_environment()
+
+
+def percentile(values, p):
+    """Перцентиль методом ближайшего ранга."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+def call(client, endpoint, context):
+    """Выполнить запрос; изменяющие запросы откатываются, чтобы данные не менялись между итерациями."""
+    method, path, body, headers = build_request(endpoint, context)
+    kwargs = dict(headers)
+    if body is not None:
+        kwargs.update(data=json.dumps(body), content_type="application/json")
+    with transaction.atomic():
+        response = getattr(client, method)(path, **kwargs)
+        if method != "get":
+            transaction.set_rollback(True)
+    return response
+
+
+def explain(sql):
+    prefix = "EXPLAIN QUERY PLAN " if connection.vendor == "sqlite" else "EXPLAIN "
+    with connection.cursor() as cursor:
+        cursor.execute(prefix + sql)
+        return [str(row[-1]) for row in cursor.fetchall()]
+
+
+def profile_endpoint(endpoint, context, iterations=10, with_plans=True, client=None):
+    client = client or Client()
+    call(client, endpoint, context)  # прогрев кэшей токенов и ролей
+
+    # новая версия каталога: HTTP-кэш промахнётся и запросы к БД попадут в отчёт
+    bump_catalogue_version()
+    with CaptureQueriesContext(connection) as ctx:
+        response = call(client, endpoint, context)
+    queries = [q for q in ctx.captured_queries if not q["sql"].startswith(TRANSACTION_STATEMENTS)]
+
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        call(client, endpoint, context)
+        timings.append((time.perf_counter() - started) * 1000)
+
+    result = {
+        "name": endpoint.name,
+        "method": endpoint.method.upper(),
+        "status": response.status_code,
+        "queries": len(queries),
+        "mean_ms": sum(timings) / len(timings),
+        "p50_ms": percentile(timings, 50),
+        "p95_ms": percentile(timings, 95),
+    }
+    if with_plans:
+        result["plans"] = [
+            {"sql": q["sql"], "plan": explain(q["sql"])}
+            for q in queries if q["sql"].lstrip().upper().startswith("SELECT")
+        ]
+    return result
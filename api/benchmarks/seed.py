@@ -0,0 +1,105 @@
+import random
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group, User
+from rest_framework.authtoken.models import Token
+
+from ..aggregates import rebuild_order_stats
+from ..models import Category, ManagerRequest, Order, OrderItem, OrderStatus, Product, WishlistItem
+from ..routers.permissions import MANAGER_GROUP
+from ..search import get_search_backend
+
+BATCH_SIZE = 5000
+
+DEFAULT_SIZES = {
+    "categories": 50,
+    "products": 20000,
+    "users": 500,
+    "wishlist": 10,
+    "orders": 5000,
+    "order_items": 3,
+}
+
+WORDS = ["Samsung", "LG", "Sony", "OLED", "QLED", "4K", "Smart", "Телевизор", "Монитор", "Ноутбук",
+         "Смартфон", "Наушники", "Колонка", "Игровой", "Беспроводной", "Чёрный", "Белый", "Pro", "Mini", "Max"]
+
+
+def _words(rnd, count):
+    return " ".join(rnd.choice(WORDS) for _ in range(count))
+
+
+def seed(sizes=None, seed_value=42):
+    """
+    Наполнить текущую БД синтетическими данными через bulk_create.
+    Возвращает контекст для подстановки в пути эндпоинтов и токены ролей.
+    """
+    sizes = {**DEFAULT_SIZES, **(sizes or {})}
+    rnd = random.Random(seed_value)
+
+    statuses = [OrderStatus.objects.create(name=name) for name in ("Новый", "В обработке", "Завершён")]
+    categories = Category.objects.bulk_create(
+        Category(title=f"Категория {i}", slug=f"category-{i}") for i in range(sizes["categories"])
+    )
+
+    products = []
+    for start in range(0, sizes["products"], BATCH_SIZE):
+        products += Product.objects.bulk_create(
+            Product(
+                title=_words(rnd, 3),
+                category=categories[i % len(categories)],
+                price=Decimal(rnd.randint(100, 300000)),
+                description=_words(rnd, 12),
+            )
+            for i in range(start, min(start + BATCH_SIZE, sizes["products"]))
+        )
+
+    password = make_password("benchmark")
+    users = User.objects.bulk_create(
+        User(username=f"user{i}", password=password, email=f"user{i}@example.com") for i in range(sizes["users"])
+    )
+    customer, manager, staff = users[0], users[1], users[2]
+    Group.objects.create(name=MANAGER_GROUP).user_set.add(manager)
+    staff.is_staff = True
+    staff.save(update_fields=["is_staff"])
+    tokens = {user: Token.objects.create(user=user).key for user in (customer, manager, staff)}
+
+    wishlist = []
+    for user in users:
+        for product in rnd.sample(products, min(sizes["wishlist"], len(products))):
+            wishlist.append(WishlistItem(user=user, product=product, quantity=rnd.randint(1, 3)))
+    WishlistItem.objects.bulk_create(wishlist, batch_size=BATCH_SIZE)
+
+    orders, items = [], []
+    for start in range(0, sizes["orders"], BATCH_SIZE):
+        batch = Order.objects.bulk_create(
+            Order(user=rnd.choice(users), status=rnd.choice(statuses))
+            for _ in range(start, min(start + BATCH_SIZE, sizes["orders"]))
+        )
+        for order in batch:
+            for product in rnd.sample(products, sizes["order_items"]):
+                quantity = rnd.randint(1, 3)
+                items.append(OrderItem(order=order, product=product, quantity=quantity, cost=product.price * quantity))
+        OrderItem.objects.bulk_create(items, batch_size=BATCH_SIZE)
+        orders += batch
+        items = []
+
+    ManagerRequest.objects.bulk_create(ManagerRequest(user=user) for user in users[3:])
+
+    # bulk_create не шлёт сигналы - производные структуры строим целиком
+    rebuild_order_stats()
+    get_search_backend().rebuild()
+
+    return {
+        "tokens": {"customer": tokens[customer], "manager": tokens[manager], "staff": tokens[staff]},
+        "slug": categories[0].slug,
+        "product_id": products[len(products) // 2].id,
+        "wishlist_product_id": WishlistItem.objects.filter(user=customer).values_list("product_id", flat=True).first(),
+        "user_id": customer.id,
+        "order_id": orders[0].id if orders else 0,
+        "status_id": statuses[1].id,
+        "request_id": ManagerRequest.objects.order_by("id").values_list("id", flat=True).first() or 0,
+        "search": "sams tel",
+        "min_price": 1000,
+        "max_price": 5000,
+    }
@@ -0,0 +1,84 @@
+"""
+Замер холодного старта воркера: каждый прогон - новый процесс python, в котором засекаются
+импорт myproject.wsgi/asgi (django.setup, приложения, сигналы) и первые два запроса к пути
+(первый включает загрузку URLconf и роутеров api). cold=True удаляет файл кэша OpenAPI-схемы
+перед каждым прогоном - так видно, сколько стоит сборка схемы без кэша.
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+
+TARGETS = ("wsgi", "asgi")
+
+_SCRIPT = r"""
+import asyncio, json, sys, time
+target, path = sys.argv[1], sys.argv[2]
+started = time.perf_counter()
+module = __import__(f"myproject.{target}", fromlist=["application"])
+application = module.application
+imported = time.perf_counter()
+
+def wsgi_get():
+    from wsgiref.util import setup_testing_defaults
+    environ = {"PATH_INFO": path.split("?")[0], "QUERY_STRING": path.partition("?")[2]}
+    setup_testing_defaults(environ)
+    status = []
+    body = b"".join(application(environ, lambda s, h, e=None: status.append(s)))
+    return int(status[0].split()[0]), len(body)
+
+def asgi_get():
+    async def run():
+        scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+                 "scheme": "http", "path": path.split("?")[0], "raw_path": path.split("?")[0].encode(),
+                 "query_string": path.partition("?")[2].encode(), "root_path": "",
+                 "headers": [(b"host", b"127.0.0.1")], "server": ("127.0.0.1", 80), "client": ("127.0.0.1", 0)}
+        messages, inbox = [], asyncio.Queue()
+        inbox.put_nowait({"type": "http.request", "body": b"", "more_body": False})
+        async def receive():
+            # после тела запроса Django ждёт только http.disconnect - его не будет
+            return await inbox.get()
+        async def send(message):
+            messages.append(message)
+        await application(scope, receive, send)
+        status = next(m["status"] for m in messages if m["type"] == "http.response.start")
+        return status, sum(len(m.get("body", b"")) for m in messages if m["type"] == "http.response.body")
+    return asyncio.run(run())
+
+get = wsgi_get if target == "wsgi" else asgi_get
+status, size = get()
+first = time.perf_counter()
+get()
+second = time.perf_counter()
+print(json.dumps({"status": status, "bytes": size, "import_ms": (imported - started) * 1000,
+                  "first_request_ms": (first - imported) * 1000, "second_request_ms": (second - first) * 1000}))
+"""
+
+
+def run_once(target, path, cold=False):
+    cache_file = getattr(settings, "OPENAPI_SCHEMA", {}).get("CACHE_FILE")
+    if cold and cache_file and os.path.exists(cache_file):
+        os.remove(cache_file)
+    env = {**os.environ, "DJANGO_SETTINGS_MODULE": os.environ.get("DJANGO_SETTINGS_MODULE", "myproject.settings")}
+    result = subprocess.run(
+        [sys.executable, "-c", _SCRIPT, target, path],
+        cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, check=False,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"{target} {path}: процесс завершился с ошибкой\n{result.stderr[-2000:]}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def measure_startup(target, path, runs=5, cold=False):
+    """Медианы по runs прогонам: импорт, первый и второй запрос, время до первого ответа."""
+    samples = [run_once(target, path, cold) for _ in range(runs)]
+    report = {"status": samples[-1]["status"], "runs": runs}
+    for field in ("import_ms", "first_request_ms", "second_request_ms"):
+        report[field] = statistics.median(sample[field] for sample in samples)
+    report["time_to_first_response_ms"] = statistics.median(
+        sample["import_ms"] + sample["first_request_ms"] for sample in samples
+    )
+    return report
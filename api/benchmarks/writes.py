@@ -0,0 +1,126 @@
+"""
+Конкурентная запись через WSGI-сервер: каждый поток - свой покупатель, который добавляет товары
+в вишлист (POST /api/wishlist/) и оформляет заказ (POST /api/orders/). Прогон идёт в двух режимах
+соединений: tuned - настройки проекта (WAL, busy_timeout, BEGIN IMMEDIATE, постоянные соединения),
+default - SQLite по умолчанию. Ошибки 5xx - в основном "database is locked".
+"""
+import http.client
+import json
+import logging
+import random
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection, connections
+from django.test.utils import override_settings
+from rest_framework.authtoken.models import Token
+
+from ..models import Order, Product
+from .load import serve, summarize
+
+MODES = ("default", "tuned")
+
+
+@contextmanager
+def connection_mode(mode):
+    """
+    tuned: PRAGMA проекта плюс WAL (по умолчанию не включается - меняет файл БД, а здесь БД временная).
+    default: без PRAGMA из DATABASE_TUNING, BEGIN DEFERRED, журнал DELETE, соединение на запрос.
+    """
+    if mode == "tuned":
+        tuning = getattr(settings, "DATABASE_TUNING", {})
+        pragmas = {"journal_mode": "WAL", **tuning.get("SQLITE_PRAGMAS", {})}
+        connections.close_all()
+        try:
+            with override_settings(DATABASE_TUNING={**tuning, "SQLITE_PRAGMAS": pragmas}):
+                yield
+        finally:
+            connections.close_all()
+        return
+    settings_dict = connection.settings_dict
+    saved = settings_dict["CONN_MAX_AGE"], dict(settings_dict["OPTIONS"])
+    settings_dict["CONN_MAX_AGE"] = 0
+    settings_dict["OPTIONS"].pop("transaction_mode", None)
+    connections.close_all()
+    try:
+        with override_settings(DATABASE_TUNING={"ENABLED": False}):
+            if connection.vendor == "sqlite":
+                with connection.cursor() as cursor:
+                    # WAL сохраняется в файле БД - возвращаем журнал по умолчанию явно
+                    cursor.execute("PRAGMA journal_mode = DELETE")
+            yield
+    finally:
+        settings_dict["CONN_MAX_AGE"], settings_dict["OPTIONS"] = saved
+        connections.close_all()
+
+
+def customer_tokens(count):
+    """Токены для count покупателей (пользователи без ролей из seed)."""
+    users = list(User.objects.filter(is_staff=False, groups=None).order_by("id")[3:3 + count])
+    existing = dict(Token.objects.filter(user__in=users).values_list("user_id", "key"))
+    missing = [Token(user=user, key=Token.generate_key()) for user in users if user.id not in existing]
+    Token.objects.bulk_create(missing)
+    keys = {**existing, **{token.user_id: token.key for token in missing}}
+    return [keys[user.id] for user in users]
+
+
+def run_writes(address, tokens, product_ids, rounds=5, items_per_order=3, seed_value=42):
+    """concurrency = len(tokens) покупателей параллельно; каждый делает rounds оформлений."""
+    def customer(token):
+        rnd = random.Random(f"{seed_value}:{token}")
+        conn = None
+        results = []
+        headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+
+        def request(method, path, body=None):
+            nonlocal conn
+            conn = conn or http.client.HTTPConnection(*address, timeout=60)
+            started = time.perf_counter()
+            conn.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            results.append((response.status, (time.perf_counter() - started) * 1000))
+            if response.will_close:
+                conn.close()
+                conn = None
+
+        for _ in range(rounds):
+            for product_id in rnd.sample(product_ids, items_per_order):
+                request("POST", "/api/wishlist/", {"product_id": product_id, "quantity": 1})
+            request("POST", "/api/orders/")
+        return results
+
+    with ThreadPoolExecutor(max_workers=len(tokens)) as pool:
+        started = time.perf_counter()
+        results = [r for batch in pool.map(customer, tokens) for r in batch]
+        elapsed = time.perf_counter() - started
+    statuses = Counter(status for status, _ in results)
+    return {
+        **summarize([ms for _, ms in results], elapsed),
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+        "errors": sum(count for status, count in statuses.items() if status >= 500),
+    }
+
+
+def run_write_benchmark(concurrency=8, rounds=5, items_per_order=3, modes=MODES):
+    """{режим: метрики} для текущей (временной) БД, наполненной seed()."""
+    tokens = customer_tokens(concurrency)
+    product_ids = list(Product.objects.order_by("id").values_list("id", flat=True)[:1000])
+    report = {}
+    # 500 от заблокированной БД - ожидаемый результат замера, а не шум в выводе (ninja пишет в "django")
+    django_logger = logging.getLogger("django")
+    level = django_logger.level
+    django_logger.setLevel(logging.CRITICAL)
+    try:
+        for mode in modes:
+            orders_before = Order.objects.count()
+            with connection_mode(mode), serve("wsgi") as address:
+                report[mode] = run_writes(address, tokens, product_ids, rounds, items_per_order)
+            report[mode]["orders_created"] = Order.objects.count() - orders_before
+    finally:
+        django_logger.setLevel(level)
+    return report
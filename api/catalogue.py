@@ -0,0 +1,228 @@
+"""
+Снимок каталога в памяти процесса (CATALOGUE_SNAPSHOT['ENABLED']): категории и товары в записях
+со __slots__, индексы по slug, категории и цене. Публичные чтения каталога (list_categories,
+get_category, get_products_in_category, get_product и list_products без текстового поиска)
+отдаются из снимка без SQL.
+
+Актуальность - по версии каталога из http_cache: каждое изменение Category/Product её меняет после
+коммита, снимок читается из default, поэтому под версией никогда не оказываются незафиксированные
+или отставшие строки. Воркер, в котором прошло изменение, применяет его к снимку после коммита (signals.py); остальные
+видят новую версию и перечитывают каталог целиком. Снимок неизменяемый: изменение собирает новый
+объект и подменяет ссылку, читатели не берут блокировок.
+"""
+import math
+import threading
+from bisect import bisect_left, bisect_right
+from decimal import Decimal, InvalidOperation
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import Http404
+from ninja.errors import HttpError
+
+from .models import Category, Product
+from .routers.http_cache import catalogue_version
+
+
+def _config():
+    return getattr(settings, "CATALOGUE_SNAPSHOT", {})
+
+
+class CategoryRecord:
+    __slots__ = ("id", "title", "slug")
+
+    def __init__(self, id, title, slug):
+        self.id, self.title, self.slug = id, title, slug
+
+    def render(self):
+        return {"id": self.id, "title": self.title, "slug": self.slug}
+
+
+class ProductRecord:
+    __slots__ = ("id", "title", "category_id", "description", "price")
+
+    def __init__(self, id, title, category_id, description, price):
+        self.id, self.title, self.category_id, self.description, self.price = id, title, category_id, description, price
+
+
+# значения ключей курсора приходят из JSON строками/числами - приводим к типам полей
+_KEY_TYPES = {"id": int, "price": Decimal}
+
+
+class SnapshotRows:
+    """
+    Выборка для KeysetPagination: items[lo:hi] отсортированы по возрастанию keys; ordering - порядок
+    страницы как у SQL-пути (курсоры взаимозаменяемы), descending - ordering убывающий.
+    """
+    __slots__ = ("keys", "items", "ordering", "descending", "lo", "hi", "render")
+
+    def __init__(self, keys, items, ordering, render, lo=0, hi=None):
+        self.keys, self.items, self.ordering, self.render = keys, items, ordering, render
+        self.descending = ordering[0].startswith("-")
+        self.lo, self.hi = lo, len(items) if hi is None else hi
+
+    def parse_key(self, values):
+        try:
+            return tuple(_KEY_TYPES[f.lstrip("-")](str(v)) for f, v in zip(self.ordering, values))
+        except (ValueError, InvalidOperation):
+            raise HttpError(400, "Некорректный курсор")
+
+
+class Snapshot:
+    __slots__ = ("version", "categories", "by_slug", "category_index", "products", "by_category", "id_keys",
+                 "id_items", "price_keys", "price_items")
+
+    def __init__(self, version, categories, products):
+        self.version = version
+        self.categories = categories
+        self.by_slug = {c.slug: c for c in categories.values()}
+        category_ids = sorted(categories)
+        self.category_index = ([(i,) for i in category_ids], [categories[i] for i in category_ids])
+        self.products = products
+        # ключи сортировки и записи в том же порядке: по id и по (цена, id)
+        ids = sorted(products)
+        self.id_keys, self.id_items = [(i,) for i in ids], [products[i] for i in ids]
+        self.price_keys = sorted((p.price, p.id) for p in products.values())
+        self.price_items = [products[product_id] for _, product_id in self.price_keys]
+        self.by_category = {}
+        for product in self.id_items:
+            self.by_category.setdefault(product.category_id, []).append(product)
+
+    @classmethod
+    def load(cls, version):
+        # только из default: отставшая реплика (@read_replica у get_category) дала бы старые строки
+        # под новой версией, и снимок отдавал бы их до следующего изменения каталога
+        categories = {
+            row[0]: CategoryRecord(*row) for row in Category.objects.using("default").values_list("id", "title", "slug")
+        }
+        products = {
+            row[0]: ProductRecord(*row)
+            for row in Product.objects.using("default").values_list("id", "title", "category_id", "description", "price")
+        }
+        return cls(version, categories, products)
+
+    def replace(self, version, model, record_id, record):
+        """Новый снимок с заменённой (record=None - удалённой) записью; индексы строятся заново в памяти."""
+        categories, products = dict(self.categories), dict(self.products)
+        target = categories if model is Category else products
+        target.pop(record_id, None)
+        if record is not None:
+            target[record_id] = record
+        if model is Category and record is None:
+            # товары удалённой категории уйдут каскадом отдельными сигналами - не показываем их и до этого
+            products = {pk: p for pk, p in products.items() if p.category_id != record_id}
+        return Snapshot(version, categories, products)
+
+    def render_product(self, product):
+        return {
+            "id": product.id,
+            "title": product.title,
+            "category_id": product.category_id,
+            "description": product.description,
+            "price": float(product.price),
+            "category": self.categories[product.category_id].render(),
+        }
+
+    def get_category(self, slug):
+        category = self.by_slug.get(slug)
+        if category is None:
+            raise Http404
+        return category.render()
+
+    def get_product(self, product_id):
+        product = self.products.get(product_id)
+        if product is None:
+            raise Http404
+        return self.render_product(product)
+
+    def category_products(self, slug):
+        category = self.by_slug.get(slug)
+        if category is None:
+            raise Http404
+        return [self.render_product(p) for p in self.by_category.get(category.id, [])]
+
+    def category_rows(self):
+        keys, items = self.category_index
+        return SnapshotRows(keys, items, ("id",), CategoryRecord.render)
+
+    def product_rows(self, min_price=None, max_price=None, order_by="id"):
+        """Товары в диапазоне цен в порядке order_by ("id", "price" или "-price")."""
+        lo, hi = 0, len(self.price_keys)
+        if min_price is not None:
+            # (цена,) меньше любого (цена, id)
+            lo = bisect_left(self.price_keys, (Decimal(str(min_price)),))
+        if max_price is not None:
+            hi = bisect_right(self.price_keys, (Decimal(str(max_price)), math.inf))
+        if order_by != "id":
+            ordering = ("price", "id") if order_by == "price" else ("-price", "-id")
+            return SnapshotRows(self.price_keys, self.price_items, ordering, self.render_product, lo, hi)
+        if min_price is None and max_price is None:
+            return SnapshotRows(self.id_keys, self.id_items, ("id",), self.render_product)
+        items = sorted(self.price_items[lo:hi], key=lambda p: p.id)
+        return SnapshotRows([(p.id,) for p in items], items, ("id",), self.render_product)
+
+
+class CatalogueSnapshot:
+    def __init__(self):
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self.loads = self.applied = 0
+
+    @property
+    def enabled(self):
+        return _config().get("ENABLED", False)
+
+    def get(self):
+        snapshot = self._snapshot
+        version = catalogue_version()[0]
+        if snapshot is not None and snapshot.version == version:
+            return snapshot
+        snapshot = Snapshot.load(version)
+        with self._lock:
+            self._snapshot = snapshot
+            self.loads += 1
+        return snapshot
+
+    async def aget(self):
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == catalogue_version()[0]:
+            return snapshot
+        return await sync_to_async(self.get)()
+
+    def change(self, instance, deleted):
+        """
+        Изменение Category/Product для снимка: (модель, id, запись или None для удаления).
+        Запись собирается сразу - после delete() Django обнулит pk. None - снимок не используется.
+        """
+        if not self.enabled or self._snapshot is None:
+            return None
+        model = type(instance)
+        if deleted:
+            record = None
+        elif model is Category:
+            record = CategoryRecord(instance.id, instance.title, instance.slug)
+        else:
+            record = ProductRecord(instance.id, instance.title, instance.category_id, instance.description,
+                                   Decimal(str(instance.price)).quantize(Decimal("0.01")))
+        return model, instance.pk, record
+
+    def apply(self, change, previous, current):
+        """Применить изменение после коммита, когда версия каталога сменилась с previous на current."""
+        model, record_id, record = change
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None:
+                return
+            if snapshot.version != previous:
+                # снимок уже перечитан или каталог менялся в другом воркере - перечитаем при следующем чтении
+                self._snapshot = None
+                return
+            self._snapshot = snapshot.replace(current, model, record_id, record)
+            self.applied += 1
+
+    def clear(self):
+        with self._lock:
+            self._snapshot = None
+
+
+catalogue_snapshot = CatalogueSnapshot()
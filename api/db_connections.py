@@ -0,0 +1,99 @@
+"""
+Настройка соединений с БД. Постоянные соединения задаются в DATABASES (CONN_MAX_AGE,
+CONN_HEALTH_CHECKS - проверка соединения перед переиспользованием); новое соединение SQLite
+при создании (connection_created, см. signals.py) получает PRAGMA из DATABASE_TUNING:
+synchronous=NORMAL, mmap и busy_timeout. journal_mode=WAL - свойство файла, а не соединения:
+он переписывает заголовок БД, поэтому по умолчанию не ставится (иначе любая команда manage.py
+меняет db.sqlite3 из репозитория); на боевой БД его включают через SQLITE_PRAGMAS. connection_stats() - статистика соединений воркера
+для /api/admin/db-connections.
+"""
+import threading
+import time
+import weakref
+from collections import Counter
+
+from django.conf import settings
+from django.db import connections
+
+DEFAULT_SQLITE_PRAGMAS = {
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,
+    "mmap_size": 134217728,
+}
+
+
+def _config():
+    return getattr(settings, "DATABASE_TUNING", {})
+
+
+class ConnectionStats:
+    """Сколько соединений открыл процесс и сколько из них живы сейчас (по потокам)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.opened = Counter()
+        self._live = weakref.WeakSet()
+        self._opened_at = weakref.WeakKeyDictionary()
+
+    def record(self, connection):
+        with self._lock:
+            self.opened[connection.alias] += 1
+            self._live.add(connection)
+            self._opened_at[connection] = time.monotonic()
+
+    def live(self, alias):
+        with self._lock:
+            wrappers = [c for c in self._live if c.alias == alias and c.connection is not None]
+            ages = [time.monotonic() - self._opened_at[c] for c in wrappers if c in self._opened_at]
+        return len(wrappers), max(ages, default=0.0)
+
+
+connection_stats_registry = ConnectionStats()
+
+
+def configure_connection(connection):
+    """Обработчик connection_created: PRAGMA для SQLite и учёт открытых соединений."""
+    connection_stats_registry.record(connection)
+    if connection.vendor != "sqlite" or not _config().get("ENABLED", True):
+        return
+    pragmas = {**DEFAULT_SQLITE_PRAGMAS, **_config().get("SQLITE_PRAGMAS", {})}
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+
+
+def _sqlite_pragmas(connection):
+    names = {**DEFAULT_SQLITE_PRAGMAS, **_config().get("SQLITE_PRAGMAS", {})}
+    values = {}
+    with connection.cursor() as cursor:
+        for name in names:
+            cursor.execute(f"PRAGMA {name}")
+            row = cursor.fetchone()
+            values[name] = row[0] if row else None
+    return values
+
+
+def connection_stats():
+    """По алиасам: настройки постоянных соединений, открытые соединения, PRAGMA и статистика пула."""
+    stats = {}
+    for alias in connections:
+        connection = connections[alias]
+        live, oldest = connection_stats_registry.live(alias)
+        item = {
+            "vendor": connection.vendor,
+            "conn_max_age": connection.settings_dict.get("CONN_MAX_AGE"),
+            "health_checks": connection.settings_dict.get("CONN_HEALTH_CHECKS"),
+            "opened": connection_stats_registry.opened[alias],
+            "live": live,
+            "oldest_age_s": round(oldest, 1),
+        }
+        if connection.connection is not None:
+            item["usable"] = connection.is_usable()
+            if connection.vendor == "sqlite":
+                item["pragmas"] = _sqlite_pragmas(connection)
+        pool = getattr(connection, "pool", None)
+        if pool is not None:
+            # встроенный пул psycopg (OPTIONS['pool'] у PostgreSQL)
+            item["pool"] = pool.get_stats()
+        stats[alias] = item
+    return stats
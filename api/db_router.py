@@ -0,0 +1,142 @@
+"""
+Чтение с реплик. Обработчики, помеченные @read_replica, читают с одной из реплик
+DATABASE_ROUTING['REPLICAS']; всё остальное и любые записи идут в default.
+
+Read-your-writes: ReplicaRouterMiddleware замечает, что запрос что-то записал, и на
+PIN_SECONDS закрепляет пользователя за default - его следующие чтения не увидят отставшую реплику.
+Запрос, который уже писал, до конца читает из default.
+"""
+import inspect
+import random
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+
+_state = ContextVar("db_routing_state", default=None)
+
+
+def _config():
+    return getattr(settings, "DATABASE_ROUTING", {})
+
+
+class RoutingState:
+    """Состояние маршрутизации текущего запроса; общий объект виден и в потоках sync_to_async."""
+    __slots__ = ("replica", "wrote")
+
+    def __init__(self):
+        self.replica = None
+        self.wrote = False
+
+
+def _pin_key(user_id):
+    return f"db-router:pin:{user_id}"
+
+
+def _pin_cache():
+    return caches[_config().get("PIN_CACHE", "default")]
+
+
+def pin_to_primary(user_id):
+    _pin_cache().set(_pin_key(user_id), True, _config().get("PIN_SECONDS", 5))
+
+
+def is_pinned(user_id):
+    return bool(_pin_cache().get(_pin_key(user_id)))
+
+
+class ReplicaRouter:
+    """DATABASE_ROUTERS: чтения помеченных обработчиков - на реплику, записи и миграции - в default."""
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or state.wrote:
+            return DEFAULT_DB_ALIAS
+        return state.replica or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *_config().get("REPLICAS", ())}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # реплика - копия default (sync_replica или репликация СУБД), схему в неё не накатываем
+        if db in _config().get("REPLICAS", ()):
+            return False
+        return None
+
+
+def _choose_replica(request):
+    replicas = _config().get("REPLICAS", ())
+    state = _state.get()
+    if not replicas or state is None or state.wrote:
+        return
+    user = getattr(request, "auth", None)
+    if getattr(user, "pk", None) is not None and is_pinned(user.pk):
+        return
+    state.replica = random.choice(replicas)
+
+
+def read_replica(view_func):
+    """Обработчик только читает: его запросы (включая пагинацию и сериализацию) уходят на реплику."""
+    if inspect.iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def async_wrapper(request, *args, **kwargs):
+            _choose_replica(request)
+            return await view_func(request, *args, **kwargs)
+
+        return async_wrapper
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        _choose_replica(request)
+        return view_func(request, *args, **kwargs)
+
+    return wrapper
+
+
+class ReplicaRouterMiddleware:
+    """Заводит состояние маршрутизации на запрос; после записи закрепляет пользователя за default."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    @staticmethod
+    def _finish(request, state):
+        user = getattr(request, "auth", None)
+        if state.wrote and getattr(user, "pk", None) is not None:
+            pin_to_primary(user.pk)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = RoutingState()
+        token = _state.set(state)
+        try:
+            return self.get_response(request)
+        finally:
+            _state.reset(token)
+            self._finish(request, state)
+
+    async def __acall__(self, request):
+        state = RoutingState()
+        token = _state.set(state)
+        try:
+            return await self.get_response(request)
+        finally:
+            _state.reset(token)
+            self._finish(request, state)
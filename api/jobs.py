@@ -0,0 +1,169 @@
+"""
+Очередь фоновых задач в таблице Job. Задача - функция, зарегистрированная @task; enqueue()
+ставит её в очередь, enqueue_on_commit() - после фиксации текущей транзакции (при откате
+задача не появится). Воркер (manage.py run_jobs) забирает готовые задачи условным UPDATE,
+поэтому одну задачу не выполнят два воркера; упавшая задача повторяется с экспоненциальной
+задержкой до max_attempts, после чего остаётся в статусе failed с текстом ошибки.
+
+Задачи должны быть идемпотентными: воркер, упавший посреди задачи, вернёт её в очередь
+по истечении LOCK_TIMEOUT.
+"""
+import logging
+import os
+import random
+import socket
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import timedelta
+from itertools import repeat
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+_config = getattr(settings, "JOB_QUEUE", {})
+MAX_ATTEMPTS = _config.get("MAX_ATTEMPTS", 5)
+BACKOFF_SECONDS = _config.get("BACKOFF_SECONDS", 2)
+BACKOFF_MAX = _config.get("BACKOFF_MAX", 300)
+LOCK_TIMEOUT = _config.get("LOCK_TIMEOUT", 600)
+
+TASKS = {}
+
+
+def task(name=None, max_attempts=None):
+    """Зарегистрировать функцию как задачу; аргументы задачи - JSON-сериализуемые kwargs."""
+    def register(func):
+        task_name = name or f"{func.__module__}.{func.__qualname__}"
+        TASKS[task_name] = func
+        func.task_name = task_name
+        func.max_attempts = max_attempts or MAX_ATTEMPTS
+        return func
+
+    return register
+
+
+def _task_name(func_or_name):
+    name = getattr(func_or_name, "task_name", func_or_name)
+    if name not in TASKS:
+        raise ValueError(f"Задача {name} не зарегистрирована")
+    return name
+
+
+def enqueue(func_or_name, key=None, delay=0, **payload):
+    """Поставить задачу; с key повторная постановка возвращает уже существующую задачу."""
+    name = _task_name(func_or_name)
+    fields = {
+        "name": name,
+        "payload": payload,
+        "max_attempts": TASKS[name].max_attempts,
+        "run_at": timezone.now() + timedelta(seconds=delay),
+    }
+    if key is None:
+        return Job.objects.create(**fields)
+    try:
+        with transaction.atomic():
+            return Job.objects.create(idempotency_key=key, **fields)
+    except IntegrityError:
+        return Job.objects.get(idempotency_key=key)
+
+
+def enqueue_on_commit(func_or_name, key=None, delay=0, **payload):
+    """enqueue после коммита текущей транзакции; вне транзакции - сразу."""
+    _task_name(func_or_name)
+    transaction.on_commit(lambda: enqueue(func_or_name, key=key, delay=delay, **payload))
+
+
+def backoff(attempts):
+    """Задержка перед повтором: BACKOFF_SECONDS * 2^(attempts-1) с разбросом, не больше BACKOFF_MAX."""
+    delay = min(BACKOFF_SECONDS * 2 ** (attempts - 1), BACKOFF_MAX)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def claim(worker_id, limit=10):
+    """Забрать до limit готовых задач. Задачи running с истёкшей блокировкой считаются брошенными."""
+    now = timezone.now()
+    ready = Q(status=Job.PENDING, run_at__lte=now) | Q(
+        status=Job.RUNNING, locked_at__lt=now - timedelta(seconds=LOCK_TIMEOUT)
+    )
+    candidates = list(Job.objects.filter(ready).order_by("run_at").values_list("id", "status", "locked_at")[:limit])
+    claimed = []
+    for job_id, status, locked_at in candidates:
+        # условный UPDATE: если задачу уже забрал другой воркер, строка не совпадёт
+        if Job.objects.filter(id=job_id, status=status, locked_at=locked_at).update(
+            status=Job.RUNNING, locked_by=worker_id, locked_at=now
+        ):
+            claimed.append(job_id)
+    return claimed
+
+
+def execute(job_id, worker_id):
+    """
+    Выполнить забранную worker_id задачу и записать результат; возвращает итоговый статус или None,
+    если задачу за это время (после LOCK_TIMEOUT) забрал другой воркер - тогда результат не пишется.
+    """
+    close_old_connections()
+    job = Job.objects.get(id=job_id)
+    func = TASKS.get(job.name)
+    fields = {}
+    try:
+        if func is None:
+            raise LookupError(f"Задача {job.name} не зарегистрирована")
+        func(**job.payload)
+    except Exception:
+        fields["last_error"] = traceback.format_exc()[-4000:]
+        if job.attempts + 1 >= job.max_attempts or func is None:
+            fields.update(status=Job.FAILED, finished_at=timezone.now())
+            logger.exception("Задача %s #%s не выполнена", job.name, job.id)
+        else:
+            fields.update(status=Job.PENDING, run_at=timezone.now() + timedelta(seconds=backoff(job.attempts + 1)))
+    else:
+        fields.update(status=Job.DONE, finished_at=timezone.now(), last_error="")
+    # условная запись, как в claim(): блокировка ещё наша, иначе результат перезаписал бы новый воркер
+    if not Job.objects.filter(id=job.id, status=Job.RUNNING, locked_by=worker_id, locked_at=job.locked_at).update(
+        attempts=F("attempts") + 1, locked_by="", locked_at=None, **fields
+    ):
+        logger.warning("Задача %s #%s: блокировку забрал другой воркер, результат не записан", job.name, job.id)
+        return None
+    return fields["status"]
+
+
+def run_worker(concurrency=1, pool="thread", once=False, poll_interval=1.0, batch=None, stop=None):
+    """
+    Цикл воркера: забрать пачку задач и выполнить её в пуле потоков или процессов.
+    once - выйти, когда готовых задач не осталось. Возвращает число выполненных задач.
+    """
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    batch = batch or concurrency * 2
+    if pool == "process":
+        # дочерние процессы не должны делить с родителем открытые соединения с БД
+        connections.close_all()
+        executor = ProcessPoolExecutor(max_workers=concurrency, initializer=connections.close_all)
+    else:
+        executor = ThreadPoolExecutor(max_workers=concurrency)
+    processed = 0
+    with executor:
+        while stop is None or not stop():
+            job_ids = claim(worker_id, batch)
+            if not job_ids:
+                if once:
+                    break
+                time.sleep(poll_interval)
+                continue
+            if pool == "process":
+                connections.close_all()
+            processed += sum(1 for _ in executor.map(_execute_in_worker, job_ids, repeat(worker_id)))
+    return processed
+
+
+def _execute_in_worker(job_id, worker_id):
+    try:
+        return execute(job_id, worker_id)
+    finally:
+        # поток пула живёт долго: соединение закрываем, как в конце запроса
+        connections.close_all()
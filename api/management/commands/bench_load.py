@@ -0,0 +1,67 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.benchmarks.endpoints import ENDPOINTS
+from api.benchmarks.load import SERVERS, compare, run_load
+from api.benchmarks.runner import temporary_database
+from api.benchmarks.seed import DEFAULT_SIZES, seed
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагрузочный прогон всех эндпоинтов api во временной БД: через тестовый клиент и "
+        "WSGI/ASGI-сервер, с p50/p95/p99, RPS и числом запросов; сравнение с baseline"
+    )
+
+    def add_arguments(self, parser):
+        for name, default in DEFAULT_SIZES.items():
+            parser.add_argument(f"--{name.replace('_', '-')}", type=int, default=default, dest=name)
+        parser.add_argument("--requests", type=int, default=100, help="Запросов на эндпоинт")
+        parser.add_argument("--concurrency", type=int, default=4, help="Параллельных клиентов для сервера")
+        parser.add_argument("--server", action="append", choices=SERVERS,
+                            help="Сервер для прогона (можно несколько раз); по умолчанию wsgi")
+        parser.add_argument("--only", action="append", help="Имя эндпоинта (можно несколько раз)")
+        parser.add_argument("--output", help="Сохранить отчёт в JSON (его можно использовать как baseline)")
+        parser.add_argument("--baseline", help="JSON предыдущего прогона: при регрессии команда завершится ошибкой")
+        parser.add_argument("--tolerance", type=float, default=0.2, help="Допустимое ухудшение p95/RPS (доля)")
+
+    def handle(self, *args, **options):
+        endpoints = [e for e in ENDPOINTS if not options["only"] or e.name in options["only"]]
+        if not endpoints:
+            raise CommandError("Нет эндпоинтов с такими именами")
+        baseline = None
+        if options["baseline"]:
+            with open(options["baseline"], encoding="utf-8") as f:
+                baseline = json.load(f)
+
+        sizes = {name: options[name] for name in DEFAULT_SIZES}
+        with temporary_database():
+            self.stdout.write(f"Наполнение БД: {sizes}")
+            context = seed(sizes)
+            try:
+                report = run_load(endpoints, context, options["requests"], options["concurrency"],
+                                  options["server"] or ["wsgi"])
+            except RuntimeError as e:
+                raise CommandError(str(e))
+
+        for mode, results in report.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(mode))
+            for name, r in results.items():
+                self.stdout.write(
+                    f"  {name:<32} {r['status']:>3}  queries={r['queries']:<3} rps={r['rps']:8.1f} "
+                    f"p50={r['p50_ms']:7.2f}ms p95={r['p95_ms']:7.2f}ms p99={r['p99_ms']:7.2f}ms"
+                )
+
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as f:
+                json.dump({"sizes": sizes, **report}, f, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Отчёт сохранён в {options['output']}"))
+
+        if baseline is not None:
+            if baseline.get("sizes") != sizes:
+                self.stdout.write(self.style.WARNING("Размеры данных отличаются от baseline"))
+            regressions = compare(report, baseline, options["tolerance"])
+            if regressions:
+                raise CommandError("Регрессии относительно baseline:\n" + "\n".join(regressions))
+            self.stdout.write(self.style.SUCCESS("Регрессий относительно baseline нет"))
@@ -0,0 +1,36 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from api.benchmarks.passwords import HASHERS, run_password_benchmark
+from api.benchmarks.runner import temporary_database
+
+
+class Command(BaseCommand):
+    help = "Вход и регистрация на одно ядро при разных хэшерах паролей (во временной БД)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=20, help="Запросов на действие и хэшер")
+        parser.add_argument("--hasher", action="append", choices=list(HASHERS),
+                            help="Хэшер (можно несколько раз); по умолчанию scrypt и pbkdf2")
+        parser.add_argument("--output", help="Сохранить отчёт в JSON")
+
+    def handle(self, *args, **options):
+        with temporary_database():
+            report = run_password_benchmark(options["requests"], options["hasher"] or ("scrypt", "pbkdf2"))
+
+        for name, r in report.items():
+            if "error" in r:
+                self.stdout.write(f"{name:<7} {r['error']}")
+                continue
+            for action in ("login", "register"):
+                a = r[action]
+                self.stdout.write(
+                    f"{name:<7} {action:<9} hash={r['hash_ms']:7.1f}ms rps/core={a['rps']:6.1f} "
+                    f"p50={a['p50_ms']:7.1f}ms p95={a['p95_ms']:7.1f}ms errors={a['errors']}"
+                )
+
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Отчёт сохранён в {options['output']}"))
@@ -0,0 +1,49 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.benchmarks.endpoints import ENDPOINTS
+from api.benchmarks.runner import profile_endpoint, temporary_database
+from api.benchmarks.seed import DEFAULT_SIZES, seed
+
+
+class Command(BaseCommand):
+    help = (
+        "Наполнить временную БД синтетическими данными и для каждого эндпоинта api "
+        "записать число SQL-запросов, время ответа и EXPLAIN QUERY PLAN"
+    )
+
+    def add_arguments(self, parser):
+        for name, default in DEFAULT_SIZES.items():
+            parser.add_argument(f"--{name.replace('_', '-')}", type=int, default=default, dest=name)
+        parser.add_argument("--iterations", type=int, default=10)
+        parser.add_argument("--only", action="append", help="Имя эндпоинта (можно несколько раз)")
+        parser.add_argument("--output", help="Файл для JSON-отчёта")
+        parser.add_argument("--show-plans", action="store_true", help="Вывести планы запросов")
+
+    def handle(self, *args, **options):
+        endpoints = [e for e in ENDPOINTS if not options["only"] or e.name in options["only"]]
+        if not endpoints:
+            raise CommandError("Нет эндпоинтов с такими именами")
+
+        sizes = {name: options[name] for name in DEFAULT_SIZES}
+        with temporary_database():
+            self.stdout.write(f"Наполнение БД: {sizes}")
+            context = seed(sizes)
+            results = [profile_endpoint(e, context, options["iterations"]) for e in endpoints]
+
+        for r in results:
+            self.stdout.write(
+                f"{r['name']:<32} {r['method']:<6} {r['status']:>3}  "
+                f"queries={r['queries']:<3} mean={r['mean_ms']:8.2f}ms p95={r['p95_ms']:8.2f}ms"
+            )
+            if options["show_plans"]:
+                for plan in r["plans"]:
+                    self.stdout.write(f"    {plan['sql'][:120]}")
+                    for line in plan["plan"]:
+                        self.stdout.write(f"        {line}")
+
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as f:
+                json.dump({"sizes": sizes, "endpoints": results}, f, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Отчёт сохранён в {options['output']}"))
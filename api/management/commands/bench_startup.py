@@ -0,0 +1,37 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.benchmarks.startup import TARGETS, measure_startup
+
+
+class Command(BaseCommand):
+    help = "Холодный старт воркера: импорт myproject.wsgi/asgi и время до первого ответа (медианы по прогонам)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=5, help="Прогонов (новых процессов) на цель")
+        parser.add_argument("--target", action="append", choices=TARGETS,
+                            help="wsgi или asgi (можно несколько раз); по умолчанию обе")
+        parser.add_argument("--path", action="append", help="Путь первого запроса; по умолчанию /api/openapi.json")
+        parser.add_argument("--cold", action="store_true", help="Удалять файл кэша OpenAPI-схемы перед прогоном")
+        parser.add_argument("--output", help="Сохранить отчёт в JSON")
+
+    def handle(self, *args, **options):
+        report = {}
+        for target in options["target"] or TARGETS:
+            for path in options["path"] or ["/api/openapi.json"]:
+                try:
+                    result = measure_startup(target, path, options["runs"], options["cold"])
+                except RuntimeError as e:
+                    raise CommandError(str(e))
+                report.setdefault(target, {})[path] = result
+                self.stdout.write(
+                    f"{target:<5} {path:<32} {result['status']:>3}  import={result['import_ms']:7.1f}ms "
+                    f"first={result['first_request_ms']:7.1f}ms second={result['second_request_ms']:6.1f}ms "
+                    f"to_first_response={result['time_to_first_response_ms']:7.1f}ms"
+                )
+
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Отчёт сохранён в {options['output']}"))
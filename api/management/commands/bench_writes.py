@@ -0,0 +1,44 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from api.benchmarks.runner import temporary_database
+from api.benchmarks.seed import DEFAULT_SIZES, seed
+from api.benchmarks.writes import MODES, run_write_benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Конкурентная запись (вишлист и оформление заказов) через WSGI-сервер во временной SQLite-БД "
+        "на диске: настройки соединений проекта против SQLite по умолчанию"
+    )
+
+    def add_arguments(self, parser):
+        for name, default in DEFAULT_SIZES.items():
+            parser.add_argument(f"--{name.replace('_', '-')}", type=int, default=default, dest=name)
+        parser.add_argument("--concurrency", type=int, default=8, help="Параллельных покупателей")
+        parser.add_argument("--rounds", type=int, default=5, help="Оформлений заказа на покупателя")
+        parser.add_argument("--items", type=int, default=3, help="Товаров в заказе")
+        parser.add_argument("--mode", action="append", choices=MODES, help="Режим соединений; по умолчанию оба")
+        parser.add_argument("--output", help="Сохранить отчёт в JSON")
+
+    def handle(self, *args, **options):
+        sizes = {name: options[name] for name in DEFAULT_SIZES}
+        sizes["users"] = max(sizes["users"], options["concurrency"] + 3)
+        with temporary_database(on_disk=True):
+            self.stdout.write(f"Наполнение БД: {sizes}")
+            seed(sizes)
+            report = run_write_benchmark(options["concurrency"], options["rounds"], options["items"],
+                                         options["mode"] or MODES)
+
+        for mode, r in report.items():
+            self.stdout.write(
+                f"{mode:<8} requests={r['requests']:<5} errors={r['errors']:<4} orders={r['orders_created']:<4} "
+                f"rps={r['rps']:7.1f} p50={r['p50_ms']:7.2f}ms p95={r['p95_ms']:8.2f}ms p99={r['p99_ms']:8.2f}ms "
+                f"statuses={r['statuses']}"
+            )
+
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as f:
+                json.dump({"sizes": sizes, **report}, f, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Отчёт сохранён в {options['output']}"))
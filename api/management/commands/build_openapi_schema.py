@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.api import api
+
+
+class Command(BaseCommand):
+    help = "Собрать OpenAPI-схему и сохранить в OPENAPI_SCHEMA['CACHE_FILE'] (запускать при деплое)"
+
+    def handle(self, *args, **options):
+        if not api.schema_cache_file:
+            raise CommandError("OPENAPI_SCHEMA['CACHE_FILE'] не задан")
+        schema = api.build_schema_file()
+        self.stdout.write(self.style.SUCCESS(
+            f"Схема ({len(schema['paths'])} путей) сохранена в {api.schema_cache_file}"
+        ))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.routers.product_import import BATCH_SIZE, import_products
+
+
+class Command(BaseCommand):
+    help = "Пакетный импорт товаров из CSV или NDJSON (строки с id обновляют товары, без id - создают)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Файл CSV/NDJSON")
+        parser.add_argument("--format", choices=["csv", "ndjson"],
+                            help="Формат файла; по умолчанию по расширению (.csv - CSV, иначе NDJSON)")
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Строк в одной пачке")
+
+    def handle(self, *args, **options):
+        fmt = options["format"] or ("csv" if options["path"].lower().endswith(".csv") else "ndjson")
+        try:
+            with open(options["path"], "rb") as f:
+                report = import_products(f, fmt, options["batch_size"])
+        except OSError as e:
+            raise CommandError(str(e))
+
+        for error in report["errors"]:
+            self.stdout.write(self.style.WARNING(f"  строка {error['row']}: {error['error']}"))
+        self.stdout.write(self.style.SUCCESS(
+            f"Создано: {report['created']}, обновлено: {report['updated']}, с ошибками: {report['failed']}"
+        ))
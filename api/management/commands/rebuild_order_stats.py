@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from api.aggregates import rebuild_order_stats
+
+
+class Command(BaseCommand):
+    help = "Пересчитать агрегаты заказов (Order.total/item_count, UserOrderStats, OrderStatusStats)"
+
+    def handle(self, *args, **options):
+        rebuild_order_stats()
+        self.stdout.write(self.style.SUCCESS("Агрегаты заказов пересчитаны"))
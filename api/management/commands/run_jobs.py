@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from api.jobs import run_worker
+
+
+class Command(BaseCommand):
+    help = "Воркер очереди фоновых задач (api.jobs): выполняет готовые задачи в пуле потоков или процессов"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=4, help="Размер пула")
+        parser.add_argument("--pool", choices=("thread", "process"), default="thread", help="Пул потоков или процессов")
+        parser.add_argument("--batch", type=int, help="Задач за одну выборку; по умолчанию 2 * concurrency")
+        parser.add_argument("--poll-interval", type=float, default=1.0, help="Пауза (с), когда очередь пуста")
+        parser.add_argument("--once", action="store_true", help="Выполнить готовые задачи и выйти")
+
+    def handle(self, *args, **options):
+        try:
+            processed = run_worker(
+                concurrency=options["concurrency"],
+                pool=options["pool"],
+                once=options["once"],
+                poll_interval=options["poll_interval"],
+                batch=options["batch"],
+            )
+        except KeyboardInterrupt:
+            return
+        self.stdout.write(self.style.SUCCESS(f"Выполнено задач: {processed}"))
@@ -0,0 +1,24 @@
+import sqlite3
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = "Скопировать базу default в SQLite-реплику (локальная проверка чтения с реплик)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("alias", nargs="?", default="replica", help="Алиас реплики в DATABASES")
+
+    def handle(self, *args, **options):
+        alias = options["alias"]
+        if alias not in connections.settings:
+            raise CommandError(f"Нет базы {alias} в DATABASES")
+        source, target = connections[DEFAULT_DB_ALIAS], connections[alias]
+        if source.vendor != "sqlite" or target.vendor != "sqlite":
+            raise CommandError("Команда копирует только SQLite; реплики других СУБД настраиваются репликацией")
+
+        source.ensure_connection()
+        with sqlite3.connect(target.settings_dict["NAME"]) as replica:
+            source.connection.backup(replica)
+        self.stdout.write(self.style.SUCCESS(f"default скопирована в {alias}"))
@@ -0,0 +1,247 @@
+"""
+Профилирование запросов. RequestMetricsMiddleware (включается REQUEST_METRICS['ENABLED'])
+заводит профиль для выборки запросов; хуки NinjaAPI (profile_operation, profile_handler),
+TokenAuth и permission_required добавляют в него время своих этапов, обёртка курсора
+(instrument_connection) - число и время SQL. Готовые профили попадают в кольцевой буфер,
+который отдаёт /api/admin/metrics.
+"""
+import inspect
+import math
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+_current = ContextVar("request_profile", default=None)
+
+TIMINGS = ("total_ms", "handler_ms", "auth_ms", "permission_ms", "serialization_ms", "query_ms")
+
+
+class RequestProfile:
+    __slots__ = ("method", "path", "route", "handler", "status", "queries", "handler_end") + TIMINGS
+
+    def __init__(self, method, path):
+        self.method = method
+        self.path = path
+        self.route = self.handler = self.status = self.handler_end = None
+        self.queries = 0
+        for field in TIMINGS:
+            setattr(self, field, 0.0)
+
+    def as_dict(self):
+        data = {f: getattr(self, f) for f in ("method", "path", "route", "handler", "status", "queries")}
+        data.update((f, round(getattr(self, f), 3)) for f in TIMINGS)
+        return data
+
+
+def _percentile(values, p):
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)] if ordered else 0.0
+
+
+class MetricsBuffer:
+    """Кольцевой буфер последних профилей: старые вытесняются, память ограничена max_size."""
+
+    def __init__(self, max_size=1000):
+        self._records = deque(maxlen=max_size)
+        self._lock = threading.Lock()
+        self.recorded = 0
+
+    @property
+    def max_size(self):
+        return self._records.maxlen
+
+    def record(self, profile):
+        with self._lock:
+            self._records.append(profile.as_dict())
+            self.recorded += 1
+
+    def records(self, limit=None):
+        with self._lock:
+            records = list(self._records)
+        return records[-limit:] if limit else records
+
+    def summary(self):
+        """Сводка по маршрутам: число запросов, p50/p95 общего времени и средние по этапам."""
+        routes = {}
+        for record in self.records():
+            routes.setdefault((record["method"], record["route"] or record["path"]), []).append(record)
+        summary = []
+        for (method, route), records in routes.items():
+            totals = [r["total_ms"] for r in records]
+            item = {"method": method, "route": route, "count": len(records),
+                    "p50_ms": _percentile(totals, 50), "p95_ms": _percentile(totals, 95),
+                    "avg_queries": sum(r["queries"] for r in records) / len(records)}
+            for field in TIMINGS:
+                item[f"avg_{field}"] = round(sum(r[field] for r in records) / len(records), 3)
+            summary.append(item)
+        return sorted(summary, key=lambda item: item["p95_ms"], reverse=True)
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+
+
+_config = getattr(settings, "REQUEST_METRICS", {})
+
+metrics_buffer = MetricsBuffer(_config.get("BUFFER_SIZE", 1000))
+
+
+@contextmanager
+def measure(field):
+    """Добавить время блока к полю текущего профиля; без профиля ничего не замеряет."""
+    profile = _current.get()
+    if profile is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        setattr(profile, field, getattr(profile, field) + (time.perf_counter() - started) * 1000)
+
+
+def _record_query(execute, sql, params, many, context):
+    profile = _current.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.queries += 1
+        profile.query_ms += (time.perf_counter() - started) * 1000
+
+
+def instrument_connection(connection):
+    """Обёртка курсора (ставится из connection_created) считает SQL только для профилируемых запросов."""
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+def profile_handler(view_func):
+    """Хук NinjaAPI (mode="operation"): время обработчика вместе с permission_required и пагинацией."""
+    def finish(profile, started):
+        profile.handler = view_func.__name__
+        profile.handler_end = time.perf_counter()
+        profile.handler_ms += (profile.handler_end - started) * 1000
+
+    if inspect.iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def async_wrapper(request, *args, **kwargs):
+            profile = _current.get()
+            if profile is None:
+                return await view_func(request, *args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return await view_func(request, *args, **kwargs)
+            finally:
+                finish(profile, started)
+
+        return async_wrapper
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        profile = _current.get()
+        if profile is None:
+            return view_func(request, *args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return view_func(request, *args, **kwargs)
+        finally:
+            finish(profile, started)
+
+    return wrapper
+
+
+def profile_operation(run):
+    """Хук NinjaAPI (mode="view"): всё от конца обработчика до готового ответа - сериализация схемы."""
+    def finish(profile):
+        if profile.handler_end is not None:
+            profile.serialization_ms += (time.perf_counter() - profile.handler_end) * 1000
+
+    if inspect.iscoroutinefunction(run):
+        @wraps(run)
+        async def async_wrapper(request, *args, **kwargs):
+            response = await run(request, *args, **kwargs)
+            profile = _current.get()
+            if profile is not None:
+                finish(profile)
+            return response
+
+        return async_wrapper
+
+    @wraps(run)
+    def wrapper(request, *args, **kwargs):
+        response = run(request, *args, **kwargs)
+        profile = _current.get()
+        if profile is not None:
+            finish(profile)
+        return response
+
+    return wrapper
+
+
+class RequestMetricsMiddleware:
+    """
+    Включается настройкой REQUEST_METRICS['ENABLED'] (иначе Django убирает middleware из цепочки).
+    Профилируется доля запросов SAMPLE_RATE; работает и под WSGI, и под ASGI.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        config = getattr(settings, "REQUEST_METRICS", {})
+        if not config.get("ENABLED", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = config.get("SAMPLE_RATE", 1.0)
+        self.prefix = config.get("PATH_PREFIX", "/api/")
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _start(self, request):
+        if not request.path.startswith(self.prefix) or random.random() >= self.sample_rate:
+            return None
+        return RequestProfile(request.method, request.path), time.perf_counter()
+
+    @staticmethod
+    def _finish(request, response, profile, started):
+        profile.total_ms = (time.perf_counter() - started) * 1000
+        profile.status = response.status_code
+        match = getattr(request, "resolver_match", None)
+        profile.route = match.route if match is not None else None
+        metrics_buffer.record(profile)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        sample = self._start(request)
+        if sample is None:
+            return self.get_response(request)
+        token = _current.set(sample[0])
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self._finish(request, response, *sample)
+        return response
+
+    async def __acall__(self, request):
+        sample = self._start(request)
+        if sample is None:
+            return await self.get_response(request)
+        token = _current.set(sample[0])
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self._finish(request, response, *sample)
+        return response
@@ -0,0 +1,63 @@
+# Generated by Django 4.2.16 on 2026-10-18 16:22
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def fill_order_aggregates(apps, schema_editor):
+    Order = apps.get_model('api', 'Order')
+    OrderItem = apps.get_model('api', 'OrderItem')
+    UserOrderStats = apps.get_model('api', 'UserOrderStats')
+    OrderStatusStats = apps.get_model('api', 'OrderStatusStats')
+
+    for row in OrderItem.objects.values('order_id').annotate(items=Sum('quantity')).order_by():
+        Order.objects.filter(id=row['order_id']).update(item_count=row['items'])
+
+    totals = dict(order_count=Count('id'), item_count=Sum('item_count'), total=Sum('total'))
+    UserOrderStats.objects.bulk_create(
+        UserOrderStats(user_id=row.pop('user_id'), **row)
+        for row in Order.objects.values('user_id').annotate(**totals).order_by()
+    )
+    OrderStatusStats.objects.bulk_create(
+        OrderStatusStats(status_id=row.pop('status_id'), **row)
+        for row in Order.objects.filter(status__isnull=False).values('status_id').annotate(**totals).order_by()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='item_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='OrderStatusStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order_count', models.IntegerField(default=0)),
+                ('item_count', models.IntegerField(default=0)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('status', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='api.orderstatus')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='UserOrderStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order_count', models.IntegerField(default=0)),
+                ('item_count', models.IntegerField(default=0)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='order_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(fill_order_aggregates, migrations.RunPython.noop),
+    ]
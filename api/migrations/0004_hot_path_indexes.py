@@ -0,0 +1,39 @@
+# Generated by Django 4.2.16 on 2026-10-18 16:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_product_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='managerrequest',
+            index=models.Index(fields=['user', 'status'], name='managerrequest_user_status'),
+        ),
+        migrations.AddIndex(
+            model_name='managerrequest',
+            index=models.Index(fields=['status', 'id'], name='managerrequest_status_id'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user', 'created_at'], name='order_user_created'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['created_at'], name='order_created'),
+        ),
+        migrations.AddIndex(
+            model_name='orderstatus',
+            index=models.Index(fields=['name'], name='orderstatus_name'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['price', 'id'], name='product_price_id'),
+        ),
+    ]
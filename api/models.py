@@ -7,6 +7,14 @@ class ManagerRequest(models.Model):
     status = models.CharField(max_length=20, default='ожидает рассмотрения')  # ожидает рассмотрения, одобренн
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # request_manager: заявка пользователя в статусе "ожидает рассмотрения"
+            models.Index(fields=["user", "status"], name="managerrequest_user_status"),
+            # list_manager_requests: фильтр по статусу + keyset по id
+            models.Index(fields=["status", "id"], name="managerrequest_status_id"),
+        ]
+
     def __str__(self):
         return f"Запрос от - {self.status}"
 
@@ -26,6 +34,12 @@ class Product(models.Model):
     description = models.TextField()
     image = models.ImageField(upload_to='images/')
 
+    class Meta:
+        indexes = [
+            # диапазоны min_price/max_price и keyset-сортировка по цене
+            models.Index(fields=["price", "id"], name="product_price_id"),
+        ]
+
     def __str__(self):
         return self.title
 
@@ -45,6 +59,12 @@ class WishlistItem(models.Model):
 class OrderStatus(models.Model):
     name = models.CharField(max_length=50)
 
+    class Meta:
+        indexes = [
+            # поиск статуса "Новый" при оформлении заказа
+            models.Index(fields=["name"], name="orderstatus_name"),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -53,8 +73,17 @@ class Order(models.Model):
     user = models.ForeignKey(User, related_name="orders", on_delete=models.CASCADE)
     status = models.ForeignKey(OrderStatus, on_delete=models.SET_NULL, null=True)
     total = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    item_count = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # заказы пользователя по дате (get_my_orders, get_user_orders)
+            models.Index(fields=["user", "created_at"], name="order_user_created"),
+            # выборки заказов за период
+            models.Index(fields=["created_at"], name="order_created"),
+        ]
+
     def __str__(self):
         return f"Order #{self.pk} - {self.user.username}"
 
@@ -66,5 +95,49 @@ class OrderItem(models.Model):
     quantity = models.PositiveIntegerField()
 
     def get_amount(self):
-        self.cost = self.product.price * self.quantity
+        # cost фиксируется при оформлении как цена * количество
         return self.cost
+
+
+class UserOrderStats(models.Model):
+    """Агрегаты заказов пользователя, поддерживаются инкрементально (см. aggregates.py)."""
+    user = models.OneToOneField(User, related_name="order_stats", on_delete=models.CASCADE)
+    order_count = models.IntegerField(default=0)
+    item_count = models.IntegerField(default=0)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+
+class OrderStatusStats(models.Model):
+    """Агрегаты заказов по статусу, поддерживаются инкрементально (см. aggregates.py)."""
+    status = models.OneToOneField(OrderStatus, related_name="stats", on_delete=models.CASCADE)
+    order_count = models.IntegerField(default=0)
+    item_count = models.IntegerField(default=0)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+
+class Job(models.Model):
+    """Фоновая задача (см. jobs.py): ставится через enqueue/enqueue_on_commit, выполняется run_jobs."""
+    PENDING, RUNNING, DONE, FAILED = "pending", "running", "done", "failed"
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, default=PENDING)
+    # повтор постановки с тем же ключом не создаёт вторую задачу
+    idempotency_key = models.CharField(max_length=200, null=True, blank=True, unique=True)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField()
+    locked_by = models.CharField(max_length=100, blank=True, default="")
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # выборка воркером: готовые к запуску задачи по времени
+            models.Index(fields=["status", "run_at"], name="job_status_run_at"),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
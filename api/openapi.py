@@ -0,0 +1,123 @@
+"""
+NinjaAPI с ленивой регистрацией роутеров и кэшем OpenAPI-схемы.
+
+Роутеры, переданные строкой импорта, импортируются при первой сборке URL или схемы, а не при
+импорте api.api. Схема строится один раз на процесс и сохраняется в OPENAPI_SCHEMA['CACHE_FILE']
+вместе с отпечатком исходников api и настроек: остальные воркеры читают готовый файл, после
+изменения кода или настроек отпечаток не совпадёт и схема пересоберётся.
+"""
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+import ninja
+from django.conf import settings
+from ninja import NinjaAPI
+
+_config = getattr(settings, "OPENAPI_SCHEMA", {})
+CACHE_FILE = _config.get("CACHE_FILE")
+
+_SOURCE_ROOT = Path(__file__).resolve().parent
+
+
+def _settings_sources():
+    """Файл модуля настроек и значения NINJA_*: настройки тоже меняют схему (пагинация, префиксы и т. п.)."""
+    module = sys.modules.get(getattr(settings, "SETTINGS_MODULE", None) or "")
+    path = getattr(module, "__file__", None)
+    yield Path(path).read_bytes() if path else b""
+    for name in sorted(n for n in dir(settings) if n.startswith("NINJA_")):
+        yield f"{name}={getattr(settings, name)!r}".encode()
+
+
+def source_fingerprint():
+    """Хэш исходников пакета api, настроек проекта и версии ninja - от них зависит схема."""
+    digest = hashlib.sha1(ninja.__version__.encode())
+    for path in sorted(_SOURCE_ROOT.rglob("*.py")):
+        digest.update(str(path.relative_to(_SOURCE_ROOT)).encode())
+        digest.update(path.read_bytes())
+    for chunk in _settings_sources():
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_schema_file(path, fingerprint):
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(data, dict) or data.get("fingerprint") != fingerprint:
+        return None
+    return data.get("schema")
+
+
+def write_schema_file(path, fingerprint, schema):
+    """Запись через временный файл и rename: параллельный воркер не прочитает файл наполовину."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"fingerprint": fingerprint, "schema": schema}, f, ensure_ascii=False, default=str)
+        os.replace(tmp_path, path)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+class LazyNinjaAPI(NinjaAPI):
+    def __init__(self, *args, schema_cache_file=CACHE_FILE, **kwargs):
+        self._pending_routers = []
+        self._schemas = {}
+        self._schema_lock = threading.Lock()
+        self.schema_cache_file = schema_cache_file
+        super().__init__(*args, **kwargs)
+
+    def add_router(self, prefix, router, **kwargs):
+        if isinstance(router, str) and self._bound_routers_cache is None:
+            self._pending_routers.append((prefix, router, kwargs))
+            return
+        super().add_router(prefix, router, **kwargs)
+
+    def _register_pending(self):
+        pending, self._pending_routers = self._pending_routers, []
+        for prefix, router, kwargs in pending:
+            super().add_router(prefix, router, **kwargs)
+
+    def _get_bound_routers(self):
+        if self._pending_routers:
+            self._register_pending()
+        return super()._get_bound_routers()
+
+    def get_openapi_schema(self, *, path_prefix=None, path_params=None):
+        if path_prefix is None:
+            path_prefix = self.get_root_path(path_params or {})
+        schema = self._schemas.get(path_prefix)
+        if schema is None:
+            with self._schema_lock:
+                schema = self._schemas.get(path_prefix)
+                if schema is None:
+                    schema = self._schemas[path_prefix] = self._load_schema(path_prefix)
+        return schema
+
+    def _load_schema(self, path_prefix):
+        path = self.schema_cache_file
+        if not path:
+            return super().get_openapi_schema(path_prefix=path_prefix)
+        fingerprint = f"{source_fingerprint()}:{path_prefix}"
+        schema = read_schema_file(path, fingerprint)
+        if schema is None:
+            schema = super().get_openapi_schema(path_prefix=path_prefix)
+            write_schema_file(path, fingerprint, schema)
+        return schema
+
+    def build_schema_file(self):
+        """Собрать схему заново и записать в кэш-файл (деплой: manage.py build_openapi_schema)."""
+        path_prefix = self.get_root_path({})
+        schema = super().get_openapi_schema(path_prefix=path_prefix)
+        write_schema_file(self.schema_cache_file, f"{source_fingerprint()}:{path_prefix}", schema)
+        self._schemas[path_prefix] = schema
+        return schema
@@ -0,0 +1,66 @@
+"""
+Хэширование и проверка паролей с параметрами из PASSWORD_HASHING. Основной хэшер - первый
+в PASSWORD_HASHERS; пароль, сохранённый другим алгоритмом или с другими параметрами, Django
+перехэширует при успешном входе (check_password -> must_update), так что смена стоимости
+в настройках постепенно применяется ко всем пользователям без сброса паролей.
+
+Argon2 требует argon2-cffi: пока он не установлен, ставить Argon2PasswordHasher первым нельзя.
+"""
+import base64
+import gzip
+import hashlib
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.auth import hashers, password_validation
+
+_config = getattr(settings, "PASSWORD_HASHING", {})
+_scrypt = _config.get("SCRYPT", {})
+_argon2 = _config.get("ARGON2", {})
+
+
+class ScryptPasswordHasher(hashers.ScryptPasswordHasher):
+    work_factor = _scrypt.get("WORK_FACTOR", 2**15)
+    block_size = _scrypt.get("BLOCK_SIZE", 8)
+    parallelism = _scrypt.get("PARALLELISM", 1)
+
+    def encode(self, password, salt, n=None, r=None, p=None):
+        # verify передаёт параметры из сохранённого хэша: предел памяти считаем по ним, а не по
+        # настройкам - иначе после снижения WORK_FACTOR старые хэши не проверятся (memory limit exceeded).
+        # OpenSSL по умолчанию ограничивает scrypt 32 МБ; нужно 128 * n * r * p байт плюс запас
+        self._check_encode_args(password, salt)
+        n = n or self.work_factor
+        r = r or self.block_size
+        p = p or self.parallelism
+        hash_ = hashlib.scrypt(password.encode(), salt=salt.encode(), n=n, r=r, p=p, maxmem=2 * 128 * n * r * p,
+                               dklen=64)
+        hash_ = base64.b64encode(hash_).decode("ascii").strip()
+        return "%s$%d$%s$%d$%d$%s" % (self.algorithm, n, salt, r, p, hash_)
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    time_cost = _argon2.get("TIME_COST", 2)
+    memory_cost = _argon2.get("MEMORY_COST", 19456)
+    parallelism = _argon2.get("PARALLELISM", 1)
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    iterations = _config.get("PBKDF2_ITERATIONS", hashers.PBKDF2PasswordHasher.iterations)
+
+
+@lru_cache(maxsize=None)
+def common_passwords(path):
+    """Список распространённых паролей читается один раз на процесс и на файл."""
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return frozenset(line.strip() for line in f)
+    except OSError:
+        with open(path, encoding="utf-8") as f:
+            return frozenset(line.strip() for line in f)
+
+
+class CommonPasswordValidator(password_validation.CommonPasswordValidator):
+    """Как у Django, но без повторного чтения gzip-файла при каждом создании валидатора."""
+
+    def __init__(self, password_list_path=None):
+        self.passwords = common_passwords(str(password_list_path or self.DEFAULT_PASSWORD_LIST_PATH))
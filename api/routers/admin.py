@@ -1,10 +1,17 @@
+from asgiref.sync import sync_to_async
 from django.contrib.auth.models import User, Group
 from ninja import Router
-from django.shortcuts import get_object_or_404
 from ninja.errors import HttpError
 from .auth_backend import auth
-from .permissions import permission_required, is_staff
+from .pagination import keyset_paginate
+from .permissions import permission_required, is_staff, MANAGER_GROUP
+from .query_planner import plan_queryset
+from .token_cache import token_cache
+from ..db_connections import connection_stats
+from ..jobs import enqueue
+from ..metrics import metrics_buffer
 from ..models import ManagerRequest
+from ..tasks import notify_manager_approved
 from ..schemas import ManagerOut, ErrorOut
 
 admin_router = Router(tags=["admin"])
@@ -12,8 +19,9 @@ admin_router = Router(tags=["admin"])
 
 
 @admin_router.get("/manager-requests", response={200: list[ManagerOut]}, auth=auth, summary="Список заявок на менеджера")
+@keyset_paginate
 @permission_required(is_staff)
-def list_manager_requests(request, status: str = None):
+async def list_manager_requests(request, status: str = None):
     """
     Получить список заявок с возможностью фильтрации по статусу.
     Можно указать статус в параметре query_params: 'ожидает рассмотрения' или 'одобрен'.
@@ -21,43 +29,61 @@ def list_manager_requests(request, status: str = None):
     """
     allowed_statuses = ['ожидает рассмотрения', 'одобрен']
     if status and status not in allowed_statuses:
-        return 400, {"detail": "Недопустимый статус фильтрации"}
+        raise HttpError(400, "Недопустимый статус фильтрации")
 
+    requests_qs = plan_queryset(ManagerRequest.objects.order_by("id"), ManagerOut)
     if status:
-        requests_qs = ManagerRequest.objects.filter(status=status)
-    else:
-        requests_qs = ManagerRequest.objects.all()
+        requests_qs = requests_qs.filter(status=status)
 
-    data = []
-    for req in requests_qs:
-        data.append(ManagerOut(
-            id=req.id,
-            user=req.user,
-            status=req.status,
-            created_at=req.created_at
-        ))
-    return data
+    return requests_qs
 
 
 @admin_router.post("/approve-manager/{request_id}", response={200: dict, 404: ErrorOut}, auth=auth, summary="Подтвердить заявку и повысить пользователя до менеджера")
 @permission_required(is_staff)
-def approve_manager_request(request, request_id: int):
+async def approve_manager_request(request, request_id: int):
     try:
-        req_obj = ManagerRequest.objects.get(id=request_id, status='ожидает рассмотрения')
+        req_obj = await ManagerRequest.objects.select_related("user").aget(id=request_id, status='ожидает рассмотрения')
     except ManagerRequest.DoesNotExist:
         return 404, {"detail": "Запрос не найден или уже обработан"}
 
     user = req_obj.user
 
-    group, _ = Group.objects.get_or_create(name='менеджеры')
-    user.groups.add(group)
+    group, _ = await Group.objects.aget_or_create(name=MANAGER_GROUP)
+    # m2m_changed поднимет версию прав пользователя - закэшированные роли устареют
+    await user.groups.aadd(group)
 
     req_obj.status = 'одобрен'
-    req_obj.save()
+    await req_obj.asave()
 
+    # письмо отправит воркер; ключ не даст поставить уведомление по заявке дважды
+    await sync_to_async(enqueue)(notify_manager_approved, key=f"manager-approved:{request_id}", request_id=request_id)
 
     return {"message": f"Пользователь стал менеджером."}
 
 
+@admin_router.get("/auth-cache", response=dict, auth=auth, summary="Статистика кэша токенов")
+@permission_required(is_staff)
+async def auth_cache_stats(request):
+    return token_cache.stats()
+
+
+@admin_router.get("/db-connections", response=dict, auth=auth, summary="Статистика соединений с БД")
+@permission_required(is_staff)
+async def db_connection_stats(request):
+    """По алиасам БД: CONN_MAX_AGE и проверка здоровья, открытые воркером соединения, PRAGMA SQLite, пул."""
+    return await sync_to_async(connection_stats)()
 
 
+@admin_router.get("/metrics", response=dict, auth=auth, summary="Профили последних запросов")
+@permission_required(is_staff)
+async def request_metrics(request, limit: int = 100):
+    """
+    Сводка по маршрутам (p50/p95, средние времена этапов и число SQL) и последние профили
+    из кольцевого буфера. Пусто, пока REQUEST_METRICS['ENABLED'] выключен.
+    """
+    return {
+        "buffer_size": metrics_buffer.max_size,
+        "recorded": metrics_buffer.recorded,
+        "routes": metrics_buffer.summary(),
+        "recent": metrics_buffer.records(limit),
+    }
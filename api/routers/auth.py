@@ -1,27 +1,48 @@
 from ninja import Router
-from django.contrib.auth import authenticate
+from asgiref.sync import sync_to_async
 from django.contrib.auth.models import User
+from django.contrib.auth.signals import user_login_failed
 from rest_framework.authtoken.models import Token
+from .throttling import RateLimit
 from ..schemas import LoginIn, LoginOut, RegisterIn,  ErrorOut
 
 auth_router = Router(tags=["auth"])
 
-@auth_router.post("/login", response={200: LoginOut, 401: ErrorOut}, summary="Вход в систему")
-def login(request, data: LoginIn):
-    user = authenticate(username=data.username, password=data.password)
-    if user is None:
+# хэширование пароля намеренно медленное: без лимита поток логинов и регистраций занимает весь CPU
+@auth_router.post("/login", response={200: LoginOut, 401: ErrorOut, 429: ErrorOut}, summary="Вход в систему",
+                  throttle=[RateLimit("login", "10/min", key="ip")])
+async def login(request, data: LoginIn):
+    key = await sync_to_async(_login)(request, data.username, data.password)
+    if key is None:
         return 401, {"detail": "Неверные учетные данные"}
-    token, _ = Token.objects.get_or_create(user=user)
-    return {"token": token.key}
+    return {"token": key}
+
 
+def _login(request, username, password):
+    """
+    Проверка пароля как в ModelBackend, но пользователь и его токен - одним запросом.
+    check_password перехэширует пароль, если он сохранён не основным хэшером (см. api.passwords).
+    """
+    user = User.objects.select_related("auth_token").filter(username=username).first()
+    if user is None:
+        # хэшируем и для несуществующего логина, чтобы по времени ответа нельзя было подобрать логины
+        User().set_password(password)
+    elif user.check_password(password) and user.is_active:
+        try:
+            return user.auth_token.key
+        except Token.DoesNotExist:
+            return Token.objects.get_or_create(user=user)[0].key
+    user_login_failed.send(sender=__name__, credentials={"username": username}, request=request)
+    return None
 
 
-@auth_router.post("/register", response={200: LoginOut, 400: ErrorOut}, summary="Регистрация пользователя")
-def register(request, data: RegisterIn):
-    if User.objects.filter(username=data.username).exists():
+@auth_router.post("/register", response={200: LoginOut, 400: ErrorOut, 429: ErrorOut}, summary="Регистрация пользователя",
+                  throttle=[RateLimit("register", "5/min", key="ip")])
+async def register(request, data: RegisterIn):
+    if await User.objects.filter(username=data.username).aexists():
         return 400, {"detail": "Пользователь с таким именем уже существует"}
 
-    user = User.objects.create_user(
+    user = await User.objects.acreate_user(
         username=data.username,
         password=data.password,
         first_name=data.first_name,
@@ -29,5 +50,6 @@ def register(request, data: RegisterIn):
         email=data.email
     )
 
-    token, _ = Token.objects.get_or_create(user=user)
+    # у нового пользователя токена быть не может - создаём без предварительного SELECT
+    token = await Token.objects.acreate(user=user)
     return {"token": token.key}
\ No newline at end of file
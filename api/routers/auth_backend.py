@@ -1,15 +1,58 @@
 from ninja.security import HttpBearer
 from rest_framework.authtoken.models import Token
+from ..metrics import measure
+from .token_cache import token_cache, snapshot_user, restore_user
 
 
 class TokenAuth(HttpBearer):
     def authenticate(self, request, token):
-        try:
-            token_obj = Token.objects.get(key=token)
-            request.user = token_obj.user
-            return token_obj.user
-        except Token.DoesNotExist:
+        with measure("auth_ms"):
+            return self._authenticate(request, token)
+
+    def _authenticate(self, request, token):
+        snapshot = token_cache.get(token)
+        if snapshot is None:
+            try:
+                token_obj = Token.objects.select_related("user").get(key=token)
+            except Token.DoesNotExist:
+                return None
+            snapshot = self._remember(token, token_obj)
+            if snapshot is None:
+                return None
+
+        request.user = restore_user(snapshot)
+        return request.user
+
+    @staticmethod
+    def _remember(token, token_obj):
+        if not token_obj.user.is_active:
             return None
+        snapshot = snapshot_user(token_obj.user)
+        token_cache.set(token, snapshot)
+        return snapshot
+
+
+class AsyncTokenAuth(TokenAuth):
+    """Та же логика для async-обработчиков: попадание в кэш без БД, промах - через async ORM."""
+    is_async = True
+
+    async def authenticate(self, request, token):
+        with measure("auth_ms"):
+            return await self._aauthenticate(request, token)
+
+    async def _aauthenticate(self, request, token):
+        snapshot = token_cache.get(token)
+        if snapshot is None:
+            try:
+                token_obj = await Token.objects.select_related("user").aget(key=token)
+            except Token.DoesNotExist:
+                return None
+            snapshot = self._remember(token, token_obj)
+            if snapshot is None:
+                return None
+
+        request.user = restore_user(snapshot)
+        return request.user
 
 
-auth = TokenAuth()
+auth = AsyncTokenAuth()
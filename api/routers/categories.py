@@ -1,54 +1,72 @@
 from ninja import Router, Body
+from ninja.decorators import decorate_view
 from typing import List
-from django.shortcuts import get_object_or_404
+from django.shortcuts import aget_object_or_404
+from ..catalogue import catalogue_snapshot
+from ..db_router import read_replica
 from ..models import Category
 from ..schemas import CategoryOut, CategoryIn, ProductOut, CategoryUpdate, ErrorOut
 from .auth_backend import auth
+from .http_cache import http_cache
+from .pagination import keyset_paginate
 from .permissions import permission_required, is_manager
+from .fast_serialization import FastList, fast
+from .query_planner import plan_queryset
 
 category_router = Router(tags=["categories"])
 
 
 @category_router.get("/", response={200: List[CategoryOut], 403: ErrorOut}, summary='Получить список категорий')
-def list_categories(request):
-    return Category.objects.all()
+@decorate_view(http_cache)
+@keyset_paginate
+async def list_categories(request):
+    if catalogue_snapshot.enabled:
+        return (await catalogue_snapshot.aget()).category_rows()
+    return plan_queryset(Category.objects.order_by("id"), CategoryOut)
 
 
 @category_router.get("/{slug}", response=CategoryOut, summary='Получить категорию по slug')
-def get_category(request, slug: str):
-    return get_object_or_404(Category, slug=slug)
+@read_replica
+@decorate_view(http_cache)
+async def get_category(request, slug: str):
+    if catalogue_snapshot.enabled:
+        return (await catalogue_snapshot.aget()).get_category(slug)
+    return await aget_object_or_404(Category, slug=slug)
 
 
 @category_router.get("/{slug}/products", response=List[ProductOut], summary='Получить продукты по категории')
-def get_products_in_category(request, slug: str):
-    category = get_object_or_404(Category, slug=slug)
-    return category.products.all()
+@decorate_view(http_cache)
+async def get_products_in_category(request, slug: str):
+    if catalogue_snapshot.enabled:
+        return FastList((await catalogue_snapshot.aget()).category_products(slug))
+    category = await aget_object_or_404(Category, slug=slug)
+    return fast(category.products.all(), ProductOut)
 
 
 @category_router.post("/", response=CategoryOut, auth=auth, summary='Добавить категорию (Менеджер)')
 @permission_required(is_manager)
-def create_category(request, category: CategoryIn):
-    new_category = Category.objects.create(title=category.title, slug=category.slug)
+async def create_category(request, category: CategoryIn):
+    new_category = await Category.objects.acreate(title=category.title, slug=category.slug)
     return new_category
 
 
 @category_router.patch("/{slug}", response=CategoryOut, auth=auth, summary='Обновить категорию (Менеджер)')
 @permission_required(is_manager)
-def partial_update_category(request, slug: str, data: CategoryUpdate = Body(...)):
-    category = get_object_or_404(Category, slug=slug)
+async def partial_update_category(request, slug: str, data: CategoryUpdate = Body(...)):
+    category = await aget_object_or_404(Category, slug=slug)
     if data.title is not None:
         category.title = data.title
     if data.slug is not None:
         category.slug = data.slug
-    category.save()
+    await category.asave()
     return category
 
 
 @category_router.delete("/{slug}", auth=auth, summary='Удалить категорию (Менеджер)')
 @permission_required(is_manager)
-def delete_category(request, slug: str):
-    category = get_object_or_404(Category, slug=slug)
+async def delete_category(request, slug: str):
+    category = await aget_object_or_404(Category, slug=slug)
     if not category:
         return 404, {"detail": "Категория не найдена"}
-    category.delete()
+    await category.adelete()
     return {"success": True}
@@ -0,0 +1,284 @@
+"""
+Быстрая сериализация списков: строки берутся через values_list() сразу в форме схемы ответа,
+без экземпляров моделей и без pydantic-валидации каждой строки. Значения приводятся так же,
+как их привёл бы pydantic (Decimal -> float для float-полей) и закодировал NinjaJSONEncoder
+(даты - строками DjangoJSONEncoder), поэтому JSON совпадает с обычным путём байт в байт.
+
+Обработчик возвращает fast(queryset, Schema); хук fast_serialization (api.add_decorator)
+превращает результат в готовый ответ, KeysetPagination собирает из него страницу.
+Если схему нельзя разложить по колонкам (вычисляемые поля, resolve_*), используется обычный путь.
+"""
+import datetime
+import decimal
+import inspect
+import json
+import types
+import uuid
+from functools import lru_cache, wraps
+from itertools import islice
+from typing import Union, get_args, get_origin
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+from ninja.renderers import JSONRenderer
+from ninja.responses import NinjaJSONEncoder
+
+from .query_planner import _unwrap, plan_queryset
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_config = getattr(settings, "API_RENDERER", {})
+USE_ORJSON = _config.get("ORJSON", False)
+
+_encode = DjangoJSONEncoder().default
+_ninja_encode = NinjaJSONEncoder().default
+
+_IDENTITY = (int, str, bool)
+_ENCODED = (datetime.datetime, datetime.date, datetime.time, datetime.timedelta, decimal.Decimal, uuid.UUID)
+
+
+class Unsupported(Exception):
+    pass
+
+
+def _converter(annotation):
+    """Функция приведения значения колонки к JSON-виду для аннотации поля (None - без приведения)."""
+    if get_origin(annotation) in (Union, types.UnionType):
+        args = [a for a in get_args(annotation) if a is not type(None)]
+        if len(args) != 1:
+            raise Unsupported(annotation)
+        annotation = args[0]
+    if annotation in _IDENTITY:
+        return None
+    if annotation is float:
+        return float
+    if annotation in _ENCODED:
+        return _encode
+    raise Unsupported(annotation)
+
+
+class _Node:
+    """Одна схема: поля-значения и вложенные FK берутся из строки, списки - отдельным запросом."""
+
+    def __init__(self, model, schema, prefix, columns):
+        self.fields = []
+        self.many = []
+        self.pk_index = len(columns)
+        columns.append(f"{prefix}pk")
+
+        for name, field_info in schema.model_fields.items():
+            if hasattr(schema, f"resolve_{name}"):
+                raise Unsupported(name)
+            attr = field_info.alias if isinstance(field_info.alias, str) else name
+            try:
+                model_field = model._meta.get_field(attr)
+            except FieldDoesNotExist:
+                raise Unsupported(name)
+            nested, many = _unwrap(field_info.annotation)
+
+            if nested is not None:
+                if not model_field.is_relation:
+                    raise Unsupported(name)
+                if many or model_field.one_to_many:
+                    # списки поддерживаются только у корня и у элементов списков (не внутри FK)
+                    if not model_field.one_to_many or prefix:
+                        raise Unsupported(name)
+                    self.many.append((name, _ManyPlan(model_field, nested)))
+                    self.fields.append(("many", name, None))
+                else:
+                    self.fields.append(("one", name, _Node(model_field.related_model, nested, f"{prefix}{attr}__", columns)))
+            elif model_field.is_relation and attr == model_field.name:
+                raise Unsupported(name)
+            else:
+                self.fields.append(("value", name, (len(columns), _converter(field_info.annotation))))
+                columns.append(f"{prefix}{attr}")
+
+    def shape(self, row, children):
+        item = {}
+        for kind, name, spec in self.fields:
+            if kind == "value":
+                value = row[spec[0]]
+                item[name] = value if spec[1] is None or value is None else spec[1](value)
+            elif kind == "one":
+                item[name] = None if row[spec.pk_index] is None else spec.shape(row, children)
+            else:
+                item[name] = children[name].get(row[self.pk_index], [])
+        return item
+
+    def fetch_children(self, rows):
+        """{имя поля: {pk родителя: [элементы]}} для списочных полей этой схемы."""
+        if not self.many:
+            return {}
+        parent_ids = {row[self.pk_index] for row in rows}
+        return {name: plan.fetch(parent_ids) for name, plan in self.many}
+
+
+class _ManyPlan:
+    """Обратная FK-связь (order.items): один запрос по всем родителям, группировка по внешнему ключу."""
+
+    def __init__(self, relation, schema):
+        self.model = relation.related_model
+        self.fk = relation.field.attname
+        self.columns = [self.fk]
+        self.node = _Node(self.model, schema, "", self.columns)
+        self.ordering = self.model._meta.ordering or ("pk",)
+
+    def fetch(self, parent_ids):
+        rows = list(
+            self.model._default_manager.filter(**{f"{self.fk}__in": parent_ids})
+            .order_by(*self.ordering).values_list(*self.columns)
+        )
+        children = self.node.fetch_children(rows)
+        grouped = {}
+        for row in rows:
+            grouped.setdefault(row[0], []).append(self.node.shape(row, children))
+        return grouped
+
+
+@lru_cache(maxsize=None)
+def build_values_plan(model, schema):
+    """(колонки для values_list, корневой узел) или None, если схема не раскладывается по колонкам."""
+    columns = []
+    try:
+        node = _Node(model, schema, "", columns)
+    except Unsupported:
+        return None
+    return tuple(columns), node
+
+
+def serialize(queryset, schema, keys=()):
+    """
+    Строки queryset в форме схемы. С keys возвращает пары (элемент, значения ключей) -
+    для курсора пагинации. None - схема не поддерживается быстрым путём.
+    """
+    plan = build_values_plan(queryset.model, schema)
+    if plan is None:
+        return None
+    columns, node = plan
+    rows = list(queryset.values_list(*columns, *keys))
+    if not keys:
+        return _shape_chunk(node, rows)
+    children = node.fetch_children(rows)
+    width = len(columns)
+    return [(node.shape(row, children), list(row[width:])) for row in rows]
+
+
+def _shape_chunk(node, rows):
+    children = node.fetch_children(rows)
+    return [node.shape(row, children) for row in rows]
+
+
+def iter_serialize(queryset, schema, chunk_size=2000):
+    """
+    Поток чанков по chunk_size элементов: строки читаются серверным курсором
+    (values_list().iterator), списочные поля догружаются одним запросом на чанк.
+    В памяти одновременно только один чанк.
+    """
+    plan = build_values_plan(queryset.model, schema)
+    if plan is None:
+        objects = plan_queryset(queryset, schema).iterator(chunk_size=chunk_size)
+        while chunk := list(islice(objects, chunk_size)):
+            yield [schema.from_orm(obj).model_dump() for obj in chunk]
+        return
+    columns, node = plan
+    rows = queryset.values_list(*columns).iterator(chunk_size=chunk_size)
+    while chunk := list(islice(rows, chunk_size)):
+        yield _shape_chunk(node, chunk)
+
+
+async def aiter_serialize(queryset, schema, chunk_size=2000):
+    """
+    iter_serialize для ASGI: генератор создаётся здесь, а каждый чанк (чтение курсора
+    и раскладка) берётся в синхронном потоке, том же, что держит соединение с БД.
+    """
+    chunks = iter_serialize(queryset, schema, chunk_size)
+    next_chunk = sync_to_async(next, thread_sensitive=True)
+    while (chunk := await next_chunk(chunks, None)) is not None:
+        yield chunk
+
+
+class FastQuery:
+    """Результат обработчика для быстрой сериализации: queryset и схема элемента."""
+    __slots__ = ("queryset", "schema")
+
+    def __init__(self, queryset, schema):
+        self.queryset = queryset
+        self.schema = schema
+
+    def resolve(self):
+        """Готовые элементы или, если схема не поддерживается, загруженные по плану объекты."""
+        items = serialize(self.queryset, self.schema)
+        if items is None:
+            return list(plan_queryset(self.queryset, self.schema))
+        return FastList(items)
+
+
+def fast(queryset, schema):
+    return FastQuery(queryset, schema)
+
+
+class FastList(list):
+    """Список уже сериализованных элементов - отдаётся рендереру без валидации схемой."""
+
+
+class FastPage(dict):
+    """Страница пагинации с уже сериализованными элементами."""
+
+
+def render_json(data):
+    if USE_ORJSON:
+        return orjson.dumps(data, default=_ninja_encode, option=orjson.OPT_PASSTHROUGH_DATETIME)
+    return json.dumps(data, cls=NinjaJSONEncoder)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer ninja; при API_RENDERER['ORJSON'] кодирует через orjson. Формат тогда компактный
+    (без пробелов и \\u-экранирования), даты и Decimal - как у DjangoJSONEncoder.
+    """
+
+    def __init__(self):
+        if USE_ORJSON and orjson is None:
+            raise ImproperlyConfigured("API_RENDERER['ORJSON'] требует пакет orjson")
+
+    def render(self, request, data, *, response_status):
+        return render_json(data)
+
+
+def json_response(data):
+    return HttpResponse(render_json(data), content_type="application/json; charset=utf-8")
+
+
+def _finish(result):
+    if isinstance(result, (FastList, FastPage)):
+        return json_response(result)
+    return result
+
+
+def fast_serialization(view_func):
+    """Хук NinjaAPI (mode="operation"): FastQuery и страницы с готовыми элементами - сразу в ответ."""
+    if inspect.iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def async_wrapper(request, *args, **kwargs):
+            result = await view_func(request, *args, **kwargs)
+            if isinstance(result, FastQuery):
+                # выборка и раскладка строк - одним переходом в синхронный поток
+                result = await sync_to_async(result.resolve)()
+            return _finish(result)
+
+        return async_wrapper
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        result = view_func(request, *args, **kwargs)
+        if isinstance(result, FastQuery):
+            result = result.resolve()
+        return _finish(result)
+
+    return wrapper
@@ -0,0 +1,137 @@
+import hashlib
+import inspect
+import secrets
+import time
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+_config = getattr(settings, "HTTP_CACHE", {})
+CACHE_ALIAS = _config.get("ALIAS", "default")
+TIMEOUT = _config.get("TIMEOUT", 300)
+MAX_AGE = _config.get("MAX_AGE", 0)
+
+VERSION_KEY = "http-cache:catalogue-version"
+MODIFIED_KEY = "http-cache:catalogue-modified"
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def catalogue_version():
+    """
+    (версия, время изменения) каталога. Версия - счётчик со случайным началом: смена версии -
+    атомарный incr, а если кэш потерял ключ, счётчик начнётся заново в другом месте
+    и старые ETag гарантированно не совпадут.
+    """
+    values = _cache().get_many([VERSION_KEY, MODIFIED_KEY])
+    if len(values) < 2:
+        if VERSION_KEY not in values and _cache().add(VERSION_KEY, secrets.randbits(48), None):
+            _touch_modified()
+        else:
+            _cache().add(MODIFIED_KEY, int(time.time()), None)
+        values = _cache().get_many([VERSION_KEY, MODIFIED_KEY])
+    return values[VERSION_KEY], values[MODIFIED_KEY]
+
+
+def _touch_modified():
+    # Last-Modified с точностью до секунды: время новой версии строго больше предыдущего
+    modified = max(int(time.time()), _cache().get(MODIFIED_KEY, 0) + 1)
+    _cache().set(MODIFIED_KEY, modified, None)
+    return modified
+
+
+def bump_catalogue_version():
+    """
+    Сменить версию каталога; возвращает (предыдущая версия, (новая версия, время изменения)),
+    предыдущая - None, если версии не было. Предыдущая - ровно та, из которой incr сделал новую:
+    если другой процесс сменил версию одновременно, у него будет своя пара (CatalogueSnapshot.apply
+    на это опирается). Атомарность - как у incr бэкенда кэша: у Redis и Memcached между процессами,
+    у LocMemCache - внутри процесса.
+    Вызывается после коммита (signals.py). QuerySet.update(), bulk_create() и bulk_update() сигналов
+    не шлют - после них версию нужно сменить явно, как в product_import. Обработчики с @read_replica
+    при отставании реплики могут сохранить под новой версией старое тело: реплика должна догонять
+    default быстрее, чем приходят чтения после записи.
+    """
+    try:
+        version = _cache().incr(VERSION_KEY)
+        previous = version - 1
+    except ValueError:
+        # ключа нет - новый счётчик; если его успел создать другой процесс, берём incr
+        version, previous = secrets.randbits(48), None
+        if not _cache().add(VERSION_KEY, version, None):
+            return bump_catalogue_version()
+    return previous, (version, _touch_modified())
+
+
+def _request_key(request):
+    query = urlencode(sorted(request.GET.lists()), doseq=True)
+    return f"{request.path}?{query}"
+
+
+def _lookup(request):
+    """ETag, время изменения, готовый ответ (304 или из кэша) и ключ для сохранения тела."""
+    version, modified = catalogue_version()
+    request_key = _request_key(request)
+    etag = '"%s"' % hashlib.sha1(f"{version}:{request_key}".encode()).hexdigest()[:20]
+    body_key = f"http-cache:{version}:{request_key}"
+
+    response = get_conditional_response(request, etag=etag, last_modified=modified)
+    if response is None:
+        cached = _cache().get(body_key)
+        if cached is not None:
+            content, content_type = cached
+            response = HttpResponse(content, content_type=content_type)
+    return etag, modified, response, body_key
+
+
+def _finish(response, etag, modified, body_key=None):
+    if body_key is not None:
+        _cache().set(body_key, (response.content, response["Content-Type"]), TIMEOUT)
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(modified)
+    patch_cache_control(response, public=True, max_age=MAX_AGE, must_revalidate=True)
+    return response
+
+
+def http_cache(view):
+    """
+    Кэширование GET-ответов публичного каталога для ninja (через decorate_view):
+    ETag и Last-Modified считаются из версии каталога без обращения к БД,
+    на условный GET с совпадающим ETag отдаётся 304, тело 200-ответа хранится в кэше
+    под ключом версия + путь + отсортированные query-параметры.
+    """
+    if inspect.iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return await view(request, *args, **kwargs)
+            etag, modified, response, body_key = _lookup(request)
+            if response is not None:
+                return _finish(response, etag, modified)
+            response = await view(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            return _finish(response, etag, modified, body_key)
+
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD"):
+            return view(request, *args, **kwargs)
+        etag, modified, response, body_key = _lookup(request)
+        if response is not None:
+            return _finish(response, etag, modified)
+        response = view(request, *args, **kwargs)
+        if response.status_code != 200:
+            return response
+        return _finish(response, etag, modified, body_key)
+
+    return wrapper
@@ -1,14 +1,25 @@
 from ninja import Router
 from ninja.security import HttpBearer
-from django.shortcuts import get_object_or_404
+from asgiref.sync import sync_to_async
+from django.shortcuts import aget_object_or_404
 from django.contrib.auth.models import User
+from django.db import transaction
+from ninja.errors import HttpError
 from rest_framework.authtoken.models import Token
 from .auth_backend import auth
+from .export import ExportFormat, export_response
+from .pagination import keyset_paginate
 from .permissions import permission_required, is_manager
-from ..models import Order, OrderItem, OrderStatus, Product, WishlistItem
-from ..schemas import OrderOut, OrderItemIn, OrderItemOut, OrderIn, StatusOut, ErrorOut
-
-from typing import List, Union
+from .fast_serialization import fast
+from .query_planner import plan_queryset
+from .throttling import RateLimit
+from ..db_router import read_replica
+from ..jobs import enqueue_on_commit
+from ..models import Order, OrderItem, OrderStatus, OrderStatusStats, Product, UserOrderStats, WishlistItem
+from ..tasks import notify_status_changed
+from ..schemas import OrderOut, OrderItemIn, OrderItemOut, OrderIn, StatusOut, ErrorOut, StatusStatsOut, UserStatsOut
+
+from typing import List, Optional, Union
 from decimal import Decimal
 from datetime import datetime
 
@@ -17,69 +28,133 @@ order_router = Router(tags=["orders"])
 
 
 @order_router.get("/", response={200: List[OrderOut], 403: ErrorOut}, auth = auth, summary="Список всех заказов (Менеджер)")
+@read_replica
+@keyset_paginate
 @permission_required(is_manager)
-def get_all_orders(request):
+async def get_all_orders(request):
     """Получить список всех заказов (только для менеджеров)"""
-    return Order.objects.all().prefetch_related("items__product").only("id", "user_id", "status", "total", "created_at")
+    return fast(Order.objects.order_by("-id"), OrderOut)
 
 
 @order_router.get("/my", response=List[OrderOut], auth=auth, summary="Список заказов текущего пользователя")
-def get_my_orders(request):
-    return Order.objects.filter(user=request.user).prefetch_related("items__product")
+async def get_my_orders(request):
+    return fast(Order.objects.filter(user=request.user), OrderOut)
 
 
 
 @order_router.get("/user/{user_id}", response={200: List[OrderOut], 403: ErrorOut, 404: ErrorOut}, auth=auth, summary="Список заказов по ID пользователя (Менеджер)")
 @permission_required(is_manager)
-def get_user_orders(request, user_id: int):
+async def get_user_orders(request, user_id: int):
     """Список заказов по ID пользователя (только для менеджеров)"""
 
-    target_user = get_object_or_404(User, id=user_id)
-    return Order.objects.filter(user=target_user).prefetch_related("items__product")
-
-
-@order_router.post("/", response={200: OrderOut, 400: ErrorOut}, auth=auth, summary="Создать заказ из Wishlist текущего пользователя")
-def create_order_from_wishlist(request):
-    wishlist = WishlistItem.objects.filter(user=request.user)
-
-    if not wishlist.exists():
+    target_user = await aget_object_or_404(User, id=user_id)
+    return fast(Order.objects.filter(user=target_user), OrderOut)
+
+
+@order_router.post("/", response={200: OrderOut, 400: ErrorOut, 409: ErrorOut, 429: ErrorOut}, auth=auth, summary="Создать заказ из Wishlist текущего пользователя",
+                   throttle=[RateLimit("checkout", "10/min", key="user")])
+async def create_order_from_wishlist(request):
+    """
+    Оформление за фиксированное число запросов в одной транзакции:
+    вишлист с ценами одним SELECT (с блокировкой строк там, где БД её поддерживает),
+    позиции через bulk_create, сумма считается в том же проходе.
+    """
+    # transaction.atomic работает только в синхронном коде - транзакция целиком уходит в поток
+    result = await sync_to_async(_checkout)(request.user)
+    if isinstance(result, tuple):
+        return result
+    return await plan_queryset(Order.objects.filter(id=result.id), OrderOut).aget()
+
+
+@transaction.atomic
+def _checkout(user):
+    wishlist = list(
+        WishlistItem.objects.select_for_update()
+        .filter(user=user)
+        .select_related("product")
+        .only("id", "quantity", "product", "product__price")
+    )
+    if not wishlist:
         return 400, {"detail": "Вишлист пуст!"}
 
-    try:
-        status = OrderStatus.objects.get(name="Новый")
-    except OrderStatus.DoesNotExist:
+    status = OrderStatus.objects.filter(name="Новый").first()
+    if status is None:
         return 400, {"detail": "Статус 'Новый' не найден"}
 
-    order = Order.objects.create(user=request.user, status=status, total=0)
-
     total = Decimal('0.00')
+    item_count = 0
+    order_items = []
     for item in wishlist:
         item_total = item.product.price * item.quantity
-        OrderItem.objects.create(
-            order=order,
-            product=item.product,
-            quantity=item.quantity,
-            cost=item_total,
-        )
+        order_items.append(OrderItem(product_id=item.product.id, quantity=item.quantity, cost=item_total))
         total += item_total
+        item_count += item.quantity
+
+    # bulk_create не шлёт сигналы: агрегаты заказа заданы сразу при создании
+    order = Order.objects.create(user=user, status=status, total=total, item_count=item_count)
+    for order_item in order_items:
+        order_item.order = order
+    OrderItem.objects.bulk_create(order_items)
+
+    # Очистить wishlist; если параллельное оформление уже забрало строки - откатываемся
+    deleted, _ = WishlistItem.objects.filter(id__in=[item.id for item in wishlist]).delete()
+    if deleted != len(wishlist):
+        raise HttpError(409, "Вишлист уже оформлен в другом заказе")
+    return order
 
-    order.total = total
-    order.save()
-
-    # Очистить wishlist
-    wishlist.delete()
+def _set_status(order, status):
+    # уведомление - в очереди задач, после коммита: при откате письма о несуществующем статусе не будет
+    with transaction.atomic():
+        order.status = status
+        order.save()
+        enqueue_on_commit(notify_status_changed, order_id=order.id, status_id=status.id)
 
-    return order
 
 @order_router.put("/{order_id}/status", response={200: OrderOut, 403: ErrorOut, 404: ErrorOut}, auth=auth, summary="Изменить статус заказа (Менеджер)")
 @permission_required(is_manager)
-def update_order_status(request, order_id: int, status_id: int):
+async def update_order_status(request, order_id: int, status_id: int):
     """Изменить статус заказа (только менеджер)"""
 
-    order = get_object_or_404(Order, id=order_id)
-    status = get_object_or_404(OrderStatus, id=status_id)
+    order = await aget_object_or_404(Order, id=order_id)
+    status = await aget_object_or_404(OrderStatus, id=status_id)
+
+    await sync_to_async(_set_status)(order, status)
 
-    order.status = status
-    order.save()
+    return await plan_queryset(Order.objects.filter(id=order.id), OrderOut).aget()
 
-    return order
\ No newline at end of file
+
+@order_router.get("/stats/statuses", response={200: List[StatusStatsOut], 403: ErrorOut}, auth=auth, summary="Сводка заказов по статусам (Менеджер)")
+@permission_required(is_manager)
+async def get_status_stats(request):
+    """Количество заказов, товаров и сумма по каждому статусу из поддерживаемых агрегатов"""
+    return [stats async for stats in OrderStatusStats.objects.select_related("status").order_by("status_id")]
+
+
+@order_router.get("/stats/users/{user_id}", response={200: UserStatsOut, 403: ErrorOut, 404: ErrorOut}, auth=auth, summary="Сводка заказов пользователя (Менеджер)")
+@permission_required(is_manager)
+async def get_user_stats(request, user_id: int):
+    """Количество заказов, товаров и сумма покупок пользователя из поддерживаемых агрегатов"""
+    stats = await UserOrderStats.objects.filter(user_id=user_id).afirst()
+    if stats is None:
+        await aget_object_or_404(User, id=user_id)
+        stats = UserOrderStats(user_id=user_id)
+    return stats
+
+
+@order_router.get("/export", response={200: None, 403: ErrorOut}, auth=auth, summary="Выгрузка заказов в NDJSON/CSV (Менеджер)")
+@permission_required(is_manager)
+async def export_orders(
+        request,
+        format: ExportFormat = "ndjson",
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+        status_id: Optional[int] = None):
+    """Все заказы с позициями потоком, без загрузки выгрузки в память; фильтры по дате создания и статусу"""
+    orders = Order.objects.order_by("id")
+    if created_from is not None:
+        orders = orders.filter(created_at__gte=created_from)
+    if created_to is not None:
+        orders = orders.filter(created_at__lte=created_to)
+    if status_id is not None:
+        orders = orders.filter(status_id=status_id)
+    return export_response(request, orders, OrderOut, format, "orders")
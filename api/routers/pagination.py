@@ -0,0 +1,198 @@
+import base64
+import binascii
+import json
+import math
+from bisect import bisect_left, bisect_right
+from decimal import Decimal
+from typing import Any, List, Optional, Tuple
+
+from django.core.exceptions import FieldDoesNotExist, FieldError, ValidationError
+from django.db.models import Q, QuerySet
+from ninja import Field, Schema
+from ninja.errors import HttpError
+from asgiref.sync import sync_to_async
+from ninja.pagination import AsyncPaginationBase, paginate
+
+from ..catalogue import SnapshotRows
+from .fast_serialization import FastPage, FastQuery, serialize
+from .query_planner import plan_queryset
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+
+def _reverse(ordering):
+    return tuple(f[1:] if f.startswith("-") else f"-{f}" for f in ordering)
+
+
+def encode_cursor(ordering, values, reverse=False):
+    payload = {"o": list(ordering), "k": values, "r": reverse}
+    raw = json.dumps(payload, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        return tuple(payload["o"]), list(payload["k"]), bool(payload["r"])
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise HttpError(400, "Некорректный курсор")
+
+
+class KeysetPagination(AsyncPaginationBase):
+    """
+    Keyset (seek) пагинация: вместо OFFSET страница начинается с условия
+    по ключу сортировки последней записи, поэтому любая страница стоит как первая.
+    Порядок берётся из order_by() возвращаемого queryset, к нему добавляется id.
+    """
+
+    class Input(Schema):
+        limit: int = Field(DEFAULT_LIMIT, ge=1)
+        cursor: Optional[str] = None
+
+    class Output(Schema):
+        items: List[Any]
+        next: Optional[str]
+        prev: Optional[str]
+
+    def __init__(self, max_limit: int = MAX_LIMIT, **kwargs: Any) -> None:
+        self.max_limit = max_limit
+        super().__init__(**kwargs)
+
+    def get_ordering(self, queryset: QuerySet) -> Tuple[str, ...]:
+        ordering = tuple(queryset.query.order_by) or tuple(queryset.model._meta.ordering)
+        ordering = tuple(f[:-2] + "id" if f.lstrip("-") == "pk" else f for f in ordering)
+        if "id" not in ordering and "-id" not in ordering:
+            # id в том же направлении, что и первый ключ: тогда индекс (поле, id) читается одним проходом
+            ordering += ("-id",) if ordering and ordering[0].startswith("-") else ("id",)
+        return ordering
+
+    def seek_filter(self, ordering, values) -> Q:
+        """Условие "строго после ключа" для составного порядка сортировки."""
+        condition = Q()
+        for i in reversed(range(len(ordering))):
+            field = ordering[i].lstrip("-")
+            lookup = "lt" if ordering[i].startswith("-") else "gt"
+            step = Q(**{f"{field}__{lookup}": values[i]})
+            if i < len(ordering) - 1:
+                step |= Q(**{field: values[i]}) & condition
+            condition = step
+        # ведущее нестрогое условие даёт планировщику диапазонный поиск по индексу
+        first = ordering[0].lstrip("-")
+        lookup = "lte" if ordering[0].startswith("-") else "gte"
+        return Q(**{f"{first}__{lookup}": values[0]}) & condition
+
+    def key_of(self, obj, ordering):
+        return [getattr(obj, f.lstrip("-")) for f in ordering]
+
+    def parse_key(self, queryset: QuerySet, ordering, values):
+        """Значения ключа из курсора, приведённые к типам полей: подделанный курсор - 400, а не 500."""
+        key = []
+        try:
+            for f, value in zip(ordering, values):
+                if value is None or isinstance(value, (list, dict)):
+                    raise TypeError(value)
+                name = f.lstrip("-")
+                try:
+                    field = queryset.model._meta.get_field(name)
+                except FieldDoesNotExist:
+                    # аннотация (search_rank); без известного output_field считаем ключ числом
+                    try:
+                        field = queryset.query.annotations[name].output_field
+                    except (KeyError, FieldError):
+                        field = None
+                value = field.to_python(value) if field is not None else float(value)
+                if isinstance(value, (float, Decimal)) and not math.isfinite(value):
+                    raise ValueError(value)
+                key.append(value)
+        except (ValueError, TypeError, ValidationError):
+            raise HttpError(400, "Некорректный курсор")
+        return key
+
+    def seek_queryset(self, queryset: QuerySet, pagination: Input):
+        """Queryset страницы (limit + 1 строка, чтобы узнать о следующей), порядок и направление."""
+        limit = min(pagination.limit, self.max_limit)
+        ordering = self.get_ordering(queryset)
+        reverse = False
+
+        if pagination.cursor:
+            cursor_ordering, values, reverse = decode_cursor(pagination.cursor)
+            if cursor_ordering != ordering or len(values) != len(ordering):
+                raise HttpError(400, "Некорректный курсор")
+            seek_ordering = _reverse(ordering) if reverse else ordering
+            values = self.parse_key(queryset, ordering, values)
+            queryset = queryset.filter(self.seek_filter(seek_ordering, values))
+
+        queryset = queryset.order_by(*(_reverse(ordering) if reverse else ordering))
+        return queryset[:limit + 1], limit, ordering, reverse
+
+    def paginate_queryset(self, queryset: QuerySet, pagination: Input, request, **params: Any) -> Any:
+        if isinstance(queryset, SnapshotRows):
+            return self.snapshot_page(queryset, pagination)
+        if isinstance(queryset, FastQuery):
+            return self.fast_page(queryset, pagination)
+        page, limit, ordering, reverse = self.seek_queryset(queryset, pagination)
+        return self.build_page(list(page), pagination, limit, ordering, reverse)
+
+    async def apaginate_queryset(self, queryset: QuerySet, pagination: Input, request, **params: Any) -> Any:
+        if isinstance(queryset, SnapshotRows):
+            return self.snapshot_page(queryset, pagination)
+        if isinstance(queryset, FastQuery):
+            return await sync_to_async(self.fast_page)(queryset, pagination)
+        page, limit, ordering, reverse = self.seek_queryset(queryset, pagination)
+        return self.build_page([obj async for obj in page], pagination, limit, ordering, reverse)
+
+    def fast_page(self, query: FastQuery, pagination: Input):
+        """Страница из values_list: элементы уже в форме схемы, значения ключей курсора - из той же выборки."""
+        page, limit, ordering, reverse = self.seek_queryset(query.queryset, pagination)
+        rows = serialize(page, query.schema, keys=[f.lstrip("-") for f in ordering])
+        if rows is None:
+            rows = list(plan_queryset(page, query.schema))
+            return self.build_page(rows, pagination, limit, ordering, reverse)
+        result = self.build_page(rows, pagination, limit, ordering, reverse, key_of=lambda row, _: row[1])
+        return FastPage(result, items=[item for item, _ in result["items"]])
+
+    def snapshot_page(self, rows: SnapshotRows, pagination: Input):
+        """Страница из снимка каталога: место курсора - бинарным поиском по отсортированным ключам."""
+        limit = min(pagination.limit, self.max_limit)
+        lo, hi, reverse = rows.lo, rows.hi, False
+        if pagination.cursor:
+            ordering, values, reverse = decode_cursor(pagination.cursor)
+            if ordering != rows.ordering or len(values) != len(ordering):
+                raise HttpError(400, "Некорректный курсор")
+            key = rows.parse_key(values)
+            if reverse == rows.descending:
+                lo = bisect_right(rows.keys, key, lo, hi)
+            else:
+                hi = bisect_left(rows.keys, key, lo, hi)
+        # keys по возрастанию: идём вверх, если страница в порядке возрастания ключа
+        if reverse == rows.descending:
+            indexes = range(lo, min(hi, lo + limit + 1))
+        else:
+            indexes = range(hi - 1, max(lo, hi - limit - 1) - 1, -1)
+        result = self.build_page([rows.items[i] for i in indexes], pagination, limit, rows.ordering, reverse)
+        return FastPage(result, items=[rows.render(item) for item in result["items"]])
+
+    def build_page(self, rows, pagination, limit, ordering, reverse, key_of=None):
+        key_of = key_of or self.key_of
+        has_more = len(rows) > limit
+        items = rows[:limit]
+        if reverse:
+            items.reverse()
+
+        next_cursor = prev_cursor = None
+        if items:
+            if has_more or reverse:
+                next_cursor = encode_cursor(ordering, key_of(items[-1], ordering))
+            if (has_more and reverse) or (pagination.cursor and not reverse):
+                prev_cursor = encode_cursor(ordering, key_of(items[0], ordering), reverse=True)
+
+        return {"items": items, "next": next_cursor, "prev": prev_cursor}
+
+
+def keyset_paginate(func=None, **paginator_params):
+    """Подключить KeysetPagination к обработчику списка: @keyset_paginate."""
+    if func is not None:
+        return paginate(KeysetPagination)(func)
+    return paginate(KeysetPagination, **paginator_params)
@@ -1,13 +1,58 @@
+import inspect
 from functools import wraps
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
 from ninja.errors import HttpError
+from ..metrics import measure
 
+MANAGER_GROUP = 'менеджеры'
 
-def permission_required(check_func):
+
+def _config():
+    return getattr(settings, 'PERMISSIONS_CACHE', {})
+
+
+def _cache():
+    return caches[_config().get('ALIAS', 'default')]
+
+
+def _shared_cache():
+    """
+    Кэш ролей между запросами или None. Кэш в памяти процесса (LocMem) не годится: отзыв роли
+    в одном воркере остальные увидят только через TTL, поэтому с ним роли каждый запрос читаются из БД.
+    """
+    cache = _cache()
+    return None if isinstance(cache, LocMemCache) else cache
+
+
+def permission_required(*checks):
+    """
+    Все переданные проверки должны пройти; проверки можно комбинировать через &, | и ~.
+    Работает и с sync, и с async обработчиками: для async роли загружаются заранее
+    через async ORM, а сами проверки берут их из кэша на объекте user.
+    """
     def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(request, *args, **kwargs):
+                user = getattr(request, 'user', None)
+                with measure("permission_ms"):
+                    if user:
+                        await aget_roles(user)
+                    allowed = user and all(check(user) for check in checks)
+                if not allowed:
+                    raise HttpError(403, "Нет доступа")
+                return await func(request, *args, **kwargs)
+
+            return async_wrapper
+
         @wraps(func)
         def wrapper(request, *args, **kwargs):
             user = getattr(request, 'user', None)
-            if not user or not check_func(user):
+            with measure("permission_ms"):
+                allowed = user and all(check(user) for check in checks)
+            if not allowed:
                 raise HttpError(403, "Нет доступа")
             return func(request, *args, **kwargs)
 
@@ -16,9 +61,96 @@ def permission_required(check_func):
     return decorator
 
 
+class Check:
+    """Обёртка над функцией-проверкой, поддерживающая составные условия."""
+
+    def __init__(self, func):
+        self.func = func
+
+    def __call__(self, user):
+        return self.func(user)
+
+    def __and__(self, other):
+        return Check(lambda user: self(user) and other(user))
+
+    def __or__(self, other):
+        return Check(lambda user: self(user) or other(user))
+
+    def __invert__(self):
+        return Check(lambda user: not self(user))
+
+
+def _version_keys(user_id):
+    return "perm-version", f"perm-version:{user_id}"
+
+
+def bump_permissions_version(user_id=None):
+    """Сделать устаревшими закэшированные роли пользователя (или всех, если user_id не указан)."""
+    global_key, user_key = _version_keys(user_id)
+    key = user_key if user_id is not None else global_key
+    cache = _shared_cache()
+    if cache is None:
+        return
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def _roles_key(cache, user_id):
+    keys = _version_keys(user_id)
+    versions = cache.get_many(keys)
+    return "perm-roles:{}:{}:{}".format(user_id, versions.get(keys[0], 0), versions.get(keys[1], 0))
+
+
+def _lookup_roles(user_id):
+    """(ключ, роли из общего кэша); ключ None - роли между запросами не кэшируются."""
+    cache = _shared_cache()
+    if cache is None:
+        return None, None
+    key = _roles_key(cache, user_id)
+    return key, cache.get(key)
+
+
+def _store_roles(key, roles):
+    if key is not None:
+        _shared_cache().set(key, roles, _config().get('TTL', 300))
+
+
+def get_roles(user):
+    """
+    Множество групп пользователя. Загружается один раз на запрос (кэш на объекте user)
+    и, если PERMISSIONS_CACHE['ALIAS'] - общий кэш, хранится в нём между запросами с ключом,
+    включающим версии прав.
+    """
+    roles = getattr(user, '_api_roles', None)
+    if roles is None:
+        key, roles = _lookup_roles(user.pk)
+        if roles is None:
+            roles = frozenset(user.groups.values_list('name', flat=True))
+            _store_roles(key, roles)
+        user._api_roles = roles
+    return roles
+
+
+async def aget_roles(user):
+    roles = getattr(user, '_api_roles', None)
+    if roles is None:
+        key, roles = _lookup_roles(user.pk)
+        if roles is None:
+            roles = frozenset([name async for name in user.groups.values_list('name', flat=True)])
+            _store_roles(key, roles)
+        user._api_roles = roles
+    return roles
+
+
+def has_role(*names):
+    return Check(lambda user: any(name in get_roles(user) for name in names))
+
+
+@Check
 def is_staff(user):
     return user.is_staff
 
 
-def is_manager(user):
-    return user.groups.filter(name='менеджеры').exists()
+is_manager = has_role(MANAGER_GROUP)
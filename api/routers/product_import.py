@@ -0,0 +1,181 @@
+"""
+Пакетный импорт товаров из CSV/NDJSON. Строки читаются потоком и обрабатываются пачками
+по BATCH_SIZE: slug категорий разрешаются одним запросом на новые slug пачки, существующие
+товары (строки с id) - одним in_bulk, запись - bulk_create/bulk_update в транзакции пачки.
+Поисковый индекс и версия HTTP-кэша обновляются явно: bulk-операции не шлют сигналы.
+
+Номер строки в отчёте об ошибках - номер строки файла с 1 для обоих форматов: в CSV строка 1 -
+заголовок, первая запись - строка 2; в NDJSON первая запись - строка 1, пустые строки тоже считаются.
+"""
+import codecs
+import csv
+import json
+from decimal import Decimal
+from itertools import islice
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from pydantic import ValidationError
+
+from ..models import Category, Product
+from ..schemas import ProductImportIn
+from ..search import get_search_backend
+from .http_cache import bump_catalogue_version
+
+BATCH_SIZE = 1000
+# в отчёт попадают первые MAX_ERRORS ошибок, остальные только считаются
+MAX_ERRORS = 1000
+
+FIELDS = ("title", "category", "description", "price")
+REQUIRED = ("title", "category", "price")
+# поля, которые проверяются ещё и по модели: длина заголовка, разрядность и конечность цены
+MODEL_FIELDS = ("title", "description", "price")
+ENCODING_ERROR = "Некорректная кодировка строки: ожидается UTF-8"
+
+
+class RowError(Exception):
+    pass
+
+
+def _decode(lines, invalid):
+    """Строки файла как текст; номера строк не в UTF-8 попадают в invalid, сами строки - с заменой символов."""
+    for number, line in enumerate(lines, 1):
+        if number == 1 and line.startswith(codecs.BOM_UTF8):
+            line = line[len(codecs.BOM_UTF8):]
+        try:
+            yield line.decode("utf-8")
+        except UnicodeDecodeError:
+            invalid.add(number)
+            yield line.decode("utf-8", "replace")
+
+
+def iter_records(lines, fmt):
+    """(номер строки файла, dict или RowError) из итератора байтовых строк."""
+    invalid = set()
+    text = _decode(lines, invalid)
+    if fmt == "csv":
+        reader = csv.DictReader(text)
+        for record in reader:
+            # строки декодируются по мере чтения, так что все испорченные относятся к этой записи
+            if invalid:
+                invalid.clear()
+                yield reader.line_num, RowError(ENCODING_ERROR)
+                continue
+            # line_num - строка файла с учётом заголовка; пустые ячейки CSV - не заданные поля
+            yield reader.line_num, {k: v for k, v in record.items() if k and v not in ("", None)}
+        return
+    for number, line in enumerate(text, 1):
+        if number in invalid:
+            yield number, RowError(ENCODING_ERROR)
+            continue
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield number, RowError(f"Некорректный JSON: {e}")
+            continue
+        yield number, record if isinstance(record, dict) else RowError("Строка должна быть объектом JSON")
+
+
+def _validate(record):
+    if isinstance(record, RowError):
+        raise record
+    try:
+        row = ProductImportIn.model_validate(record)
+    except ValidationError as e:
+        raise RowError("; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()))
+    if row.id is None:
+        missing = [name for name in REQUIRED if getattr(row, name) is None]
+        if missing:
+            raise RowError(f"Для нового товара обязательны поля: {', '.join(missing)}")
+    if row.price is not None and row.price < 0:
+        raise RowError("Цена не может быть отрицательной")
+    for name in MODEL_FIELDS:
+        value = getattr(row, name)
+        if value is None:
+            continue
+        try:
+            # bulk_create не вызывает full_clean: NaN или цена больше DecimalField(10, 2) иначе уронят импорт
+            Product._meta.get_field(name).clean(Decimal(str(value)) if name == "price" else value, None)
+        except DjangoValidationError as e:
+            raise RowError(f"{name}: {' '.join(e.messages)}")
+    return row
+
+
+class ProductImporter:
+    def __init__(self, batch_size=BATCH_SIZE):
+        self.batch_size = batch_size
+        self.categories = {}
+        self.created = self.updated = self.failed = 0
+        self.errors = []
+
+    def error(self, number, message):
+        self.failed += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append({"row": number, "error": str(message)})
+
+    def run(self, records):
+        records = iter(records)
+        try:
+            while batch := list(islice(records, self.batch_size)):
+                self.import_batch(batch)
+        finally:
+            # пачки фиксируются по отдельности: если следующая упала, предыдущие уже в каталоге
+            if self.created or self.updated:
+                transaction.on_commit(bump_catalogue_version)
+        return self.report()
+
+    def report(self):
+        errors = sorted(self.errors, key=lambda error: error["row"])
+        return {"created": self.created, "updated": self.updated, "failed": self.failed, "errors": errors}
+
+    def _resolve_categories(self, rows):
+        slugs = {row.category for _, row in rows if row.category is not None} - self.categories.keys()
+        if slugs:
+            self.categories.update(Category.objects.filter(slug__in=slugs).values_list("slug", "id"))
+
+    @transaction.atomic
+    def import_batch(self, batch):
+        rows = []
+        for number, record in batch:
+            try:
+                rows.append((number, _validate(record)))
+            except RowError as e:
+                self.error(number, e)
+
+        self._resolve_categories(rows)
+        existing = Product.objects.in_bulk([row.id for _, row in rows if row.id is not None])
+        to_create, to_update = [], {}
+        for number, row in rows:
+            if row.category is not None and row.category not in self.categories:
+                self.error(number, f"Категория {row.category} не найдена")
+                continue
+            values = {name: getattr(row, name) for name in FIELDS if getattr(row, name) is not None}
+            if "category" in values:
+                values["category_id"] = self.categories[values.pop("category")]
+            if "price" in values:
+                values["price"] = Decimal(str(values["price"]))
+            if row.id is None:
+                to_create.append(Product(description=values.pop("description", ""), **values))
+                continue
+            product = existing.get(row.id)
+            if product is None:
+                self.error(number, f"Товар {row.id} не найден")
+                continue
+            for name, value in values.items():
+                setattr(product, name, value)
+            to_update[product.id] = product
+
+        if to_create:
+            Product.objects.bulk_create(to_create)
+        if to_update:
+            Product.objects.bulk_update(to_update.values(), ["title", "category_id", "description", "price"])
+        get_search_backend().index([*to_create, *to_update.values()])
+        self.created += len(to_create)
+        self.updated += len(to_update)
+
+
+def import_products(lines, fmt, batch_size=BATCH_SIZE):
+    """Импорт из итератора байтовых строк (тело запроса, файл); отчёт - ImportReportOut."""
+    return ProductImporter(batch_size).run(iter_records(lines, fmt))
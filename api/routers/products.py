@@ -1,44 +1,120 @@
 from ninja import Router
-from typing import List, Optional
-from django.shortcuts import get_object_or_404
+from ninja.decorators import decorate_view
+from typing import List, Literal, Optional
+from asgiref.sync import sync_to_async
+from django.shortcuts import aget_object_or_404
 from .auth_backend import auth
+from .export import ExportFormat, export_response
+from .facets import MAX_BUCKETS, product_facets
+from .product_import import import_products
+from .http_cache import http_cache
+from .pagination import keyset_paginate
 from .permissions import is_manager, permission_required
+from .fast_serialization import fast
+from .query_planner import plan_queryset
+from ..catalogue import catalogue_snapshot
 from ..models import Product, Category
-from ..schemas import ProductIn, ProductOut, ProductFilter
+from ..db_router import read_replica
+from ..search import get_search_backend
+from ..schemas import ProductIn, ProductOut, ProductFilter, ProductFacetsOut, ImportReportOut
 
 product_router = Router(tags=["products"])
 
 
 @product_router.get("/", response=List[ProductOut], summary='Получить список товаров')
-def list_products(
+@read_replica
+@decorate_view(http_cache)
+@keyset_paginate
+async def list_products(
         request,
         min_price: Optional[float] = None,
         max_price: Optional[float] = None,
         title: Optional[str] = None,
-        description: Optional[str] = None):
-
+        description: Optional[str] = None,
+        q: Optional[str] = None,
+        order_by: Optional[Literal["id", "price", "-price", "relevance"]] = None):
+    """
+    q ищет по заголовку и описанию, title/description - по своему полю; слова ищутся по префиксу.
+    При поиске по умолчанию сортировка по релевантности.
+    """
+    if catalogue_snapshot.enabled and not (q or title or description):
+        # без текстового поиска "relevance" - это порядок по id, как и в SQL-пути
+        order_by = "id" if order_by in (None, "relevance") else order_by
+        return (await catalogue_snapshot.aget()).product_rows(min_price, max_price, order_by)
+
+    products, searching = _filter_products(min_price, max_price, title, description, q)
+    backend = get_search_backend()
+
+    if order_by is None:
+        order_by = "relevance" if searching and backend.supports_ranking else "id"
+    if order_by == "relevance":
+        order_by = "search_rank" if searching and backend.supports_ranking else "id"
+    products = products.order_by(order_by)
+
+    return fast(products, ProductOut)
+
+
+def _filter_products(min_price, max_price, title, description, q):
+    """Фильтры каталога, общие для списка и фасетов: (queryset, идёт ли текстовый поиск)."""
     products = Product.objects.all()
 
     if min_price is not None:
         products = products.filter(price__gte=min_price)
     if max_price is not None:
         products = products.filter(price__lte=max_price)
-    if title:
-        products = products.filter(title__icontains=title)
-    if description:
-        products = products.filter(description__icontains=description)
 
-    return products
+    searching = bool(q or title or description)
+    if searching:
+        products = get_search_backend().filter(products, text=q, title=title, description=description)
+    return products, searching
+
+
+@product_router.get("/facets", response=ProductFacetsOut, summary='Фасеты каталога: категории и гистограмма цен')
+@read_replica
+@decorate_view(http_cache)
+async def get_product_facets(
+        request,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        title: Optional[str] = None,
+        description: Optional[str] = None,
+        q: Optional[str] = None,
+        buckets: int = 10):
+    """
+    Для тех же фильтров, что у списка товаров: число товаров, мин/макс цена по категориям
+    и гистограмма цен из buckets корзин (не больше 50). Два SQL-запроса при любом числе категорий.
+    """
+    products, _ = _filter_products(min_price, max_price, title, description, q)
+    return await sync_to_async(product_facets)(products, min(max(buckets, 1), MAX_BUCKETS))
+
+
+@product_router.get("/export", response={200: None, 403: dict}, auth=auth, summary='Выгрузка товаров в NDJSON/CSV (Менеджер)')
+@permission_required(is_manager)
+async def export_products(
+        request,
+        format: ExportFormat = "ndjson",
+        category: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None):
+    """Весь каталог потоком; фильтры по slug категории и диапазону цен"""
+    products = Product.objects.order_by("id")
+    if category is not None:
+        products = products.filter(category__slug=category)
+    if min_price is not None:
+        products = products.filter(price__gte=min_price)
+    if max_price is not None:
+        products = products.filter(price__lte=max_price)
+    return export_response(request, products, ProductOut, format, "products")
 
 
 @product_router.post("/", response={201: ProductOut, 404: dict, 422: dict}, auth=auth, summary='Добавить товар (Менеджер)')
 @permission_required(is_manager)
-def create_product(request, payload: ProductIn):
-    category = Category.objects.filter(slug=payload.category).first()
+async def create_product(request, payload: ProductIn):
+    category = await Category.objects.filter(slug=payload.category).afirst()
     if not category:
         return 404, {"error": "Категория не найдена"}
 
-    product = Product.objects.create(
+    product = await Product.objects.acreate(
         title=payload.title,
         category=category,
         description=payload.description,
@@ -47,9 +123,23 @@ def create_product(request, payload: ProductIn):
     return 201, product
 
 
+@product_router.post("/import", response={200: ImportReportOut, 403: dict}, auth=auth, summary='Пакетный импорт товаров из CSV/NDJSON (Менеджер)')
+@permission_required(is_manager)
+async def import_products_feed(request, format: ExportFormat = "ndjson"):
+    """
+    Тело запроса - CSV с заголовком или NDJSON с полями ProductIn (+ id для обновления).
+    Строки без id создают товары, с id - обновляют заданные поля. Ошибки - построчно в отчёте.
+    """
+    # тело читается построчно, а не целиком через request.body
+    return await sync_to_async(import_products)(request, format)
+
+
 @product_router.get("/{product_id}", response={200: ProductOut, 404: dict}, summary='Получить товар по id')
-def get_product(request, product_id: int):
-    product = get_object_or_404(Product, id=product_id)
+@decorate_view(http_cache)
+async def get_product(request, product_id: int):
+    if catalogue_snapshot.enabled:
+        return (await catalogue_snapshot.aget()).get_product(product_id)
+    product = await aget_object_or_404(plan_queryset(Product.objects.all(), ProductOut), id=product_id)
     if not product:
         return 404, {"detail": "Товар не найден"}
     return product
@@ -57,14 +147,14 @@ def get_product(request, product_id: int):
 
 @product_router.patch("/{product_id}", response={200: ProductOut, 404: dict}, auth=auth, summary='Изменить информацию товара (Менеджер)')
 @permission_required(is_manager)
-def update_product(request, product_id: int, payload: ProductIn):
-    product = get_object_or_404(Product, id=product_id)
+async def update_product(request, product_id: int, payload: ProductIn):
+    product = await aget_object_or_404(Product.objects.select_related("category"), id=product_id)
 
     if not product:
         return 404, {"detail": "Товар не найден"}
 
     if payload.category:
-        category = Category.objects.filter(slug=payload.category).first()
+        category = await Category.objects.filter(slug=payload.category).afirst()
         if not category:
             return 404, {"error": "Категория не найдена"}
         product.category = category
@@ -76,15 +166,15 @@ def update_product(request, product_id: int, payload: ProductIn):
     if payload.price is not None:
         product.price = payload.price
 
-    product.save()
+    await product.asave()
     return product
 
 
 @product_router.delete("/{product_id}", auth=auth, summary='Удалить товар (Менеджер)')
 @permission_required(is_manager)
-def delete_product(request, product_id: int):
-    product = get_object_or_404(Product, id=product_id)
+async def delete_product(request, product_id: int):
+    product = await aget_object_or_404(Product, id=product_id)
     if not product:
         return 404, {"detail": "Товар не найден"}
-    product.delete()
+    await product.adelete()
     return {"success": True}
@@ -0,0 +1,98 @@
+import types
+from functools import lru_cache
+from typing import List, Union, get_args, get_origin
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch, QuerySet
+from ninja import Schema
+
+
+def _unwrap(annotation):
+    """Вернуть (вложенная схема, это список?) для аннотации поля или (None, False)."""
+    many = False
+    while True:
+        origin = get_origin(annotation)
+        if origin in (Union, types.UnionType):
+            args = [a for a in get_args(annotation) if a is not type(None)]
+            if len(args) != 1:
+                return None, False
+            annotation = args[0]
+        elif origin in (list, List, tuple, set):
+            many = True
+            annotation = get_args(annotation)[0]
+        else:
+            break
+    if isinstance(annotation, type) and issubclass(annotation, Schema):
+        return annotation, many
+    return None, False
+
+
+@lru_cache(maxsize=None)
+def build_plan(model, schema):
+    """
+    Разобрать дерево схемы относительно модели.
+    План: (only, select_related, prefetch), где prefetch - кортеж (путь, модель, вложенный план).
+    only = None, если какое-то поле схемы не является полем модели (тогда грузим все колонки).
+    """
+    only = {model._meta.pk.name}
+    select, prefetch = [], []
+    concrete = {f.attname: f.name for f in model._meta.concrete_fields}
+    concrete.update({f.name: f.name for f in model._meta.concrete_fields})
+
+    for name, field_info in schema.model_fields.items():
+        attr = field_info.alias if isinstance(field_info.alias, str) else name
+        nested, many = _unwrap(field_info.annotation)
+        try:
+            model_field = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            model_field = None
+
+        if nested is not None and model_field is not None and model_field.is_relation:
+            related = model_field.related_model
+            if many or model_field.one_to_many or model_field.many_to_many:
+                prefetch.append((attr, related, build_plan(related, nested), model_field))
+                continue
+            sub_only, sub_select, sub_prefetch = build_plan(related, nested)
+            select.append(attr)
+            select.extend(f"{attr}__{path}" for path in sub_select)
+            prefetch.extend((f"{attr}__{path}", rel, plan, mf) for path, rel, plan, mf in sub_prefetch)
+            if only is not None:
+                only.add(attr)
+                only.update(f"{attr}__{f}" for f in sub_only or ())
+                if sub_only is None:
+                    only = None
+        elif attr in concrete:
+            if only is not None:
+                only.add(concrete[attr])
+        else:
+            only = None
+
+    return (frozenset(only) if only is not None else None), tuple(select), tuple(prefetch)
+
+
+def _apply(queryset, plan, keep=()):
+    only, select, prefetch = plan
+    if select:
+        queryset = queryset.select_related(*select)
+    for path, related, sub_plan, model_field in prefetch:
+        # обратная связь к родителю нужна, чтобы Django разложил строки по объектам
+        back = () if model_field.many_to_many else (model_field.field.name,)
+        queryset = queryset.prefetch_related(
+            Prefetch(path, queryset=_apply(related._default_manager.all(), sub_plan, back))
+        )
+    if only is not None:
+        queryset = queryset.only(*only, *keep)
+    return queryset
+
+
+def plan_queryset(queryset: QuerySet, schema) -> QuerySet:
+    """
+    Добавить к queryset select_related/prefetch_related/only по дереву схемы ответа,
+    чтобы сериализация списка выполнялась фиксированным числом запросов.
+    """
+    return _apply(queryset, build_plan(queryset.model, schema))
+
+
+async def afetch(queryset: QuerySet, schema) -> list:
+    """plan_queryset + выборка в список для async-обработчиков (сериализация идёт уже без БД)."""
+    return [obj async for obj in plan_queryset(queryset, schema)]
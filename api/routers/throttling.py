@@ -0,0 +1,173 @@
+"""
+Ограничение частоты запросов для маршрутов ninja: RateLimit передаётся в throttle= декоратора
+маршрута. Ninja проверяет лимиты до разбора тела и вызова обработчика, отказ - 429 с Retry-After.
+
+Бэкенды (THROTTLING['BACKEND']):
+- memory - token bucket в памяти процесса: проверка без ввода-вывода, лимит на каждый воркер;
+- cache - скользящее окно из двух счётчиков в кэше Django (THROTTLING['CACHE']), общий лимит
+  для всех воркеров при Redis/Memcached. Отказ - одно чтение get_many, без записи.
+"""
+import hashlib
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import caches
+from ninja.throttling import BaseThrottle
+
+
+def _config():
+    # читаем при каждом обращении: ENABLED переключается override_settings в тестах
+    return getattr(settings, "THROTTLING", {})
+
+
+_PERIODS = {"s": 1, "sec": 1, "m": 60, "min": 60, "h": 3600, "hour": 3600, "d": 86400, "day": 86400}
+_RATE = re.compile(r"^(\d+)/(\d*)([a-z]+)$")
+
+
+@lru_cache(maxsize=None)
+def parse_rate(rate):
+    """'10/min' -> (10, 60); допускается множитель периода: '100/5m'."""
+    match = _RATE.match(rate)
+    if match is None or match[3] not in _PERIODS or int(match[1]) < 1:
+        raise ValueError(f"Неверный формат лимита: {rate}")
+    return int(match[1]), int(match[2] or 1) * _PERIODS[match[3]]
+
+
+class MemoryBackend:
+    """
+    Token bucket на ключ: ёмкость limit, пополнение limit/period токенов в секунду.
+    Ключей не больше max_keys (LRU) - поток запросов с разных адресов не раздует память.
+    """
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+        self.timer = time.monotonic
+
+    def hit(self, key, limit, period):
+        """(пропустить ли запрос, через сколько секунд появится токен)."""
+        now = self.timer()
+        refill = limit / period
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (limit, now))
+            tokens = min(limit, tokens + (now - updated) * refill)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, 0.0 if allowed else (1 - tokens) / refill
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class CacheBackend:
+    """
+    Скользящее окно: счётчики текущего и предыдущего окна, предыдущий учитывается с весом
+    оставшейся доли окна. incr атомарен в Redis/Memcached, поэтому лимит общий для воркеров.
+    """
+
+    def __init__(self, alias="default"):
+        self.alias = alias
+        self.timer = time.time
+
+    def hit(self, key, limit, period):
+        now = self.timer()
+        window, elapsed = divmod(now, period)
+        current_key, previous_key = f"throttle:{key}:{int(window)}", f"throttle:{key}:{int(window) - 1}"
+        cache = caches[self.alias]
+        counts = cache.get_many([current_key, previous_key])
+        current, previous = counts.get(current_key, 0), counts.get(previous_key, 0)
+        weight = 1 - elapsed / period
+        if previous * weight + current >= limit:
+            # сколько ждать, пока вес предыдущего окна не опустится настолько, чтобы влез запрос
+            if previous and current < limit:
+                wait = period * (1 - (limit - 1 - current) / previous) - elapsed
+            else:
+                wait = period - elapsed
+            return False, max(wait, 0.0)
+        if not cache.add(current_key, 1, period * 2):
+            try:
+                cache.incr(current_key)
+            except ValueError:
+                # ключ истёк между add и incr
+                cache.add(current_key, 1, period * 2)
+        return True, 0.0
+
+    def clear(self):
+        pass
+
+
+def _make_backend():
+    config = _config()
+    if config.get("BACKEND", "memory") == "cache":
+        return CacheBackend(config.get("CACHE", "default"))
+    return MemoryBackend(config.get("MAX_KEYS", 100000))
+
+
+backend = _make_backend()
+
+
+_ident = BaseThrottle()
+
+
+def _client_ip(request):
+    # адрес из X-Forwarded-For с учётом NINJA_NUM_PROXIES, как у встроенных throttle ninja
+    return _ident.get_ident(request) or "unknown"
+
+
+def _token(request):
+    header = request.headers.get("Authorization", "")
+    if not header:
+        return None
+    # сам токен в ключ не кладём: ключи общего кэша видны всем, у кого есть доступ к кэшу
+    return hashlib.sha1(header.encode()).hexdigest()[:20]
+
+
+def _user(request):
+    user = getattr(request, "auth", None) or getattr(request, "user", None)
+    if user is not None and getattr(user, "is_authenticated", False):
+        return str(user.pk)
+    return None
+
+
+KEY_FUNCTIONS = {"ip": _client_ip, "user": _user, "token": _token}
+
+
+class RateLimit(BaseThrottle):
+    """
+    Лимит scope для маршрута: RateLimit("login", "10/min", key="ip").
+    key - "ip", "user", "token" или функция request -> строка; если ключа нет (анонимный запрос
+    при key="user"), лимит на запрос не действует. THROTTLING['RATES'][scope] переопределяет rate.
+    """
+
+    def __init__(self, scope, rate, key="ip"):
+        self.scope = scope
+        self.rate = _config().get("RATES", {}).get(scope, rate)
+        self.limit, self.period = parse_rate(self.rate)
+        self.key_func = KEY_FUNCTIONS[key] if isinstance(key, str) else key
+        # wait() вызывается сразу после отказа в том же потоке - храним задержку по потокам
+        self._wait = threading.local()
+
+    def allow_request(self, request):
+        if not _config().get("ENABLED", True):
+            return True
+        ident = self.key_func(request)
+        if ident is None:
+            return True
+        allowed, wait = backend.hit(f"{self.scope}:{ident}", self.limit, self.period)
+        self._wait.value = None if allowed else wait
+        return allowed
+
+    def wait(self):
+        wait = getattr(self._wait, "value", None)
+        return None if wait is None else max(math.ceil(wait), 1)
@@ -0,0 +1,130 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+
+# поля пользователя, которые кладём в снимок; остальные останутся отложенными
+SNAPSHOT_FIELDS = ("id", "username", "first_name", "last_name", "email", "is_active", "is_staff", "is_superuser")
+
+
+def snapshot_user(user):
+    return tuple(getattr(user, f) for f in SNAPSHOT_FIELDS)
+
+
+def restore_user(snapshot):
+    """Собрать User из снимка без похода в БД (как будто загружен через .only())."""
+    return User.from_db(DEFAULT_DB_ALIAS, SNAPSHOT_FIELDS, snapshot)
+
+
+class TokenCache:
+    """
+    LRU-кэш с TTL: ключ токена -> снимок пользователя.
+    Если задан shared_alias, второй уровень - кэш Django с этим алиасом (общий для воркеров).
+    """
+
+    def __init__(self, max_size=10000, ttl=10, shared_alias=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.shared_alias = shared_alias
+        self._data = OrderedDict()
+        self._by_user = {}
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.shared_hits = self.evictions = self.invalidations = 0
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias] if self.shared_alias else None
+
+    def _shared_key(self, key):
+        return f"token-auth:{key}"
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires, snapshot = entry
+                if expires > now:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return snapshot
+                self._drop(key)
+
+        if self.shared is not None:
+            snapshot = self.shared.get(self._shared_key(key))
+            if snapshot is not None:
+                with self._lock:
+                    self.shared_hits += 1
+                self._store(key, snapshot)
+                return snapshot
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key, snapshot):
+        self._store(key, snapshot)
+        if self.shared is not None:
+            self.shared.set(self._shared_key(key), snapshot, self.ttl)
+
+    def _store(self, key, snapshot):
+        with self._lock:
+            self._drop(key)
+            self._data[key] = (time.monotonic() + self.ttl, snapshot)
+            self._by_user.setdefault(snapshot[0], set()).add(key)
+            while len(self._data) > self.max_size:
+                self._drop(next(iter(self._data)))
+                self.evictions += 1
+
+    def _drop(self, key):
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            keys = self._by_user.get(entry[1][0])
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_user[entry[1][0]]
+
+    def invalidate(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._drop(key)
+            self.invalidations += len(keys)
+        if self.shared is not None and keys:
+            self.shared.delete_many([self._shared_key(k) for k in keys])
+
+    def invalidate_user(self, user_id, keys=()):
+        with self._lock:
+            keys = set(keys) | self._by_user.get(user_id, set())
+        self.invalidate(*keys)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._by_user.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "shared_hits": self.shared_hits,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+_config = getattr(settings, "TOKEN_AUTH_CACHE", {})
+
+token_cache = TokenCache(
+    max_size=_config.get("MAX_SIZE", 10000),
+    ttl=_config.get("TTL", 10),
+    shared_alias=_config.get("SHARED_CACHE"),
+)
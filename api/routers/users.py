@@ -1,32 +1,38 @@
 from ninja import Router
 from django.contrib.auth.models import User
 from .auth_backend import auth
+from ..db_router import read_replica
 from ..schemas import UserOut, ErrorOut
 from typing import List
 from ..models import ManagerRequest
-from .permissions import permission_required, is_manager
+from .pagination import keyset_paginate
+from .permissions import aget_roles, permission_required, is_manager
+from .query_planner import plan_queryset
 
 user_router = Router(tags=["users"])
 
 
 @user_router.get("/users/", response={200: List[UserOut], 403: ErrorOut}, auth=auth, summary="Получить список пользователей (Менеджер)")
+@read_replica
+@keyset_paginate
 @permission_required(is_manager)
-def list_users(request):
+async def list_users(request):
     """Получить список пользователей (только для менеджеров)"""
-    qs = User.objects.all()
+    qs = plan_queryset(User.objects.order_by("id"), UserOut)
     return qs
 
 
 @user_router.post("/request-manager", response={200: dict, 400: ErrorOut}, auth=auth, summary="Подать заявку на стать менеджером")
-def request_manager(request):
+async def request_manager(request):
     user = request.user
+    await aget_roles(user)
 
-    if user.groups.filter(name='менеджеры').exists():
+    if is_manager(user):
         return 400, {"detail": "Вы уже являетесь менеджером."}
 
-    existing_request = ManagerRequest.objects.filter(user=user, status='ожидает рассмотрения').first()
+    existing_request = await ManagerRequest.objects.filter(user=user, status='ожидает рассмотрения').afirst()
     if existing_request:
         return 400, {"detail": "Заявка уже подана и находится в ожидании."}
 
-    ManagerRequest.objects.create(user=user)
+    await ManagerRequest.objects.acreate(user=user)
     return {"message": "Ваша заявка принята. Ожидайте подтверждения."}
\ No newline at end of file
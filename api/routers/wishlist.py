@@ -1,11 +1,16 @@
 from ninja import Router
 from ninja.security import HttpBearer
-from django.shortcuts import get_object_or_404
+from asgiref.sync import sync_to_async
+from django.shortcuts import aget_object_or_404
 from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.db.models import F
 
+from .fast_serialization import fast
 from .permissions import is_manager, permission_required
+from .query_planner import afetch
 from ..models import WishlistItem, Product
-from ..schemas import WishlistItemOut, WishlistItemIn, ErrorOut
+from ..schemas import WishlistItemOut, WishlistItemIn, WishlistBatchIn, ErrorOut
 from typing import List
 from .auth_backend import auth
 
@@ -15,58 +20,122 @@ wishlist_router = Router(tags=["wishlist"])
 
 
 @wishlist_router.get("/", response=List[WishlistItemOut], auth=auth, summary='Получить вишлист текущего пользователя')
-def get_wishlist(request):
-    return WishlistItem.objects.filter(user=request.user)
+async def get_wishlist(request):
+    return await afetch(WishlistItem.objects.filter(user=request.user), WishlistItemOut)
 
 
 @wishlist_router.get("/user/{user_id}", response={200: List[WishlistItemOut], 403: ErrorOut, 404: ErrorOut}, auth=auth, summary="Получить вишлист пользователя по ID (Менеджер)")
 @permission_required(is_manager)
-def get_user_wishlist_for_manager(request, user_id: int):
+async def get_user_wishlist_for_manager(request, user_id: int):
     """Получает вишлист пользователя по ID — только для менеджеров"""
     user = request.user
 
-    target_user = get_object_or_404(User, id=user_id)
-    wishlist_items = WishlistItem.objects.filter(user=target_user)
+    target_user = await aget_object_or_404(User, id=user_id)
+    wishlist_items = await afetch(WishlistItem.objects.filter(user=target_user), WishlistItemOut)
 
     return wishlist_items
 
 
 @wishlist_router.post("/", response={200: WishlistItemOut, 400: ErrorOut}, auth=auth, summary='Добавить товар в вишлист')
-def add_to_wishlist(request, data: WishlistItemIn):
-    product = get_object_or_404(Product, id=data.product_id)
-    item, created = WishlistItem.objects.get_or_create(
-        user=request.user,
-        product=product,
-        defaults={"quantity": data.quantity}
-    )
-    if not created:
-        item.quantity += data.quantity
-        item.save()
-
+async def add_to_wishlist(request, data: WishlistItemIn):
+    product = await aget_object_or_404(Product.objects.select_related("category"), id=data.product_id)
+    # количество меняется в БД (quantity = quantity + n), а не пересчётом в Python -
+    # параллельные добавления одного товара не теряют друг друга
+    item = await sync_to_async(_increment)(request.user, product.id, data.quantity)
     item.product = product
 
     return item
 
 
+def _increment(user, product_id, quantity):
+    """UPDATE ... SET quantity = quantity + n; строки нет - INSERT, проигравший гонку INSERT повторяет UPDATE."""
+    items = WishlistItem.objects.filter(user=user, product_id=product_id)
+    if not items.update(quantity=F("quantity") + quantity):
+        try:
+            with transaction.atomic():
+                return WishlistItem.objects.create(user=user, product_id=product_id, quantity=quantity)
+        except IntegrityError:
+            items.update(quantity=F("quantity") + quantity)
+    return items.only("id", "quantity").get()
+
+
+@wishlist_router.post("/batch", response={200: List[WishlistItemOut], 400: ErrorOut, 404: ErrorOut}, auth=auth, summary='Пакетное изменение вишлиста')
+async def batch_update_wishlist(request, data: WishlistBatchIn):
+    """
+    Операции add/set/decrement/remove применяются по порядку в одной транзакции:
+    товары проверяются одним запросом, изменения пишутся bulk upsert и одним DELETE.
+    Возвращает вишлист после изменений.
+    """
+    for operation in data.operations:
+        if operation.quantity < (0 if operation.op == "set" else 1):
+            return 400, {"detail": f"Недопустимое количество для товара {operation.product_id}"}
+
+    result = await sync_to_async(_apply_batch)(request.user, data.operations)
+    if result is not None:
+        return result
+    return fast(WishlistItem.objects.filter(user=request.user), WishlistItemOut)
+
+
+@transaction.atomic
+def _apply_batch(user, operations):
+    product_ids = {operation.product_id for operation in operations}
+    missing = product_ids - set(Product.objects.filter(id__in=product_ids).values_list("id", flat=True))
+    if missing:
+        return 404, {"detail": f"Товары не найдены: {', '.join(map(str, sorted(missing)))}"}
+
+    current = dict(
+        WishlistItem.objects.select_for_update()
+        .filter(user=user, product_id__in=product_ids)
+        .values_list("product_id", "quantity")
+    )
+    quantities = dict(current)
+    for operation in operations:
+        product_id, quantity = operation.product_id, operation.quantity
+        if operation.op == "add":
+            quantities[product_id] = quantities.get(product_id, 0) + quantity
+        elif operation.op == "set":
+            quantities[product_id] = quantity
+        elif operation.op == "decrement" and product_id in quantities:
+            quantities[product_id] -= quantity
+        elif operation.op == "remove":
+            quantities.pop(product_id, None)
+
+    removed = [p for p in current if quantities.get(p, 0) <= 0]
+    changed = [
+        WishlistItem(user=user, product_id=p, quantity=q)
+        for p, q in quantities.items() if q > 0 and current.get(p) != q
+    ]
+    if removed:
+        WishlistItem.objects.filter(user=user, product_id__in=removed).delete()
+    if changed:
+        WishlistItem.objects.bulk_create(
+            changed, update_conflicts=True, unique_fields=["user", "product"], update_fields=["quantity"]
+        )
+    return None
+
+
 @wishlist_router.delete("/{product_id}", response={200: dict, 404: ErrorOut}, auth=auth, summary='Удалить товар из вишлиста')
-def remove_from_wishlist(request, product_id: int):
+async def remove_from_wishlist(request, product_id: int):
     try:
-        item = WishlistItem.objects.get(user=request.user, product_id=product_id)
-        item.delete()
+        item = await WishlistItem.objects.aget(user=request.user, product_id=product_id)
+        await item.adelete()
         return {"success": True}
     except WishlistItem.DoesNotExist:
         return 404, {"detail": "Товар не найден в вишлисте"}
 
 
 @wishlist_router.delete("/{product_id}/decrement", response={200: dict, 404: ErrorOut}, auth=auth, summary='Уменьшить количество товара в вишлисте на единицу')
-def decrement_from_wishlist(request, product_id: int):
-    try:
-        item = WishlistItem.objects.get(user=request.user, product_id=product_id)
-        if item.quantity > 1:
-            item.quantity -= 1
-            item.save()
-        else:
-            item.delete()
-        return {"success": True}
-    except WishlistItem.DoesNotExist:
-        return 404, {"detail": "Товар не найден в вишлисте"}
\ No newline at end of file
+async def decrement_from_wishlist(request, product_id: int):
+    if not await sync_to_async(_decrement)(request.user, product_id):
+        return 404, {"detail": "Товар не найден в вишлисте"}
+    return {"success": True}
+
+
+@transaction.atomic
+def _decrement(user, product_id):
+    """Условный UPDATE quantity = quantity - 1 при quantity > 1, иначе DELETE последней единицы."""
+    items = WishlistItem.objects.filter(user=user, product_id=product_id)
+    if items.filter(quantity__gt=1).update(quantity=F("quantity") - 1):
+        return True
+    deleted, _ = items.filter(quantity__lte=1).delete()
+    return deleted > 0
@@ -1,5 +1,5 @@
 from ninja import Schema
-from typing import Optional, List
+from typing import Optional, List, Literal
 from decimal import Decimal
 from datetime import datetime
 
@@ -67,6 +67,23 @@ class ProductIn(Schema):
     price: Optional[float] = None
 
 
+class ProductImportIn(ProductIn):
+    id: Optional[int] = None
+
+
+class ImportErrorOut(Schema):
+    # номер строки файла с 1: в CSV строка 1 - заголовок, у записи на нескольких строках - последняя
+    row: int
+    error: str
+
+
+class ImportReportOut(Schema):
+    created: int
+    updated: int
+    failed: int
+    errors: List[ImportErrorOut]
+
+
 class ProductOut(Schema):
     id: int
     title: str
@@ -79,6 +96,29 @@ class ProductOut(Schema):
         from_attributes = True
 
 
+class CategoryFacetOut(Schema):
+    id: int
+    title: str
+    slug: str
+    count: int
+    min_price: float
+    max_price: float
+
+
+class PriceBucketOut(Schema):
+    min_price: float
+    max_price: float
+    count: int
+
+
+class ProductFacetsOut(Schema):
+    total: int
+    min_price: Optional[float]
+    max_price: Optional[float]
+    categories: List[CategoryFacetOut]
+    price_histogram: List[PriceBucketOut]
+
+
 class ProductFilter(Schema):
     min_price: Optional[float]
     max_price: Optional[float]
@@ -91,6 +131,16 @@ class WishlistItemIn(Schema):
     quantity: Optional[int] = 1
 
 
+class WishlistOperationIn(Schema):
+    op: Literal["add", "set", "decrement", "remove"]
+    product_id: int
+    quantity: int = 1
+
+
+class WishlistBatchIn(Schema):
+    operations: List[WishlistOperationIn]
+
+
 class WishlistItemOut(Schema):
     id: int
     quantity: int
@@ -141,4 +191,18 @@ class OrderOut(Schema):
     items: List[OrderItemOut]
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+class StatusStatsOut(Schema):
+    status: StatusOut
+    order_count: int
+    item_count: int
+    total: float
+
+
+class UserStatsOut(Schema):
+    user_id: int
+    order_count: int
+    item_count: int
+    total: float
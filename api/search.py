@@ -0,0 +1,121 @@
+"""
+Полнотекстовый поиск товаров. Бэкенд выбирается настройкой PRODUCT_SEARCH_BACKEND:
+SqliteFTS5Backend держит инвертированный индекс в FTS5-таблице и обновляется из сигналов
+(signals.py), LikeSearchBackend - запасной вариант на icontains для остальных СУБД.
+FTS5 ищет по началу слов, а не по подстроке: title="LED" не найдёт "OLED" (icontains находил).
+"""
+import re
+from abc import ABC, abstractmethod
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from .models import Product
+
+_TERM_RE = re.compile(r"\w+")
+
+
+def split_terms(text):
+    return _TERM_RE.findall(text or "")
+
+
+class SearchBackend(ABC):
+    """Бэкенд поиска; index/remove/rebuild нужны только бэкендам с собственным индексом."""
+    supports_ranking = False
+
+    @abstractmethod
+    def filter(self, queryset, text=None, title=None, description=None):
+        """Отфильтровать queryset товаров; при supports_ranking добавить аннотацию search_rank."""
+
+    def index(self, products):
+        pass
+
+    def remove(self, product_ids):
+        pass
+
+    def rebuild(self):
+        pass
+
+
+class LikeSearchBackend(SearchBackend):
+    def filter(self, queryset, text=None, title=None, description=None):
+        for term in split_terms(text):
+            queryset = queryset.filter(Q(title__icontains=term) | Q(description__icontains=term))
+        if title:
+            queryset = queryset.filter(title__icontains=title)
+        if description:
+            queryset = queryset.filter(description__icontains=description)
+        return queryset
+
+
+class SqliteFTS5Backend(SearchBackend):
+    """
+    Таблица api_product_fts(title, description), rowid = Product.id.
+    Каждое слово запроса ищется как префикс, слова объединяются через AND,
+    ранжирование - bm25 с большим весом заголовка (меньше - релевантнее).
+    """
+    supports_ranking = True
+    table = "api_product_fts"
+    weights = (10.0, 1.0)
+
+    @staticmethod
+    def create_table(cursor):
+        cursor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS api_product_fts "
+            "USING fts5(title, description, tokenize='unicode61 remove_diacritics 2')"
+        )
+
+    def match_expression(self, text=None, title=None, description=None):
+        parts = [f'"{term}"*' for term in split_terms(text)]
+        parts += [f'title : "{term}"*' for term in split_terms(title)]
+        parts += [f'description : "{term}"*' for term in split_terms(description)]
+        return " AND ".join(parts)
+
+    def filter(self, queryset, text=None, title=None, description=None):
+        expression = self.match_expression(text, title, description)
+        if not expression:
+            if not (text or title or description):
+                return queryset
+            # в запросе нет слов (q=*, title=-): ничего не найдено, но search_rank нужен для сортировки
+            return queryset.none().annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+        product_table = Product._meta.db_table
+        matches = RawSQL(f"SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s", [expression])
+        rank = RawSQL(
+            f"(SELECT bm25({self.table}, {self.weights[0]}, {self.weights[1]}) FROM {self.table} "
+            f"WHERE {self.table}.rowid = {product_table}.id AND {self.table} MATCH %s)",
+            [expression],
+            output_field=FloatField(),
+        )
+        return queryset.filter(id__in=matches).annotate(search_rank=rank)
+
+    def index(self, products):
+        rows = [(p.id, p.title, p.description) for p in products]
+        if not rows:
+            return
+        with connection.cursor() as cursor:
+            cursor.executemany(f"DELETE FROM {self.table} WHERE rowid = %s", [(row[0],) for row in rows])
+            cursor.executemany(f"INSERT INTO {self.table}(rowid, title, description) VALUES (%s, %s, %s)", rows)
+
+    def remove(self, product_ids):
+        with connection.cursor() as cursor:
+            cursor.executemany(f"DELETE FROM {self.table} WHERE rowid = %s", [(pk,) for pk in product_ids])
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            self.create_table(cursor)
+            cursor.execute(f"DELETE FROM {self.table}")
+            cursor.execute(
+                f"INSERT INTO {self.table}(rowid, title, description) "
+                f"SELECT id, title, description FROM {Product._meta.db_table}"
+            )
+
+
+@lru_cache(maxsize=None)
+def get_search_backend():
+    default = "api.search.SqliteFTS5Backend" if connection.vendor == "sqlite" else "api.search.LikeSearchBackend"
+    return import_string(getattr(settings, "PRODUCT_SEARCH_BACKEND", default))()
@@ -0,0 +1,140 @@
+from django.contrib.auth.models import Group, User
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from . import aggregates
+from .catalogue import catalogue_snapshot
+from .db_connections import configure_connection
+from .metrics import instrument_connection
+from .models import Category, Order, OrderItem, Product
+from .routers.http_cache import bump_catalogue_version
+from .search import get_search_backend
+from .routers.permissions import bump_permissions_version
+from .routers.token_cache import token_cache
+
+
+@receiver(post_delete, sender=Token)
+def drop_deleted_token(sender, instance, **kwargs):
+    token_cache.invalidate(instance.key)
+
+
+@receiver(post_save, sender=User)
+def drop_changed_user_tokens(sender, instance, created, **kwargs):
+    if created:
+        # новый пользователь мог получить id удалённого - его кэш ролей не должен достаться новому
+        bump_permissions_version(instance.pk)
+    else:
+        keys = Token.objects.filter(user_id=instance.pk).values_list("key", flat=True)
+        token_cache.invalidate_user(instance.pk, keys)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def drop_cached_auth_on_groups_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == "pre_clear":
+        # group.user_set.clear() не передаёт pk_set - запоминаем участников группы до очистки
+        instance._cleared_user_ids = list(instance.user_set.values_list("pk", flat=True))
+        return
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if reverse:
+        # group.user_set.add(...) - затронутые пользователи в pk_set
+        user_ids = pk_set or ()
+    else:
+        user_ids = (instance.pk,)
+    if reverse and action == "post_clear":
+        user_ids = getattr(instance, "_cleared_user_ids", ())
+        instance._cleared_user_ids = None
+        bump_permissions_version()
+    for user_id in user_ids:
+        token_cache.invalidate_user(user_id)
+        bump_permissions_version(user_id)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def drop_roles_on_group_change(sender, **kwargs):
+    bump_permissions_version()
+
+
+@receiver(pre_save, sender=Order)
+def remember_order_aggregates(sender, instance, **kwargs):
+    if instance.pk and not instance._state.adding:
+        instance._aggregates_before = (
+            Order.objects.filter(pk=instance.pk).values_list("status_id", "total", "item_count").first()
+        )
+
+
+@receiver(post_save, sender=Order)
+def update_order_aggregates(sender, instance, created, **kwargs):
+    aggregates.order_saved(instance, created, getattr(instance, "_aggregates_before", None))
+    instance._aggregates_before = None
+
+
+@receiver(post_delete, sender=Order)
+def drop_order_aggregates(sender, instance, origin=None, **kwargs):
+    # при удалении пользователя его UserOrderStats удаляется каскадом
+    aggregates.order_deleted(instance, skip_user=aggregates.is_cascade_from(origin, User))
+
+
+@receiver(pre_save, sender=OrderItem)
+def remember_order_item(sender, instance, **kwargs):
+    if instance.pk and not instance._state.adding:
+        instance._aggregates_before = (
+            OrderItem.objects.filter(pk=instance.pk).values_list("quantity", "cost").first()
+        )
+
+
+@receiver(post_save, sender=OrderItem)
+def update_order_item_aggregates(sender, instance, created, **kwargs):
+    quantity, cost = (0, 0) if created else (getattr(instance, "_aggregates_before", None) or (0, 0))
+    aggregates.order_items_changed(instance.order_id, instance.quantity - quantity, instance.cost - cost)
+    instance._aggregates_before = None
+
+
+@receiver(post_delete, sender=OrderItem)
+def drop_order_item_aggregates(sender, instance, origin=None, **kwargs):
+    # позиции удаляемого заказа учтены в order_deleted
+    if aggregates.is_cascade_from(origin, Order) or aggregates.is_cascade_from(origin, User):
+        return
+    aggregates.order_items_changed(instance.order_id, -instance.quantity, -instance.cost)
+
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, **kwargs):
+    get_search_backend().index([instance])
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance, **kwargs):
+    get_search_backend().remove([instance.pk])
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_catalogue_http_cache(sender, instance, signal, **kwargs):
+    change = catalogue_snapshot.change(instance, signal is post_delete)
+
+    def bump():
+        previous, current = bump_catalogue_version()
+        # снимок каталога в памяти догоняет изменение без перечитывания из БД
+        if change is not None:
+            catalogue_snapshot.apply(change, previous, current[0])
+
+    # версия меняется только после коммита: до него читатель видит старые строки и мог бы
+    # сохранить их в кэш уже под новой версией - до следующего изменения каталога
+    transaction.on_commit(bump)
+
+
+@receiver(connection_created)
+def instrument_new_connection(sender, connection, **kwargs):
+    instrument_connection(connection)
+
+
+@receiver(connection_created)
+def tune_new_connection(sender, connection, **kwargs):
+    configure_connection(connection)
@@ -0,0 +1,38 @@
+"""
+Фоновые задачи заказов и заявок (регистрируются при импорте в ApiConfig.ready). Агрегаты заказов
+и версия прав пользователя по-прежнему обновляются синхронно сигналами - от них зависит
+корректность следующего запроса; в очередь уходят побочные эффекты, которые клиент не ждёт.
+"""
+from django.conf import settings
+from django.core.mail import send_mail
+
+from .jobs import task
+from .models import ManagerRequest, Order
+
+
+@task(name="orders.notify_status_changed")
+def notify_status_changed(order_id, status_id):
+    """Письмо покупателю о новом статусе заказа. Статус мог смениться ещё раз - пишем текущий."""
+    order = Order.objects.select_related("user", "status").filter(id=order_id).first()
+    if order is None or not order.user.email or order.status_id != status_id:
+        return
+    send_mail(
+        f"Заказ №{order.id}: {order.status.name}",
+        f"Статус вашего заказа №{order.id} изменён на «{order.status.name}».",
+        settings.DEFAULT_FROM_EMAIL,
+        [order.user.email],
+    )
+
+
+@task(name="admin.notify_manager_approved")
+def notify_manager_approved(request_id):
+    """Письмо пользователю об одобренной заявке на роль менеджера."""
+    req_obj = ManagerRequest.objects.select_related("user").filter(id=request_id).first()
+    if req_obj is None or not req_obj.user.email:
+        return
+    send_mail(
+        "Заявка на роль менеджера одобрена",
+        "Ваша заявка одобрена: теперь вам доступны функции менеджера.",
+        settings.DEFAULT_FROM_EMAIL,
+        [req_obj.user.email],
+    )
@@ -1,8 +1,61 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.db import connection, connections
+from django.conf import settings
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext, override_settings
 from rest_framework.authtoken.models import Token
 from django.contrib.auth.models import Group
 import json
+import os
+import unittest
+from decimal import Decimal
 from .models import *
+from .routers.token_cache import token_cache
+
+
+# лимиты частоты живут в памяти процесса и не сбрасываются между тестами - включаем их только
+# в ThrottlingTests, иначе результат зависел бы от порядка и длительности тестов
+_throttling_off = override_settings(THROTTLING={**settings.THROTTLING, 'ENABLED': False})
+
+
+def setUpModule():
+    _throttling_off.enable()
+
+
+def tearDownModule():
+    _throttling_off.disable()
+
+
+def shared_roles_cache(test):
+    """Роли кэшируются только в общем кэше воркеров - подставляем файловый кэш вместо LocMem."""
+    import shutil
+    import tempfile
+    from functools import wraps
+
+    @wraps(test)
+    def wrapper(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location, True)
+        caches = {**settings.CACHES, 'shared': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location,
+        }}
+        with self.settings(CACHES=caches, PERMISSIONS_CACHE={'ALIAS': 'shared', 'TTL': 300}):
+            return test(self)
+
+    return wrapper
+
+
+class QueryBudgetMixin:
+    """Проверка, что запрос к эндпоинту укладывается в бюджет SQL-запросов."""
+
+    def assertQueryBudget(self, budget, url, **extra):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, **extra)
+        self.assertEqual(response.status_code, 200)
+        queries = "\n".join(q["sql"] for q in ctx.captured_queries)
+        self.assertLessEqual(len(ctx), budget, f"{url}: {len(ctx)} запросов\n{queries}")
+        return response
+
 
 class CategoryApiTests(TestCase):
     fixtures = ['data.json']
@@ -10,7 +63,7 @@ class CategoryApiTests(TestCase):
     def test_get_categories_valid(self):
         response = self.client.get("/api/categories/")
         self.assertEqual(response.status_code, 200)
-        self.assertTrue(len(response.json()) > 0)
+        self.assertTrue(len(response.json()['items']) > 0)
 
     def test_get_categories_invalid_endpoint(self):
         response = self.client.get("/api/category/")
@@ -73,7 +126,7 @@ class ProductApiTests(TestCase):
     def test_list_products_valid(self):
         response = self.client.get("/api/products/")
         self.assertEqual(response.status_code, 200)
-        self.assertIsInstance(response.json(), list)
+        self.assertIsInstance(response.json()['items'], list)
 
     def test_list_products_invalid_filter(self):
         response = self.client.get("/api/products/?min_price=invalid")
@@ -198,6 +251,929 @@ class ProductApiTests(TestCase):
         self.assertEqual(response.status_code, 422)
 
 
+class PaginationTests(TestCase):
+    fixtures = ['data.json']
+
+    def setUp(self):
+        category = Category.objects.get(pk=1)
+        for i in range(7):
+            Product.objects.create(title=f'TV {i}', category=category, price=1000 * (i % 3), description='TV')
+
+    def collect(self, url, direction='next'):
+        pages, cursor = [], None
+        while True:
+            response = self.client.get(url + (f'&cursor={cursor}' if cursor else ''))
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            pages.append([p['id'] for p in data['items']])
+            cursor = data[direction]
+            if not cursor:
+                return pages, data
+
+    def test_pages_cover_all_products_once(self):
+        pages, _ = self.collect('/api/products/?limit=3')
+        ids = [i for page in pages for i in page]
+        self.assertEqual(ids, list(Product.objects.order_by('id').values_list('id', flat=True)))
+        self.assertEqual([len(p) for p in pages], [3, 3, 2])
+
+    def test_price_ordering_with_ties(self):
+        pages, _ = self.collect('/api/products/?limit=2&order_by=-price')
+        ids = [i for page in pages for i in page]
+        self.assertEqual(ids, list(Product.objects.order_by('-price', '-id').values_list('id', flat=True)))
+
+    def test_prev_cursor_returns_previous_page(self):
+        first = self.client.get('/api/products/?limit=3').json()
+        self.assertIsNone(first['prev'])
+        second = self.client.get(f"/api/products/?limit=3&cursor={first['next']}").json()
+        back = self.client.get(f"/api/products/?limit=3&cursor={second['prev']}").json()
+        self.assertEqual([p['id'] for p in back['items']], [p['id'] for p in first['items']])
+        self.assertIsNone(back['prev'])
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/products/?cursor=garbage')
+        self.assertEqual(response.status_code, 400)
+
+    def test_cursor_from_other_ordering(self):
+        first = self.client.get('/api/products/?limit=3').json()
+        response = self.client.get(f"/api/products/?limit=3&order_by=price&cursor={first['next']}")
+        self.assertEqual(response.status_code, 400)
+
+    def test_tampered_cursor(self):
+        from .routers.pagination import encode_cursor
+        cases = [
+            ('/api/products/?', ['id'], ['abc']),
+            ('/api/products/?', ['id'], [None]),
+            ('/api/products/?', ['id'], [[1]]),
+            ('/api/products/?order_by=price&', ['price', 'id'], ['cheap', 1]),
+            ('/api/products/?order_by=price&', ['price', 'id'], ['NaN', 1]),
+            ('/api/products/?q=TV&', ['search_rank', 'id'], ['abc', 1]),
+            ('/api/products/?q=TV&', ['search_rank', 'id'], [{'a': 1}, 1]),
+            ('/api/categories/?', ['id'], ['abc']),
+            ('/api/categories/?', ['id'], [None]),
+        ]
+        for url, ordering, values in cases:
+            with self.subTest(url=url, values=values):
+                response = self.client.get(f'{url}cursor={encode_cursor(ordering, values)}')
+                self.assertEqual(response.status_code, 400)
+
+
+class ProductSearchTests(TestCase):
+    fixtures = ['data.json']
+
+    def setUp(self):
+        category = Category.objects.get(pk=1)
+        self.oled = Product.objects.create(title='LG OLED', category=category, price=90000, description='Телевизор 4K')
+        self.stand = Product.objects.create(title='Подставка', category=category, price=3000, description='Для OLED панели')
+
+    def search(self, query):
+        response = self.client.get(f'/api/products/?{query}')
+        self.assertEqual(response.status_code, 200)
+        return [p['id'] for p in response.json()['items']]
+
+    def test_prefix_search_ranks_title_first(self):
+        self.assertEqual(self.search('q=ole'), [self.oled.id, self.stand.id])
+
+    def test_field_filters(self):
+        self.assertEqual(self.search('title=ole'), [self.oled.id])
+        self.assertEqual(self.search('description=телев'), [self.oled.id])
+        self.assertEqual(self.search('title=ole&description=4k'), [self.oled.id])
+
+    def test_punctuation_only_search_finds_nothing(self):
+        for query in ['q=*', 'q=-', 'q=%22', 'title=-', 'description=%2B%2B', 'q=-&order_by=price']:
+            with self.subTest(query):
+                self.assertEqual(self.search(query), [])
+        self.assertEqual(self.client.get('/api/products/facets?q=*').status_code, 200)
+
+    def test_search_with_price_range(self):
+        self.assertEqual(self.search('q=oled&max_price=5000'), [self.stand.id])
+
+    def test_index_follows_updates_and_deletes(self):
+        self.oled.title = 'LG NanoCell'
+        self.oled.save()
+        self.assertEqual(self.search('title=nano'), [self.oled.id])
+        self.assertEqual(self.search('title=oled'), [])
+        self.oled.delete()
+        self.assertEqual(self.search('q=nano'), [])
+
+    def test_relevance_pagination(self):
+        first = self.client.get('/api/products/?q=oled&limit=1').json()
+        second = self.client.get(f"/api/products/?q=oled&limit=1&cursor={first['next']}").json()
+        self.assertEqual([p['id'] for p in first['items'] + second['items']], [self.oled.id, self.stand.id])
+
+
+class ProductFacetsTests(QueryBudgetMixin, TestCase):
+    fixtures = ['data.json']
+
+    def setUp(self):
+        cache.clear()
+        tv = Category.objects.get(pk=1)
+        audio = Category.objects.create(title='Аудио', slug='audio')
+        Product.objects.create(title='LG OLED', category=tv, price=90000, description='Телевизор 4K')
+        Product.objects.create(title='Колонка', category=audio, price=10000, description='Bluetooth')
+        Product.objects.create(title='Наушники OLED', category=audio, price=20000, description='Шумоподавление')
+
+    def test_counts_and_histogram(self):
+        data = self.client.get('/api/products/facets?buckets=4').json()
+        self.assertEqual(data['total'], 4)
+        self.assertEqual((data['min_price'], data['max_price']), (10000.0, 90000.0))
+        self.assertEqual([(c['slug'], c['count'], c['min_price'], c['max_price']) for c in data['categories']],
+                         [('audio', 2, 10000.0, 20000.0), ('televizory', 2, 50000.0, 90000.0)])
+        self.assertEqual([b['count'] for b in data['price_histogram']], [2, 0, 1, 1])
+        self.assertEqual(data['price_histogram'][-1]['max_price'], 90000.0)
+
+    def test_follows_list_filters(self):
+        data = self.client.get('/api/products/facets?q=oled&max_price=50000').json()
+        self.assertEqual(data['total'], 1)
+        self.assertEqual([c['slug'] for c in data['categories']], ['audio'])
+        self.assertEqual(data['price_histogram'], [{'min_price': 20000.0, 'max_price': 20000.0, 'count': 1}])
+        empty = self.client.get('/api/products/facets?min_price=1000000').json()
+        self.assertEqual((empty['total'], empty['categories'], empty['price_histogram']), (0, [], []))
+
+    def test_query_count_does_not_depend_on_categories(self):
+        for i in range(5):
+            category = Category.objects.create(title=f'Категория {i}', slug=f'cat-{i}')
+            Product.objects.create(title=f'Товар {i}', category=category, price=100 * i + 1, description='')
+        self.assertQueryBudget(2, '/api/products/facets')
+
+
+class CatalogueSnapshotTests(TestCase):
+    def setUp(self):
+        from .catalogue import catalogue_snapshot
+        self.snapshot = catalogue_snapshot
+        cache.clear()
+        catalogue_snapshot.clear()
+        self.addCleanup(catalogue_snapshot.clear)
+        categories = [Category.objects.create(title=f'Категория {i}', slug=f'c-{i}') for i in range(3)]
+        # повторяющиеся цены - проверка курсора по (price, id)
+        self.products = [
+            Product.objects.create(title=f'Товар {i}', category=categories[i % 3], price=Decimal(100 + i % 4) + Decimal('0.50'),
+                                   description='описание')
+            for i in range(11)
+        ]
+
+    def get(self, url, enabled):
+        cache.clear()
+        with self.settings(CATALOGUE_SNAPSHOT={'ENABLED': enabled}):
+            return self.client.get(url)
+
+    def assertSameAsDatabase(self, url):
+        expected, actual = self.get(url, False), self.get(url, True)
+        self.assertEqual((actual.status_code, actual.content), (expected.status_code, expected.content), url)
+        return actual
+
+    def test_responses_match_database(self):
+        product = self.products[4]
+        for url in ['/api/categories/', '/api/categories/c-1', '/api/categories/c-1/products', '/api/categories/none',
+                    '/api/categories/none/products', f'/api/products/{product.id}', '/api/products/99999',
+                    '/api/products/?min_price=101&max_price=102.5', '/api/products/?order_by=relevance']:
+            self.assertSameAsDatabase(url)
+
+    def test_cursor_pages_match_database(self):
+        for query in ['order_by=price&limit=3', 'order_by=-price&limit=4&min_price=100.6', 'limit=5&max_price=102.5']:
+            url, pages = f'/api/products/?{query}', 0
+            while url:
+                data = self.assertSameAsDatabase(url).json()
+                pages += 1
+                url = data['next'] and f'/api/products/?{query}&cursor={data["next"]}'
+            self.assertGreater(pages, 1)
+            prev = f'/api/products/?{query}&cursor={data["prev"]}'
+            self.assertSameAsDatabase(prev)
+
+    def test_reads_without_queries_and_applies_changes(self):
+        with self.settings(CATALOGUE_SNAPSHOT={'ENABLED': True}):
+            self.client.get('/api/categories/')
+            loads, applied = self.snapshot.loads, self.snapshot.applied
+            with self.assertNumQueries(0):
+                self.assertEqual(len(self.client.get('/api/products/?limit=100').json()['items']), 11)
+                self.client.get(f'/api/products/{self.products[0].id}')
+
+            product = self.products[0]
+            product.price = Decimal('999.99')
+            with self.captureOnCommitCallbacks(execute=True):
+                product.save()
+            with self.assertNumQueries(0):
+                data = self.client.get('/api/products/?order_by=-price&limit=1').json()
+            self.assertEqual((data['items'][0]['id'], data['items'][0]['price']), (product.id, 999.99))
+            self.assertEqual((self.snapshot.loads, self.snapshot.applied), (loads, applied + 1))
+
+            with self.captureOnCommitCallbacks(execute=True):
+                Category.objects.get(slug='c-0').delete()
+            self.assertEqual(self.client.get('/api/categories/c-0').status_code, 404)
+            self.assertNotIn(product.id, [p['id'] for p in self.client.get('/api/products/?limit=100').json()['items']])
+            self.assertEqual(self.snapshot.loads, loads)
+
+    def test_reader_in_another_thread_before_commit(self):
+        import threading
+        with self.settings(CATALOGUE_SNAPSHOT={'ENABLED': True}):
+            self.client.get('/api/categories/')
+            loads = self.snapshot.loads
+            product, seen = self.products[0], []
+
+            def read():
+                try:
+                    seen.append(self.snapshot.get().products[product.id].price)
+                finally:
+                    connections.close_all()
+
+            with self.captureOnCommitCallbacks(execute=True):
+                product.price = Decimal('999.99')
+                product.save()
+                # версия ещё не сменилась: читатель получает прежний снимок, а не перечитывает
+                # каталог под новой версией до коммита
+                reader = threading.Thread(target=read)
+                reader.start()
+                reader.join()
+            self.assertEqual(seen, [Decimal('100.50')])
+            self.assertEqual(self.snapshot.get().products[product.id].price, Decimal('999.99'))
+            self.assertEqual(self.snapshot.loads, loads)
+
+    def test_change_from_another_worker_drops_snapshot(self):
+        from .routers.http_cache import bump_catalogue_version
+        with self.settings(CATALOGUE_SNAPSHOT={'ENABLED': True}):
+            self.client.get('/api/categories/')
+            loads, applied = self.snapshot.loads, self.snapshot.applied
+            # другой воркер изменил товар и сменил версию: в этом процессе снимок о его изменении не знает
+            Product.objects.filter(pk=self.products[1].pk).update(price=Decimal('555.55'))
+            bump_catalogue_version()
+            product = self.products[0]
+            product.price = Decimal('999.99')
+            with self.captureOnCommitCallbacks(execute=True):
+                product.save()
+            self.assertEqual(self.snapshot.applied, applied)
+            prices = self.snapshot.get().products
+            self.assertEqual((prices[product.id].price, prices[self.products[1].id].price),
+                             (Decimal('999.99'), Decimal('555.55')))
+            self.assertEqual(self.snapshot.loads, loads + 1)
+
+    def test_version_bumps_are_consecutive(self):
+        from .routers.http_cache import bump_catalogue_version, catalogue_version
+        start = catalogue_version()[0]
+        first, second = bump_catalogue_version(), bump_catalogue_version()
+        self.assertEqual((first[0], second[0]), (start, start + 1))
+        self.assertEqual(catalogue_version(), second[1])
+        self.assertGreater(second[1][1], first[1][1])
+        cache.clear()
+        self.assertIsNone(bump_catalogue_version()[0])
+
+
+class HttpCacheTests(TestCase):
+    fixtures = ['data.json']
+
+    def setUp(self):
+        cache.clear()
+        self.manager = User.objects.create_user(username='editor', password='pass123')
+        Group.objects.create(name='менеджеры').user_set.add(self.manager)
+        self.m_auth = {'HTTP_AUTHORIZATION': f'Bearer {Token.objects.create(user=self.manager).key}'}
+
+    def test_conditional_get_returns_304(self):
+        response = self.client.get('/api/products/1')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Last-Modified', response)
+        with self.assertNumQueries(0):
+            again = self.client.get('/api/products/1', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, 304)
+
+    def test_cached_body_served_without_queries(self):
+        first = self.client.get('/api/categories/?limit=5')
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/categories/?limit=5')
+        self.assertEqual(first.content, second.content)
+        self.assertNotEqual(first['ETag'], self.client.get('/api/categories/?limit=6')['ETag'])
+
+    def test_mutation_changes_etag(self):
+        etag = self.client.get('/api/categories/televizory/products')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                '/api/products/1', data=json.dumps({'title': 'Samsung Neo QLED'}),
+                content_type='application/json', **self.m_auth,
+            )
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get('/api/categories/televizory/products', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]['title'], 'Samsung Neo QLED')
+
+    def test_version_changes_after_commit(self):
+        from .routers.http_cache import catalogue_version
+        version = catalogue_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.get(pk=1).save()
+            # до коммита читатели получают старую версию вместе со старыми строками
+            self.assertEqual(catalogue_version(), version)
+        self.assertNotEqual(catalogue_version(), version)
+
+    def test_category_mutation_invalidates(self):
+        self.client.get('/api/categories/televizory')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(
+                '/api/categories/televizory', data=json.dumps({'title': 'ТВ', 'slug': 'televizory'}),
+                content_type='application/json', **self.m_auth,
+            )
+        self.assertEqual(self.client.get('/api/categories/televizory').json()['title'], 'ТВ')
+
+
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    fixtures = ['data.json']
+
+    def setUp(self):
+        token_cache.clear()
+        self.user = User.objects.create_user(username='buyer', password='pass123')
+        self.manager = User.objects.create_user(username='boss', password='pass123')
+        Group.objects.create(name='менеджеры').user_set.add(self.manager)
+        self.token = Token.objects.create(user=self.user)
+        self.m_token = Token.objects.create(user=self.manager)
+        status = OrderStatus.objects.create(name='Новый')
+
+        for i in range(10):
+            category = Category.objects.create(title=f'Категория {i}', slug=f'cat-{i}')
+            product = Product.objects.create(title=f'Товар {i}', category=category, price=100 + i, description='-')
+            WishlistItem.objects.create(user=self.user, product=product, quantity=i + 1)
+            order = Order.objects.create(user=self.user, status=status, total=100)
+            OrderItem.objects.create(order=order, product=product, cost=100, quantity=1)
+
+    def test_catalogue_budget(self):
+        self.assertQueryBudget(1, '/api/products/')
+        self.assertQueryBudget(1, '/api/categories/')
+        self.assertQueryBudget(2, '/api/categories/cat-1/products')
+
+    def test_wishlist_budget(self):
+        auth = {'HTTP_AUTHORIZATION': f'Bearer {self.token.key}'}
+        response = self.assertQueryBudget(2, '/api/wishlist/', **auth)
+        self.assertEqual(len(response.json()), 10)
+
+    @shared_roles_cache
+    def test_orders_budget(self):
+        auth = {'HTTP_AUTHORIZATION': f'Bearer {self.m_token.key}'}
+        response = self.assertQueryBudget(4, '/api/orders/', **auth)
+        self.assertEqual(len(response.json()['items']), 10)
+        # токен и роли уже в кэше - проверка доступа без запросов
+        self.assertQueryBudget(3, f'/api/orders/user/{self.user.id}', **auth)
+
+    def test_users_budget(self):
+        self.assertQueryBudget(3, '/api/user/users/', HTTP_AUTHORIZATION=f'Bearer {self.m_token.key}')
+
+
+class PermissionTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='candidate', password='pass123')
+        self.staff = User.objects.create_user(username='staff', password='pass123', is_staff=True)
+        self.token = Token.objects.create(user=self.user)
+        self.s_token = Token.objects.create(user=self.staff)
+
+    def test_roles_loaded_once_per_request(self):
+        from .routers.permissions import get_roles, is_manager, is_staff
+        user = User.objects.get(pk=self.user.pk)
+        with self.assertNumQueries(1):
+            get_roles(user)
+            (is_manager | is_staff)(user)
+            (~is_staff & is_manager)(user)
+
+    @shared_roles_cache
+    def test_roles_cached_across_requests(self):
+        from .routers.permissions import get_roles
+        get_roles(User.objects.get(pk=self.user.pk))
+        with self.assertNumQueries(0):
+            self.assertEqual(get_roles(User(pk=self.user.pk)), frozenset())
+        Group.objects.create(name='менеджеры').user_set.add(self.user)
+        self.assertEqual(get_roles(User(pk=self.user.pk)), frozenset({'менеджеры'}))
+
+    def test_roles_not_cached_in_process_local_cache(self):
+        from .routers.permissions import get_roles
+        get_roles(User.objects.get(pk=self.user.pk))
+        with self.assertNumQueries(1):
+            get_roles(User(pk=self.user.pk))
+
+    def test_approve_invalidates_cached_roles(self):
+        auth = {'HTTP_AUTHORIZATION': f'Bearer {self.token.key}'}
+        self.assertEqual(self.client.get('/api/user/users/', **auth).status_code, 403)
+        self.client.post('/api/user/request-manager', **auth)
+        req = ManagerRequest.objects.get(user=self.user)
+        response = self.client.post(f'/api/admin/approve-manager/{req.id}', HTTP_AUTHORIZATION=f'Bearer {self.s_token.key}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get('/api/user/users/', **auth).status_code, 200)
+        response = self.client.post('/api/user/request-manager', **auth)
+        self.assertEqual(response.json(), {"detail": "Вы уже являетесь менеджером."})
+
+
+class TokenCacheTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        token_cache.clear()
+        self.user = User.objects.create_user(username='cached', password='pass123')
+        self.token = Token.objects.create(user=self.user)
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {self.token.key}'}
+
+    def test_second_request_skips_token_lookup(self):
+        self.assertQueryBudget(2, '/api/wishlist/', **self.auth)
+        self.assertQueryBudget(1, '/api/wishlist/', **self.auth)
+        self.assertGreaterEqual(token_cache.stats()['hits'], 1)
+
+    def test_deleted_token_is_rejected(self):
+        self.client.get('/api/wishlist/', **self.auth)
+        self.token.delete()
+        response = self.client.get('/api/wishlist/', **self.auth)
+        self.assertEqual(response.status_code, 401)
+
+    def test_deactivated_user_is_rejected(self):
+        self.client.get('/api/wishlist/', **self.auth)
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.get('/api/wishlist/', **self.auth)
+        self.assertEqual(response.status_code, 401)
+
+    def test_groups_change_invalidates(self):
+        self.client.get('/api/wishlist/', **self.auth)
+        Group.objects.create(name='менеджеры').user_set.add(self.user)
+        self.assertIsNone(token_cache.get(self.token.key))
+
+    def test_group_clear_invalidates(self):
+        group = Group.objects.create(name='менеджеры')
+        group.user_set.add(self.user)
+        self.client.get('/api/wishlist/', **self.auth)
+        self.assertIsNotNone(token_cache.get(self.token.key))
+        group.user_set.clear()
+        self.assertIsNone(token_cache.get(self.token.key))
+
+    def test_lru_eviction(self):
+        from .routers.token_cache import TokenCache
+        cache = TokenCache(max_size=2, ttl=60)
+        for key in ('a', 'b', 'c'):
+            cache.set(key, (1, key))
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.get('c'), (1, 'c'))
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+
+class FastSerializationTests(QueryBudgetMixin, TestCase):
+    fixtures = ['data.json', 'order_statuses.json']
+
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        category = Category.objects.get(pk=1)
+        self.products = [
+            Product.objects.create(title=f'Телевизор "{i}"', category=category, price=Decimal(f'{100 + i}.99'), description='Ёлка\n')
+            for i in range(5)
+        ]
+        self.user = User.objects.create_user(username='fast', password='pass123')
+        self.auth = {'headers': {'Authorization': f'Bearer {Token.objects.create(user=self.user).key}'}}
+        order = Order.objects.create(user=self.user, status=OrderStatus.objects.first())
+        for product in self.products[:3]:
+            OrderItem.objects.create(order=order, product=product, quantity=2, cost=product.price)
+
+    def slow_json(self, queryset, schema, **envelope):
+        from ninja.responses import NinjaJSONEncoder
+        from .routers.query_planner import plan_queryset
+        items = [schema.from_orm(obj).model_dump() for obj in plan_queryset(queryset, schema)]
+        return json.dumps({'items': items, **envelope} if envelope else items, cls=NinjaJSONEncoder).encode()
+
+    def test_products_page_is_byte_identical(self):
+        from .schemas import ProductOut
+        response = self.assertQueryBudget(1, '/api/products/?order_by=-price&limit=4')
+        data = response.json()
+        expected = Product.objects.order_by('-price', '-id')[:4]
+        self.assertEqual(response.content, self.slow_json(expected, ProductOut, next=data['next'], prev=data['prev']))
+
+        response = self.client.get('/api/products/', {'order_by': '-price', 'limit': 4, 'cursor': data['next']})
+        self.assertEqual(response.json()['items'][0]['id'], Product.objects.order_by('-price', '-id')[4].id)
+
+    def test_orders_with_items_are_byte_identical(self):
+        from .schemas import OrderOut
+        response = self.assertQueryBudget(3, '/api/orders/my', **self.auth)
+        self.assertEqual(response.content, self.slow_json(Order.objects.filter(user=self.user), OrderOut))
+        self.assertEqual(len(response.json()[0]['items']), 3)
+
+    def test_unsupported_schema_falls_back(self):
+        from ninja import Schema
+        from .routers.fast_serialization import build_values_plan
+
+        class Computed(Schema):
+            id: int
+            amount: float
+
+            @staticmethod
+            def resolve_amount(obj):
+                return obj.get_amount()
+
+        self.assertIsNone(build_values_plan(OrderItem, Computed))
+
+
+class ExportTests(TestCase):
+    fixtures = ['data.json', 'order_statuses.json']
+
+    def setUp(self):
+        token_cache.clear()
+        self.manager = User.objects.create_user(username='exporter', password='pass123')
+        Group.objects.create(name='менеджеры').user_set.add(self.manager)
+        self.auth = {'headers': {'Authorization': f'Bearer {Token.objects.create(user=self.manager).key}'}}
+        self.customer = User.objects.create_user(username='buyer', password='pass123')
+        product = Product.objects.get(pk=1)
+        for status_id in (1, 1, 2):
+            order = Order.objects.create(user=self.customer, status_id=status_id)
+            OrderItem.objects.create(order=order, product=product, quantity=1, cost=product.price)
+
+    def export(self, url, **params):
+        response = self.client.get(url, params, **self.auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_orders_ndjson_with_status_filter(self):
+        lines = self.export('/api/orders/export', status_id=1).splitlines()
+        self.assertEqual(len(lines), 2)
+        order = json.loads(lines[0])
+        self.assertEqual(order['status']['id'], 1)
+        self.assertEqual(len(order['items']), 1)
+
+    def test_orders_date_range(self):
+        Order.objects.filter(id=Order.objects.order_by('id').first().id).update(created_at='2020-01-01T00:00:00Z')
+        lines = self.export('/api/orders/export', created_from='2021-01-01T00:00:00Z').splitlines()
+        self.assertEqual(len(lines), 2)
+        lines = self.export('/api/orders/export', created_to='2020-12-31T00:00:00Z').splitlines()
+        self.assertEqual(len(lines), 1)
+
+    def test_products_csv(self):
+        import csv
+        rows = list(csv.reader(self.export('/api/products/export', format='csv', category='televizory').splitlines()))
+        self.assertEqual(rows[0], ['id', 'title', 'category_id', 'description', 'price',
+                                   'category.id', 'category.title', 'category.slug'])
+        self.assertEqual(len(rows) - 1, Product.objects.filter(category__slug='televizory').count())
+
+    def test_chunks_keep_nested_items(self):
+        from .routers.fast_serialization import iter_serialize
+        from .schemas import OrderOut
+        chunks = list(iter_serialize(Order.objects.order_by('id'), OrderOut, chunk_size=2))
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 1])
+        self.assertTrue(all(len(order['items']) == 1 for chunk in chunks for order in chunk))
+
+    async def test_asgi_streams_async(self):
+        response = await self.async_client.get('/api/orders/export', **self.auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+        lines = b''.join([chunk async for chunk in response.streaming_content]).splitlines()
+        self.assertEqual(len(lines), 3)
+
+    def test_customer_cannot_export(self):
+        token = Token.objects.create(user=self.customer)
+        response = self.client.get('/api/orders/export', headers={'Authorization': f'Bearer {token.key}'})
+        self.assertEqual(response.status_code, 403)
+
+
+class ProductImportTests(TestCase):
+    fixtures = ['data.json']
+
+    def setUp(self):
+        token_cache.clear()
+        self.manager = User.objects.create_user(username='importer', password='pass123')
+        Group.objects.create(name='менеджеры').user_set.add(self.manager)
+        self.auth = {'headers': {'Authorization': f'Bearer {Token.objects.create(user=self.manager).key}'}}
+
+    def post(self, body, fmt):
+        return self.client.post(f'/api/products/import?format={fmt}', data=body,
+                                content_type='text/csv' if fmt == 'csv' else 'application/x-ndjson', **self.auth)
+
+    def test_ndjson_upsert_with_row_errors(self):
+        lines = [
+            {'title': 'LG OLED', 'category': 'televizory', 'price': 90000, 'description': 'OLED'},
+            {'id': 1, 'price': 45000},
+            {'title': 'Без категории', 'category': 'nope', 'price': 1},
+            {'title': 'Без цены', 'category': 'televizory'},
+            {'id': 999999, 'price': 1},
+        ]
+        body = '\n'.join(json.dumps(line, ensure_ascii=False) for line in lines) + '\n{broken\n'
+        response = self.post(body, 'ndjson')
+        self.assertEqual(response.status_code, 200)
+        report = response.json()
+        self.assertEqual((report['created'], report['updated'], report['failed']), (1, 1, 4))
+        self.assertEqual([e['row'] for e in report['errors']], [3, 4, 5, 6])
+        self.assertEqual(Product.objects.get(pk=1).price, 45000)
+        self.assertEqual(Product.objects.get(pk=1).title, 'Samsung QLED')
+        self.assertEqual([p['title'] for p in self.client.get('/api/products/?q=oled').json()['items']], ['LG OLED'])
+
+    def test_csv_queries_do_not_grow_with_rows(self):
+        def feed(count, start):
+            rows = ''.join(f'Товар {i},televizory,{100 + i}\n' for i in range(start, start + count))
+            return 'title,category,price\n' + rows
+
+        self.post(feed(1, 0), 'csv')
+        with CaptureQueriesContext(connection) as small:
+            self.assertEqual(self.post(feed(5, 10), 'csv').json()['created'], 5)
+        with CaptureQueriesContext(connection) as large:
+            self.assertEqual(self.post(feed(200, 100), 'csv').json()['created'], 200)
+        # bulk_create делит 200 строк на пачки по лимиту параметров SQLite - не больше пары запросов
+        self.assertLessEqual(len(large), len(small) + 2)
+
+    def test_row_numbers_are_file_lines(self):
+        csv_report = self.post('title,category,price\nA,televizory,1\nB,nope,1\n', 'csv').json()
+        self.assertEqual(csv_report['errors'], [{'row': 3, 'error': 'Категория nope не найдена'}])
+        ndjson_report = self.post('{"title": "A", "category": "televizory", "price": 1}\n\n'
+                                  '{"title": "B", "category": "nope", "price": 1}\n', 'ndjson').json()
+        self.assertEqual([e['row'] for e in ndjson_report['errors']], [3])
+
+    def test_rows_checked_against_model_fields(self):
+        lines = [
+            {'title': 'NaN', 'category': 'televizory', 'price': 'NaN'},
+            {'title': 'Бесконечность', 'category': 'televizory', 'price': 'inf'},
+            {'title': 'Слишком дорого', 'category': 'televizory', 'price': 1e15},
+            {'title': 'Копейки', 'category': 'televizory', 'price': 1.001},
+            {'title': 'x' * 256, 'category': 'televizory', 'price': 1},
+            {'id': 1, 'price': 'NaN'},
+            {'title': 'Нормальный', 'category': 'televizory', 'price': 99999999.99},
+        ]
+        response = self.post('\n'.join(json.dumps(line) for line in lines), 'ndjson')
+        self.assertEqual(response.status_code, 200)
+        report = response.json()
+        self.assertEqual((report['created'], report['updated'], report['failed']), (1, 0, 6))
+        self.assertEqual([e['error'].split(':')[0] for e in report['errors']], ['price'] * 4 + ['title', 'price'])
+        self.assertEqual(Product.objects.get(pk=1).price, Decimal('50000'))
+        self.assertEqual(self.client.get('/api/products/?order_by=-price&limit=1').status_code, 200)
+
+    def test_invalid_utf8_is_row_error(self):
+        bad = '"Т'.encode()[:-1] + b'\xff"'
+        ndjson = b'{"title": "A", "category": "televizory", "price": 1}\n{"title": ' + bad + b'}\n'
+        report = self.post(ndjson, 'ndjson').json()
+        self.assertEqual((report['created'], report['failed']), (1, 1))
+        self.assertEqual(report['errors'][0]['row'], 2)
+        csv_body = b'title,category,price\n' + bad + b',televizory,1\nB,televizory,2\n'
+        report = self.post(csv_body, 'csv').json()
+        self.assertEqual((report['created'], report['failed']), (1, 1))
+        self.assertEqual(report['errors'][0]['row'], 2)
+
+    def test_failed_batch_still_bumps_version(self):
+        from django.db import IntegrityError
+        from .routers.http_cache import catalogue_version
+        from .routers.product_import import ProductImporter, iter_records
+
+        class FailingImporter(ProductImporter):
+            def import_batch(self, batch):
+                if self.created:
+                    raise IntegrityError('сбой')
+                super().import_batch(batch)
+
+        version = catalogue_version()
+        lines = [b'title,category,price\n', 'Первый,televizory,1\n'.encode(), 'Второй,televizory,2\n'.encode()]
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(IntegrityError):
+                FailingImporter(batch_size=1).run(iter_records(lines, 'csv'))
+        # первая пачка уже зафиксирована - читатели каталога должны её увидеть
+        self.assertTrue(Product.objects.filter(title='Первый').exists())
+        self.assertNotEqual(catalogue_version(), version)
+
+    def test_management_command(self):
+        import tempfile
+        from io import StringIO
+        from django.core.management import call_command
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', encoding='utf-8', delete=False) as f:
+            f.write('id,price\n1,1000\n')
+        out = StringIO()
+        call_command('import_products', f.name, stdout=out)
+        self.assertIn('обновлено: 1', out.getvalue())
+        self.assertEqual(Product.objects.get(pk=1).price, 1000)
+
+
+class ReplicaRoutingTests(TransactionTestCase):
+    # реплика в тестах - зеркало default; TransactionTestCase, чтобы второе соединение видело данные
+    fixtures = ['data.json']
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        self.manager = User.objects.create_user(username='reporter', password='pass123')
+        Group.objects.create(name='менеджеры').user_set.add(self.manager)
+        self.auth = {'headers': {'Authorization': f'Bearer {Token.objects.create(user=self.manager).key}'}}
+
+    def replica_queries(self, method, url, **extra):
+        with self.settings(DATABASE_ROUTING={'REPLICAS': ['replica'], 'PIN_SECONDS': 5}):
+            with CaptureQueriesContext(connections['replica']) as ctx:
+                response = getattr(self.client, method)(url, **extra)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx)
+
+    def test_marked_handlers_read_from_replica(self):
+        self.assertGreater(self.replica_queries('get', '/api/products/'), 0)
+        self.assertGreater(self.replica_queries('get', '/api/categories/televizory'), 0)
+        self.assertGreater(self.replica_queries('get', '/api/orders/', **self.auth), 0)
+        self.assertEqual(self.replica_queries('get', '/api/products/1'), 0)
+
+    def test_catalogue_snapshot_loads_from_primary(self):
+        from .catalogue import catalogue_snapshot
+        catalogue_snapshot.clear()
+        self.addCleanup(catalogue_snapshot.clear)
+        with self.settings(CATALOGUE_SNAPSHOT={'ENABLED': True}):
+            self.assertEqual(self.replica_queries('get', '/api/categories/televizory'), 0)
+
+    def test_writer_is_pinned_to_primary(self):
+        self.assertGreater(self.replica_queries('get', '/api/user/users/', **self.auth), 0)
+        self.replica_queries('post', '/api/wishlist/', data={'product_id': 1}, content_type='application/json', **self.auth)
+        self.assertEqual(self.replica_queries('get', '/api/user/users/', **self.auth), 0)
+        cache.clear()
+        self.assertGreater(self.replica_queries('get', '/api/user/users/', **self.auth), 0)
+
+
+class DatabaseConnectionTests(TransactionTestCase):
+    # эндпоинт опрашивает все открытые соединения, в том числе с репликой (её открывают системные
+    # проверки); TransactionTestCase, как в ReplicaRoutingTests: реплика - второе соединение с той же БД
+    databases = {'default', 'replica'}
+
+    def test_sqlite_pragmas_applied_on_connect(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 5000)
+
+    def test_stats_endpoint(self):
+        staff = User.objects.create_user(username='dba', password='pass123', is_staff=True)
+        token = Token.objects.create(user=staff)
+        response = self.client.get('/api/admin/db-connections', headers={'Authorization': f'Bearer {token.key}'})
+        self.assertEqual(response.status_code, 200)
+        default = response.json()['default']
+        self.assertEqual(default['conn_max_age'], 60)
+        self.assertTrue(default['usable'])
+        self.assertGreaterEqual(default['opened'], 1)
+        self.assertGreaterEqual(default['live'], 1)
+        self.assertEqual(default['pragmas']['busy_timeout'], 5000)
+
+
+class RequestMetricsTests(TestCase):
+    fixtures = ['data.json']
+
+    def setUp(self):
+        from .metrics import metrics_buffer
+        self.buffer = metrics_buffer
+        self.buffer.clear()
+        cache.clear()
+        token_cache.clear()
+        self.staff = User.objects.create_user(username='ops', password='pass123', is_staff=True)
+        self.auth = {'headers': {'Authorization': f'Bearer {Token.objects.create(user=self.staff).key}'}}
+
+    def test_disabled_by_default(self):
+        self.client.get('/api/products/')
+        self.assertEqual(self.buffer.records(), [])
+
+    def test_profile_has_stage_timings_and_queries(self):
+        with self.settings(REQUEST_METRICS={'ENABLED': True, 'SAMPLE_RATE': 1.0}):
+            self.client.get('/api/user/users/', **self.auth)
+        record = self.buffer.records()[-1]
+        self.assertEqual(record['route'], 'api/user/users/')
+        self.assertEqual(record['handler'], 'list_users')
+        self.assertEqual(record['status'], 403)
+        self.assertGreater(record['queries'], 0)
+        for field in ('total_ms', 'handler_ms', 'auth_ms', 'permission_ms'):
+            self.assertGreater(record[field], 0, field)
+
+    def test_sampling(self):
+        with self.settings(REQUEST_METRICS={'ENABLED': True, 'SAMPLE_RATE': 0}):
+            self.client.get('/api/products/')
+        self.assertEqual(self.buffer.records(), [])
+
+    def test_metrics_endpoint_is_staff_only(self):
+        with self.settings(REQUEST_METRICS={'ENABLED': True}):
+            self.client.get('/api/products/')
+            response = self.client.get('/api/admin/metrics', **self.auth)
+        self.assertEqual(response.status_code, 200)
+        routes = {route['route'] for route in response.json()['routes']}
+        self.assertIn('api/products/', routes)
+        self.assertGreater(response.json()['recent'][0]['serialization_ms'], 0)
+
+        user = User.objects.create_user(username='plain', password='pass123')
+        response = self.client.get(
+            '/api/admin/metrics', headers={'Authorization': f'Bearer {Token.objects.create(user=user).key}'}
+        )
+        self.assertEqual(response.status_code, 403)
+
+    def test_ring_buffer_keeps_latest(self):
+        from .metrics import MetricsBuffer, RequestProfile
+        buffer = MetricsBuffer(max_size=2)
+        for path in ('/a', '/b', '/c'):
+            buffer.record(RequestProfile('GET', path))
+        self.assertEqual([r['path'] for r in buffer.records()], ['/b', '/c'])
+        self.assertEqual(buffer.recorded, 3)
+
+
+class AsyncHandlerTests(TestCase):
+    fixtures = ['data.json', 'order_statuses.json']
+
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        self.user = User.objects.create_user(username='async-shopper', password='pass123')
+        self.token = Token.objects.create(user=self.user)
+        self.product = Product.objects.create(title='TV', category=Category.objects.get(pk=1), price=100, description='-')
+        self.auth = {'headers': {'Authorization': f'Bearer {self.token.key}'}}
+
+    async def test_catalogue_through_async_client(self):
+        response = await self.async_client.get('/api/products/', {'limit': 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['items']), 1)
+        self.assertIsNotNone(response.json()['next'])
+        response = await self.async_client.get(f'/api/products/{self.product.id}')
+        self.assertEqual(response.json()['category']['id'], 1)
+
+    async def test_wishlist_and_checkout(self):
+        response = await self.async_client.post(
+            '/api/wishlist/', {'product_id': self.product.id, 'quantity': 2},
+            content_type='application/json', **self.auth,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['product']['category']['id'], 1)
+        response = await self.async_client.post('/api/orders/', **self.auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['total'], 200.0)
+
+    async def test_unknown_token(self):
+        response = await self.async_client.get('/api/wishlist/', headers={'Authorization': 'Bearer nope'})
+        self.assertEqual(response.status_code, 401)
+
+
+class EndpointBenchmarkTests(TestCase):
+    def setUp(self):
+        from .benchmarks.seed import seed
+        token_cache.clear()
+        self.context = seed({'categories': 3, 'products': 60, 'users': 5, 'orders': 10, 'wishlist': 3})
+
+    def test_every_endpoint_is_profiled(self):
+        from .benchmarks.endpoints import ENDPOINTS
+        from .benchmarks.runner import profile_endpoint
+        for endpoint in ENDPOINTS:
+            with self.subTest(endpoint.name):
+                result = profile_endpoint(endpoint, self.context, iterations=1)
+                self.assertLess(result['status'], 400)
+
+    def test_price_range_uses_index(self):
+        from .benchmarks.endpoints import Endpoint
+        from .benchmarks.runner import profile_endpoint
+        endpoint = Endpoint('range', 'get', '/api/products/?min_price=1000&max_price=5000', None, None)
+        plans = profile_endpoint(endpoint, self.context, iterations=1)['plans']
+        self.assertTrue(any('product_price_id' in line for p in plans for line in p['plan']))
+
+    def test_load_run_reports_latency_percentiles(self):
+        from .benchmarks.endpoints import ENDPOINTS
+        from .benchmarks.load import run_client
+        endpoint = next(e for e in ENDPOINTS if e.name == 'get_wishlist')
+        result = run_client(endpoint, self.context, requests=5)
+        self.assertEqual(result['requests'], 5)
+        self.assertEqual(result['queries'], 1)
+        self.assertLessEqual(result['p50_ms'], result['p95_ms'])
+        self.assertLessEqual(result['p95_ms'], result['p99_ms'])
+        self.assertGreater(result['rps'], 0)
+
+    def test_baseline_comparison(self):
+        from .benchmarks.load import compare
+        baseline = {'client': {'x': {'queries': 2, 'p95_ms': 10.0, 'rps': 100.0}}}
+        same = {'client': {'x': {'queries': 2, 'p95_ms': 11.0, 'rps': 95.0}}}
+        slower = {'client': {'x': {'queries': 3, 'p95_ms': 20.0, 'rps': 50.0}}}
+        self.assertEqual(compare(same, baseline), [])
+        self.assertEqual(len(compare(slower, baseline)), 3)
+
+    @unittest.skipUnless(os.environ.get('API_BENCHMARKS'), 'API_BENCHMARKS=1: запускает процессы с настройками и БД проекта')
+    def test_startup_benchmark(self):
+        from .benchmarks.startup import measure_startup
+        report = measure_startup('wsgi', '/api/docs', runs=1)
+        self.assertEqual(report['status'], 200)
+        self.assertGreater(report['import_ms'], 0)
+        self.assertGreaterEqual(report['time_to_first_response_ms'], report['import_ms'])
+
+
+class OpenApiSchemaCacheTests(TestCase):
+    def setUp(self):
+        import tempfile
+        from .api import api
+        self.api = api
+        self.addCleanup(setattr, api, 'schema_cache_file', api.schema_cache_file)
+        self.addCleanup(api._schemas.clear)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        api.schema_cache_file = f'{directory.name}/schema.json'
+        api._schemas.clear()
+
+    def test_schema_is_built_once_and_persisted(self):
+        response = self.client.get('/api/openapi.json')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('/api/products/facets', response.json()['paths'])
+        self.assertIs(self.api.get_openapi_schema(), self.api.get_openapi_schema())
+        with open(self.api.schema_cache_file, encoding='utf-8') as f:
+            persisted = json.load(f)
+        self.assertEqual(persisted['schema']['paths'].keys(), response.json()['paths'].keys())
+
+    def test_worker_reads_file_and_rebuilds_on_stale_fingerprint(self):
+        from .openapi import read_schema_file, write_schema_file
+        self.api._load_schema('/api/')
+        with open(self.api.schema_cache_file, encoding='utf-8') as f:
+            fingerprint = json.load(f)['fingerprint']
+        write_schema_file(self.api.schema_cache_file, fingerprint, {'paths': {'/cached': {}}})
+        self.assertEqual(self.api._load_schema('/api/'), {'paths': {'/cached': {}}})
+        write_schema_file(self.api.schema_cache_file, 'stale', {'paths': {}})
+        self.assertIn('/api/products/', self.api._load_schema('/api/')['paths'])
+        self.assertIsNotNone(read_schema_file(self.api.schema_cache_file, fingerprint))
+
+    def test_fingerprint_depends_on_ninja_settings(self):
+        from .openapi import source_fingerprint
+        fingerprint = source_fingerprint()
+        with self.settings(NINJA_PAGINATION_PER_PAGE=7):
+            self.assertNotEqual(source_fingerprint(), fingerprint)
+        self.assertEqual(source_fingerprint(), fingerprint)
+
+
 class AuthTestCase(TestCase):
     def setUp(self):
         self.test_user = User.objects.create_user(
@@ -276,6 +1252,124 @@ class AuthTestCase(TestCase):
 
 
 
+class PasswordTests(TestCase):
+    def login(self, username, password):
+        return self.client.post('/api/auth/login', data=json.dumps({'username': username, 'password': password}),
+                                content_type='application/json', REMOTE_ADDR='10.1.0.1')
+
+    def test_login_rehashes_legacy_password(self):
+        from django.contrib.auth.hashers import make_password
+        user = User.objects.create(username='legacy', password=make_password('s3cret-pass', hasher='pbkdf2_sha256'))
+        self.assertEqual(self.login('legacy', 's3cret-pass').status_code, 200)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('scrypt$'))
+        self.assertTrue(user.check_password('s3cret-pass'))
+
+    def test_login_returns_existing_token_in_one_query(self):
+        user = User.objects.create_user(username='regular', password='s3cret-pass')
+        token = Token.objects.create(user=user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.login('regular', 's3cret-pass')
+        self.assertEqual(response.json(), {'token': token.key})
+        self.assertEqual(len(queries), 1)
+
+    def test_wrong_password_and_inactive_user(self):
+        User.objects.create_user(username='sleeper', password='s3cret-pass', is_active=False)
+        self.assertEqual(self.login('sleeper', 's3cret-pass').status_code, 401)
+        self.assertEqual(self.login('sleeper', 'wrong').status_code, 401)
+        self.assertEqual(self.login('ghost', 'wrong').status_code, 401)
+
+    def test_verifies_hash_made_at_higher_cost(self):
+        from .passwords import ScryptPasswordHasher
+
+        class Lowered(ScryptPasswordHasher):
+            work_factor = 2**14
+
+        hasher = Lowered()
+        encoded = hasher.encode('s3cret-pass', hasher.salt(), n=2**15)
+        self.assertTrue(hasher.verify('s3cret-pass', encoded))
+        self.assertFalse(hasher.verify('wrong', encoded))
+        self.assertTrue(hasher.must_update(encoded))
+
+    def test_common_password_list_loaded_once(self):
+        from django.core.exceptions import ValidationError
+        from .passwords import CommonPasswordValidator
+        first, second = CommonPasswordValidator(), CommonPasswordValidator()
+        self.assertIs(first.passwords, second.passwords)
+        with self.assertRaises(ValidationError):
+            second.validate('Password')
+
+    def test_benchmark_reports_throughput(self):
+        from .benchmarks.passwords import run_hasher
+        report = run_hasher('scrypt', requests=2)
+        self.assertEqual(report['algorithm'], 'scrypt')
+        self.assertEqual((report['login']['errors'], report['register']['errors']), (0, 0))
+        self.assertGreater(report['register']['rps'], 0)
+
+
+@override_settings(THROTTLING={**settings.THROTTLING, 'ENABLED': True})
+class ThrottlingTests(TestCase):
+    def setUp(self):
+        from .routers import throttling
+        self.throttling = throttling
+        throttling.backend.clear()
+        self.addCleanup(throttling.backend.clear)
+
+    def login(self, ip):
+        return self.client.post('/api/auth/login', data=json.dumps({'username': 'nobody', 'password': 'x'}),
+                                content_type='application/json', REMOTE_ADDR=ip)
+
+    def test_login_limited_per_ip(self):
+        limit, _ = self.throttling.parse_rate('10/min')
+        for _ in range(limit):
+            self.assertEqual(self.login('10.0.0.1').status_code, 401)
+        response = self.login('10.0.0.1')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.json(), {'detail': 'Слишком много запросов, повторите позже'})
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+        self.assertEqual(self.login('10.0.0.2').status_code, 401)
+
+    def test_parse_rate(self):
+        self.assertEqual(self.throttling.parse_rate('10/min'), (10, 60))
+        self.assertEqual(self.throttling.parse_rate('100/5m'), (100, 300))
+        with self.assertRaises(ValueError):
+            self.throttling.parse_rate('10/week')
+
+    def test_token_bucket_refills(self):
+        backend = self.throttling.MemoryBackend(max_keys=2)
+        now = [0.0]
+        backend.timer = lambda: now[0]
+        self.assertEqual([backend.hit('k', 2, 60)[0] for _ in range(3)], [True, True, False])
+        self.assertAlmostEqual(backend.hit('k', 2, 60)[1], 30)
+        now[0] = 30
+        self.assertTrue(backend.hit('k', 2, 60)[0])
+        backend.hit('a', 2, 60)
+        backend.hit('b', 2, 60)
+        self.assertNotIn('k', backend._buckets)
+
+    def test_sliding_window_in_cache(self):
+        cache.clear()
+        backend = self.throttling.CacheBackend('default')
+        now = [600.0]
+        backend.timer = lambda: now[0]
+        self.assertEqual([backend.hit('k', 3, 60)[0] for _ in range(4)], [True, True, True, False])
+        # середина следующего окна: 3 запроса предыдущего учитываются с весом 0.5 -> свободно ещё 1.5
+        now[0] = 690.0
+        self.assertEqual([backend.hit('k', 3, 60)[0] for _ in range(3)], [True, True, False])
+        self.assertGreater(backend.hit('k', 3, 60)[1], 0)
+
+    def test_user_key_skips_anonymous(self):
+        from django.test import RequestFactory
+        limit = self.throttling.RateLimit('tests', '1/min', key='user')
+        request = RequestFactory().get('/')
+        request.user = None
+        self.assertTrue(all(limit.allow_request(request) for _ in range(3)))
+        request.auth = User.objects.create_user(username='limited', password='pass123')
+        self.assertTrue(limit.allow_request(request))
+        self.assertFalse(limit.allow_request(request))
+        self.assertEqual(limit.wait(), 60)
+
+
 class WishlistTests(TestCase):
     fixtures = ['data.json']
 
@@ -326,6 +1420,79 @@ class WishlistTests(TestCase):
         item = WishlistItem.objects.get(user=self.user, product=self.product)
         self.assertEqual(item.quantity, 1)
 
+    async def test_concurrent_adds_do_not_lose_increments(self):
+        import asyncio
+        headers = {'Authorization': f'Bearer {self.token.key}'}
+        await WishlistItem.objects.acreate(user=self.user, product=self.product, quantity=11)
+
+        async def add():
+            return await self.async_client.post(
+                '/api/wishlist/', {'product_id': self.product.id, 'quantity': 1},
+                content_type='application/json', headers=headers)
+
+        async def decrement():
+            return await self.async_client.delete(f'/api/wishlist/{self.product.id}/decrement', headers=headers)
+
+        responses = await asyncio.gather(*[add() for _ in range(30)], *[decrement() for _ in range(10)])
+        self.assertTrue(all(r.status_code == 200 for r in responses))
+        item = await WishlistItem.objects.aget(user=self.user, product=self.product)
+        self.assertEqual(item.quantity, 11 + 30 - 10)
+
+    def batch(self, operations):
+        return self.client.post(
+            '/api/wishlist/batch',
+            data=json.dumps({'operations': operations}),
+            content_type='application/json',
+            HTTP_AUTHORIZATION=f'Bearer {self.token.key}'
+        )
+
+    def test_batch_applies_operations_in_order(self):
+        WishlistItem.objects.create(user=self.user, product_id=1, quantity=3)
+        response = self.batch([
+            {'op': 'add', 'product_id': self.product.id, 'quantity': 2},
+            {'op': 'add', 'product_id': self.product.id},
+            {'op': 'decrement', 'product_id': 1, 'quantity': 2},
+        ])
+        self.assertEqual(response.status_code, 200)
+        quantities = {item['product']['id']: item['quantity'] for item in response.json()}
+        self.assertEqual(quantities, {self.product.id: 3, 1: 1})
+
+        response = self.batch([
+            {'op': 'set', 'product_id': 1, 'quantity': 0},
+            {'op': 'remove', 'product_id': self.product.id},
+            {'op': 'set', 'product_id': self.product.id, 'quantity': 5},
+        ])
+        self.assertEqual([(i['product']['id'], i['quantity']) for i in response.json()], [(self.product.id, 5)])
+        self.assertEqual(response.json(), self.client.get(
+            '/api/wishlist/', HTTP_AUTHORIZATION=f'Bearer {self.token.key}').json())
+
+    def test_batch_is_atomic_on_unknown_product(self):
+        response = self.batch([
+            {'op': 'add', 'product_id': self.product.id},
+            {'op': 'add', 'product_id': 999999},
+        ])
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(WishlistItem.objects.filter(user=self.user).exists())
+
+    def test_batch_query_count_does_not_grow(self):
+        category = Category.objects.get(pk=1)
+        products = Product.objects.bulk_create(
+            Product(title=f'Товар {i}', category=category, price=100 + i, description='') for i in range(40)
+        )
+        WishlistItem.objects.bulk_create(WishlistItem(user=self.user, product=p, quantity=3) for p in products[20:])
+        ops = ('add', 'set', 'decrement', 'remove')
+
+        def queries_for(batch_products):
+            operations = [{'op': ops[i % 4], 'product_id': p.id, 'quantity': 2} for i, p in enumerate(batch_products)]
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.batch(operations).status_code, 200)
+            return len(queries)
+
+        self.batch([])  # прогрев кэша токена
+        small = queries_for([products[0], *products[20:23]])
+        large = queries_for(products[1:20] + products[23:])
+        self.assertEqual(large, small)
+
 
 
 class OrderTests(TestCase):
@@ -386,6 +1553,191 @@ class OrderTests(TestCase):
 
 
 
+class CheckoutTests(TestCase):
+    fixtures = ['data.json', 'order_statuses.json']
+
+    def setUp(self):
+        token_cache.clear()
+        self.user = User.objects.create_user(username='shopper', password='pass123')
+        self.token = Token.objects.create(user=self.user)
+        category = Category.objects.get(pk=1)
+        self.products = [
+            Product.objects.create(title=f'TV {i}', category=category, price=100 + i, description='-')
+            for i in range(20)
+        ]
+        # прогреть кэш токена, чтобы сравнивать только запросы оформления
+        self.client.get('/api/wishlist/', HTTP_AUTHORIZATION=f'Bearer {self.token.key}')
+
+    def checkout(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post('/api/orders/', HTTP_AUTHORIZATION=f'Bearer {self.token.key}')
+        return response, len(ctx)
+
+    def fill_wishlist(self, count):
+        WishlistItem.objects.bulk_create(
+            WishlistItem(user=self.user, product=p, quantity=2) for p in self.products[:count]
+        )
+
+    def test_constant_number_of_queries(self):
+        # первое оформление создаёт строки агрегатов пользователя и статуса
+        self.fill_wishlist(1)
+        self.checkout()
+        self.fill_wishlist(2)
+        _, small = self.checkout()
+        self.fill_wishlist(20)
+        response, large = self.checkout()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(small, large)
+
+    def test_totals_and_items(self):
+        self.fill_wishlist(3)
+        response, _ = self.checkout()
+        data = response.json()
+        self.assertEqual(data['total'], float(2 * (100 + 101 + 102)))
+        self.assertEqual(len(data['items']), 3)
+        self.assertEqual(data['status']['name'], 'Новый')
+        self.assertFalse(WishlistItem.objects.filter(user=self.user).exists())
+
+    def test_empty_wishlist(self):
+        response, _ = self.checkout()
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Order.objects.exists())
+
+
+class OrderAggregateTests(TestCase):
+    fixtures = ['data.json', 'order_statuses.json']
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='spender', password='pass123')
+        self.manager = User.objects.create_user(username='analyst', password='pass123')
+        Group.objects.create(name='менеджеры').user_set.add(self.manager)
+        self.token = Token.objects.create(user=self.user)
+        self.m_auth = {'HTTP_AUTHORIZATION': f'Bearer {Token.objects.create(user=self.manager).key}'}
+        self.product = Product.objects.get(pk=1)
+
+    def checkout(self, quantity):
+        WishlistItem.objects.create(user=self.user, product=self.product, quantity=quantity)
+        return self.client.post('/api/orders/', HTTP_AUTHORIZATION=f'Bearer {self.token.key}').json()
+
+    def test_checkout_updates_user_and_status_stats(self):
+        self.checkout(2)
+        self.checkout(1)
+        stats = self.client.get(f'/api/orders/stats/users/{self.user.id}', **self.m_auth).json()
+        self.assertEqual(stats, {'user_id': self.user.id, 'order_count': 2, 'item_count': 3, 'total': 150000.0})
+        statuses = self.client.get('/api/orders/stats/statuses', **self.m_auth).json()
+        self.assertEqual([(s['status']['name'], s['order_count'], s['total']) for s in statuses], [('Новый', 2, 150000.0)])
+
+    def test_status_change_moves_aggregates(self):
+        order = self.checkout(1)
+        done = OrderStatus.objects.get(name='Завершён')
+        self.client.put(f"/api/orders/{order['id']}/status?status_id={done.id}", **self.m_auth)
+        self.assertEqual(OrderStatusStats.objects.get(status__name='Новый').order_count, 0)
+        self.assertEqual(OrderStatusStats.objects.get(status=done).total, 50000)
+
+    def test_item_and_order_deletion(self):
+        order = Order.objects.get(id=self.checkout(3)['id'])
+        OrderItem.objects.create(order=order, product=self.product, quantity=1, cost=50000)
+        order.refresh_from_db()
+        self.assertEqual((order.item_count, order.total), (4, 200000))
+        order.delete()
+        stats = UserOrderStats.objects.get(user=self.user)
+        self.assertEqual((stats.order_count, stats.item_count, stats.total), (0, 0, 0))
+
+    def test_rebuild_matches_incremental(self):
+        self.checkout(2)
+        self.checkout(5)
+        before = list(UserOrderStats.objects.values('user_id', 'order_count', 'item_count', 'total'))
+        from .aggregates import rebuild_order_stats
+        rebuild_order_stats()
+        self.assertEqual(list(UserOrderStats.objects.values('user_id', 'order_count', 'item_count', 'total')), before)
+
+    def test_unknown_user_stats(self):
+        response = self.client.get('/api/orders/stats/users/9999', **self.m_auth)
+        self.assertEqual(response.status_code, 404)
+
+
+class JobQueueTests(TestCase):
+    fixtures = ['data.json', 'order_statuses.json']
+
+    def setUp(self):
+        from . import jobs
+        self.jobs = jobs
+        self.calls = []
+        self.addCleanup(jobs.TASKS.pop, 'tests.flaky', None)
+
+        @jobs.task(name='tests.flaky', max_attempts=2)
+        def flaky(fail):
+            self.calls.append(fail)
+            if fail:
+                raise ValueError('сбой')
+        self.flaky = flaky
+
+    def run_ready(self):
+        return [self.jobs.execute(job_id, 'test-worker') for job_id in self.jobs.claim('test-worker')]
+
+    def test_idempotency_key(self):
+        first = self.jobs.enqueue(self.flaky, key='k1', fail=False)
+        second = self.jobs.enqueue(self.flaky, key='k1', fail=True)
+        self.assertEqual(first.id, second.id)
+        self.assertEqual(Job.objects.count(), 1)
+        self.assertEqual(self.run_ready(), [Job.DONE])
+        self.assertEqual(self.run_ready(), [])
+
+    def test_retry_with_backoff_then_failed(self):
+        job = self.jobs.enqueue(self.flaky, fail=True)
+        self.assertEqual(self.run_ready(), [Job.PENDING])
+        job.refresh_from_db()
+        self.assertEqual(job.attempts, 1)
+        self.assertIn('ValueError', job.last_error)
+        self.assertGreater(job.run_at, job.created_at)
+        # до истечения задержки задача не выдаётся
+        self.assertEqual(self.run_ready(), [])
+        Job.objects.filter(id=job.id).update(run_at=job.created_at)
+        with self.assertLogs('api.jobs', 'ERROR'):
+            self.assertEqual(self.run_ready(), [Job.FAILED])
+        self.assertEqual(self.calls, [True, True])
+
+    def test_claim_is_exclusive_and_recovers_stale_lock(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        job = self.jobs.enqueue(self.flaky, fail=False)
+        self.assertEqual(self.jobs.claim('a'), [job.id])
+        self.assertEqual(self.jobs.claim('b'), [])
+        Job.objects.filter(id=job.id).update(locked_at=timezone.now() - timedelta(seconds=self.jobs.LOCK_TIMEOUT + 1))
+        self.assertEqual(self.jobs.claim('b'), [job.id])
+        # воркер a опоздал: его результат не перезаписывает задачу, которую теперь выполняет b
+        with self.assertLogs('api.jobs', 'WARNING'):
+            self.assertIsNone(self.jobs.execute(job.id, 'a'))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.locked_by, job.attempts), (Job.RUNNING, 'b', 0))
+        self.assertEqual(self.jobs.execute(job.id, 'b'), Job.DONE)
+
+    def test_on_commit_enqueue(self):
+        from django.db import transaction
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            with transaction.atomic():
+                self.jobs.enqueue_on_commit(self.flaky, fail=False)
+                self.assertFalse(Job.objects.exists())
+        self.assertEqual(len(callbacks), 1)
+
+    def test_order_status_change_sends_notification_from_worker(self):
+        from django.core import mail
+        customer = User.objects.create_user(username='buyer', password='pass123', email='buyer@example.com')
+        manager = User.objects.create_user(username='boss', password='pass123')
+        Group.objects.create(name='менеджеры').user_set.add(manager)
+        order = Order.objects.create(user=customer, status=OrderStatus.objects.get(name='Новый'))
+        done = OrderStatus.objects.get(name='Завершён')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.put(
+                f'/api/orders/{order.id}/status?status_id={done.id}',
+                HTTP_AUTHORIZATION=f'Bearer {Token.objects.create(user=manager).key}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(self.run_ready(), [Job.DONE])
+        self.assertEqual(mail.outbox[0].to, ['buyer@example.com'])
+        self.assertIn('Завершён', mail.outbox[0].subject)
+
+
 class UserTests(TestCase):
     def setUp(self):
         self.user = User.objects.create_user(username='user1', password='1234')
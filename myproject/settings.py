@@ -32,6 +32,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.metrics.RequestMetricsMiddleware',
+    'api.db_router.ReplicaRouterMiddleware',
 ]
 
 ROOT_URLCONF = 'myproject.urls'
@@ -59,9 +61,26 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        # постоянное соединение на поток воркера с проверкой перед переиспользованием
+        'CONN_MAX_AGE': 60,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # BEGIN IMMEDIATE: транзакция сразу берёт блокировку записи и ждёт busy_timeout,
+            # а не падает с "database is locked" при повышении блокировки посреди транзакции
+            'transaction_mode': 'IMMEDIATE',
+        },
+    },
+    # Реплика для чтения: локально - копия db.sqlite3 (python manage.py sync_replica).
+    # Используется, только если указана в DATABASE_ROUTING['REPLICAS']
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db_replica.sqlite3',
+        'TEST': {'MIRROR': 'default'},
+    },
 }
 
+DATABASE_ROUTERS = ['api.db_router.ReplicaRouter']
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -71,7 +90,7 @@ AUTH_PASSWORD_VALIDATORS = [
         'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',
     },
     {
-        'NAME': 'django.contrib.auth.password_validation.CommonPasswordValidator',
+        'NAME': 'api.passwords.CommonPasswordValidator',
     },
     {
         'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
@@ -79,6 +98,25 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+
+# Хэшеры паролей (api.passwords): первый - основной, остальные проверяют старые хэши, которые
+# перехэшируются основным при входе. Для argon2 (pip install argon2-cffi) поставить его первым
+PASSWORD_HASHERS = [
+    'api.passwords.ScryptPasswordHasher',
+    'api.passwords.Argon2PasswordHasher',
+    'api.passwords.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+]
+
+# Стоимость хэширования подбирается под окружение (manage.py bench_passwords): scrypt 2^15 x 8 -
+# около 32 МБ памяти и ~0.15 с CPU на вход; изменение параметров применится к паролю при следующем входе
+PASSWORD_HASHING = {
+    'SCRYPT': {'WORK_FACTOR': 2**15, 'BLOCK_SIZE': 8, 'PARALLELISM': 1},
+    'ARGON2': {'TIME_COST': 2, 'MEMORY_COST': 19456, 'PARALLELISM': 1},
+    'PBKDF2_ITERATIONS': 1000000,
+}
+
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework.authentication.TokenAuthentication',
@@ -89,6 +127,117 @@ REST_FRAMEWORK = {
 }
 
 
+# Кэш TokenAuth: токен -> снимок пользователя. SHARED_CACHE - алиас из CACHES для общего кэша воркеров.
+# Удаление токена и изменение пользователя сбрасывают кэш только в своём воркере (и в SHARED_CACHE):
+# в остальных воркерах удалённый токен или отключённый пользователь проходят ещё до TTL секунд,
+# поэтому TTL держим коротким
+TOKEN_AUTH_CACHE = {
+    'MAX_SIZE': 10000,
+    'TTL': 10,
+    'SHARED_CACHE': None,
+}
+
+
+# Кэш ролей пользователей (api.routers.permissions) между запросами на TTL секунд. ALIAS должен указывать
+# на общий кэш воркеров (Redis/Memcached): с кэшем в памяти процесса (LocMem, как сейчас) роли не
+# кэшируются - иначе отзыв прав менеджера в одном воркере остальные не увидели бы до истечения TTL
+PERMISSIONS_CACHE = {
+    'ALIAS': 'default',
+    'TTL': 300,
+}
+
+
+# HTTP-кэш публичного каталога (ETag/304). При нескольких воркерах ALIAS должен указывать
+# на общий кэш (Redis/Memcached), иначе версии каталога в воркерах разойдутся
+HTTP_CACHE = {
+    'ALIAS': 'default',
+    'TIMEOUT': 300,
+    'MAX_AGE': 0,
+}
+
+
+# Снимок каталога в памяти воркера (api.catalogue): категории и товары отдаются без SQL, снимок
+# обновляется по версии каталога из HTTP_CACHE (при нескольких воркерах - общий кэш). Памяти нужно
+# порядка размера таблиц каталога на каждый воркер
+CATALOGUE_SNAPSHOT = {
+    'ENABLED': False,
+}
+
+
+# Поиск товаров: api.search.SqliteFTS5Backend (FTS5) или api.search.LikeSearchBackend (icontains)
+PRODUCT_SEARCH_BACKEND = 'api.search.SqliteFTS5Backend'
+
+
+# Рендерер ответов api (api.routers.fast_serialization.FastJSONRenderer). ORJSON: True - кодировать
+# через orjson: быстрее, но JSON компактный и в UTF-8 без \u-экранирования (байты ответа изменятся)
+API_RENDERER = {
+    'ORJSON': False,
+}
+
+
+# Профилирование запросов к /api/ (api.metrics): доля SAMPLE_RATE запросов попадает в кольцевой
+# буфер на BUFFER_SIZE записей, смотреть - GET /api/admin/metrics. По умолчанию выключено
+REQUEST_METRICS = {
+    'ENABLED': False,
+    'SAMPLE_RATE': 1.0,
+    'BUFFER_SIZE': 1000,
+}
+
+
+# PRAGMA для новых соединений SQLite (api.db_connections): synchronous=NORMAL, mmap, busy_timeout.
+# SQLITE_PRAGMAS дополняет/переопределяет значения по умолчанию; ENABLED: False - не трогать PRAGMA.
+# WAL на боевой БД - SQLITE_PRAGMAS: {'journal_mode': 'WAL'}; для db.sqlite3 из репозитория не включаем,
+# он переписывает заголовок файла
+DATABASE_TUNING = {
+    'ENABLED': True,
+    'SQLITE_PRAGMAS': {},
+}
+
+
+# Чтение с реплик (api.db_router): обработчики с @read_replica читают с REPLICAS (алиасы DATABASES).
+# После записи пользователь PIN_SECONDS читает из default; при нескольких воркерах PIN_CACHE -
+# общий кэш. Пустой REPLICAS - всё идёт в default
+DATABASE_ROUTING = {
+    'REPLICAS': [],
+    'PIN_SECONDS': 5,
+    'PIN_CACHE': 'default',
+}
+
+
+# Лимиты частоты запросов (api.routers.throttling): BACKEND 'memory' - token bucket в памяти воркера,
+# 'cache' - скользящее окно в кэше CACHE (общий лимит воркеров при Redis/Memcached).
+# RATES переопределяет лимиты маршрутов по scope, например {'login': '20/min'}
+THROTTLING = {
+    'ENABLED': True,
+    'BACKEND': 'memory',
+    'CACHE': 'default',
+    'MAX_KEYS': 100000,
+    'RATES': {},
+}
+
+
+# Фоновые задачи (api.jobs, воркер - manage.py run_jobs): упавшая задача повторяется до MAX_ATTEMPTS раз
+# с задержкой BACKOFF_SECONDS * 2^(попытка-1), не больше BACKOFF_MAX; задача, чей воркер не отчитался
+# за LOCK_TIMEOUT секунд, снова отдаётся в работу
+JOB_QUEUE = {
+    'MAX_ATTEMPTS': 5,
+    'BACKOFF_SECONDS': 2,
+    'BACKOFF_MAX': 300,
+    'LOCK_TIMEOUT': 600,
+}
+
+# Письма уведомлений (задачи api.tasks); в разработке - в консоль воркера
+EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+DEFAULT_FROM_EMAIL = 'shop@example.com'
+
+
+# OpenAPI-схема api (api.openapi): строится один раз и сохраняется в CACHE_FILE вместе с отпечатком
+# исходников - новые воркеры читают готовый файл. None - кэш только в памяти процесса
+OPENAPI_SCHEMA = {
+    'CACHE_FILE': BASE_DIR / 'openapi_schema.json',
+}
+
+
 LANGUAGE_CODE = 'en-us'
 
 TIME_ZONE = 'UTC'